@@ -8,4 +8,4 @@ class AccountsConfig(AppConfig):
     def ready(self):
         # x = self.get_model('User')
         # print('model   ', x.objects.all())
-        from apps.accounts import signals
+        from apps.accounts import checks, signals
@@ -0,0 +1,204 @@
+"""
+Token authentication with cached token -> user snapshots. DRF 'TokenAuthentication' runs a 'Token' join 'User'
+query on every request. Here the user of a token is looked up in:
+1- A bounded in-process LRU ('TOKEN_AUTH_CACHE_SIZE' tokens), entries live 'TOKEN_AUTH_LOCAL_TTL' seconds
+2- Redis (shared by all processes), entries live 'TOKEN_AUTH_CACHE_TTL' seconds
+3- The database (and the snapshot is cached in both)
+A snapshot is only the fields of 'SNAPSHOT_FIELDS'. The user of a request is built from it with the other fields
+deferred, so they are loaded (one query) only if a view reads them and 'save()' never writes cached values of
+fields that are not loaded. Redis keys are hashes of tokens, so tokens are not stored in Redis.
+https://www.django-rest-framework.org/api-guide/authentication/#custom-authentication
+https://docs.djangoproject.com/en/3.2/ref/models/instances/#customizing-model-loading
+
+Snapshots are deleted from both caches when a token is deleted or changed (a rotated token is a new row) and when
+a user is saved or deleted (eg: deactivated), see 'signals.py'. Other processes drop their LRU entry after
+'TOKEN_AUTH_LOCAL_TTL' seconds at most. Changes that send no signals (eg: 'QuerySet.update') are seen after the
+TTLs. If Redis is down, tokens are looked up in the database.
+
+Async views use 'aget_user': the local cache and Redis (aioredis) are read on the event loop and only a miss of both
+caches runs the database query in a thread.
+"""
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from bigfin.redis_pool import ASYNC_REDIS_ERRORS, get_async_redis, get_redis
+
+import hashlib
+import json
+import logging
+import threading
+import time
+
+import redis
+
+
+logger = logging.getLogger(__name__)
+
+# Fields of the user that every request has without a query ('pk' is always in a snapshot)
+SNAPSHOT_FIELDS = ('username', 'email', 'name', 'is_active', 'is_staff', 'is_admin', 'is_superuser')
+CACHE_KEY = 'auth:token:{}'
+
+
+def cache_key(key):
+    return CACHE_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+class LRUCache:
+    """Thread safe LRU of at most 'size' entries that expire 'ttl' seconds after they are set"""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        if self.size <= 0 or self.ttl <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LRUCache(settings.TOKEN_AUTH_CACHE_SIZE, settings.TOKEN_AUTH_LOCAL_TTL)
+
+
+def snapshot(key):
+    """Snapshot of the user of a token from the database or None if there is no such token"""
+    row = Token.objects.filter(key=key).values('user_id', *(f'user__{name}' for name in SNAPSHOT_FIELDS)).first()
+    if row is None:
+        return None
+    return {'pk': row['user_id'], **{name: row[f'user__{name}'] for name in SNAPSHOT_FIELDS}}
+
+
+def load_snapshot(key, red_key=None):
+    """Snapshot of the user of a token from the database, cached locally (and in Redis if 'red_key' is given)"""
+    value = snapshot(key)
+    if value is None:
+        return None
+    if red_key is not None and settings.TOKEN_AUTH_CACHE_TTL > 0:
+        try:
+            get_redis().set(red_key, json.dumps(value), ex=settings.TOKEN_AUTH_CACHE_TTL)
+        except redis.RedisError:
+            logger.warning('Token cache is not available', exc_info=True)
+    local_cache.set(key, value)
+    return value
+
+
+def get_snapshot(key):
+    """Snapshot of the user of a token from the caches (or the database) or None if there is no such token"""
+    value = local_cache.get(key)
+    if value is not None:
+        return value
+    red_key = cache_key(key)
+    try:
+        cached = get_redis().get(red_key)
+    except redis.RedisError:
+        logger.warning('Token cache is not available', exc_info=True)
+        return load_snapshot(key)
+    if cached is None:
+        return load_snapshot(key, red_key)
+    value = json.loads(cached)
+    local_cache.set(key, value)
+    return value
+
+
+async def aget_snapshot(key):
+    """'get_snapshot' for async views"""
+    value = local_cache.get(key)
+    if value is not None:
+        return value
+    red_key = cache_key(key)
+    try:
+        cached = await (await get_async_redis()).get(red_key)
+    except ASYNC_REDIS_ERRORS:
+        logger.warning('Token cache is not available', exc_info=True)
+        return await sync_to_async(load_snapshot)(key)
+    if cached is None:
+        return await sync_to_async(load_snapshot)(key, red_key)
+    value = json.loads(cached)
+    local_cache.set(key, value)
+    return value
+
+
+def invalidate(keys):
+    """Delete snapshots of tokens from the local cache and Redis"""
+    keys = list(keys)
+    if not keys:
+        return
+    for key in keys:
+        local_cache.delete(key)
+    try:
+        get_redis().delete(*(cache_key(key) for key in keys))
+    except redis.RedisError:
+        logger.warning('Token cache is not available, snapshots expire after TOKEN_AUTH_CACHE_TTL', exc_info=True)
+
+
+def user_from_snapshot(value):
+    """A user instance with only the snapshot fields loaded (a new instance for every request)"""
+    model = get_user_model()
+    values = {'id': value['pk'], **{name: value[name] for name in SNAPSHOT_FIELDS}}
+    # 'from_db' takes values in the order of fields of the model
+    field_names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(router.db_for_read(model), field_names, [values[name] for name in field_names])
+
+
+def to_user(value, key):
+    """(user, token) of a snapshot, (None, None) if there is no snapshot"""
+    if value is None:
+        return None, None
+    user = user_from_snapshot(value)
+    token = Token.from_db(router.db_for_read(Token), ('key', 'user_id'), [key, user.pk])
+    token.user = user
+    return user, token
+
+
+def get_user(key):
+    """(user, token) of a token key from the caches, (None, None) if there is no such token"""
+    return to_user(get_snapshot(key), key)
+
+
+async def aget_user(key):
+    """'get_user' for async views"""
+    return to_user(await aget_snapshot(key), key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Same as 'TokenAuthentication' (same header and errors) with users of tokens from the caches"""
+
+    def authenticate_credentials(self, key):
+        user, token = get_user(key)
+        if user is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return user, token
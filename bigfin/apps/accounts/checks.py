@@ -0,0 +1,20 @@
+"""
+System checks of accounts. Axes only finds 'axes.middleware.AxesMiddleware' itself in 'MIDDLEWARE' (axes.W002, which
+is silenced), so this check also accepts guards of it (bigfin.middleware.HotPathGuard) that run it on other paths.
+https://docs.djangoproject.com/en/3.2/topics/checks/
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+from django.utils.module_loading import import_string
+
+AXES_MIDDLEWARE = 'axes.middleware.AxesMiddleware'
+
+
+@register(Tags.security, Tags.compatibility)
+def axes_middleware_check(app_configs, **kwargs):
+    for path in settings.MIDDLEWARE:
+        if path == AXES_MIDDLEWARE or getattr(import_string(path), 'middleware', None) == AXES_MIDDLEWARE:
+            return list()
+    return [Warning(f'You do not have {AXES_MIDDLEWARE} (or its guard) in your settings.MIDDLEWARE.',
+                    hint=f'Add {AXES_MIDDLEWARE} or bigfin.middleware.AxesMiddleware to settings.MIDDLEWARE.',
+                    id='accounts.W001')]
@@ -1,5 +1,8 @@
 """
 https://django-filter.readthedocs.io/en/stable/guide/rest_framework.html#integration-with-drf
+
+Filterable fields are an explicit allow-list of lookups that an index serves (unique fields or 'Meta.indexes' of
+the models), so a query string can not make the database scan a whole table.
 """
 from django_filters import rest_framework as filters
 from django.contrib.auth import get_user_model
@@ -12,9 +15,7 @@ class UserFilterSet(filters.FilterSet):
 
     class Meta:
         model = get_user_model()
-        fields = ['username', 'email', 'name', 'is_active',
-                  'is_staff', 'is_admin', 'is_superuser',
-                  'password']
+        fields = ['username', 'email']
 
 
 class AddressFilterSet(filters.FilterSet):
@@ -22,4 +23,4 @@ class AddressFilterSet(filters.FilterSet):
 
     class Meta:
         model = Address
-        fields = '__all__'
+        fields = ['user', 'country', 'city']
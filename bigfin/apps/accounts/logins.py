@@ -2,30 +2,51 @@
 This module defines 'login' function. This function used to login users in the 'normal django views' with
 'DRF authtoken'. With this function we can integrate normal django views authentication with DRF token based
 authentication.
+
+The user of the token comes from the token cache of 'CachedTokenAuthentication' (apps.accounts.authentication)
+and is set on the request only: no session is made or written for it, the client sends its token on every request.
+Async views use 'atoken_login'.
 """
-from django.contrib.auth import login
-from rest_framework.authtoken.models import Token
+from apps.accounts.authentication import aget_user, get_user
+
+
+def token_key(request):
+    """Key of the token header of the request:: token_key(request)->tuple(key or None, error message or None)"""
+    token_header = request.headers.get('Authorization', None)
+    if not token_header:
+        return None, 'No authentication made'
+    words = token_header.split()
+    if len(words) != 2:
+        return None, 'No user authenticated'
+    return words[1], None
 
 
 def token_login(request):
     """
     Login users with token header:: log_in(request)->tuple(bool, str)
     """
-    if not request.user.is_authenticated:
-        try:
-            token_header = request.headers.get('Authorization', None)
-            if token_header:
-                token_key = token_header.split()[1]
-                token_obj = Token.objects.filter(key=token_key)
-                if token_obj.exists():
-                    token = token_obj.first()
-                    login(request, token.user)
-                else:
-                    return False, 'No token found with the key'
-            else:
-                return False, 'No authentication made'
-        except AttributeError:
-            return False, 'No user authenticated'
-    else:
+    if request.user.is_authenticated:
         return True, 'user already authencticated'
-    return True, request.user.username
+    key, message = token_key(request)
+    if key is None:
+        return False, message
+    user, token = get_user(key)
+    if user is None or not user.is_active:
+        return False, 'No token found with the key'
+    request.user = user
+    return True, user.username
+
+
+async def atoken_login(request):
+    """
+    Login users of async views with token header:: await atoken_login(request)->tuple(bool, str)
+    Session users are not checked: the session user of 'request.user' is loaded with a sync query.
+    """
+    key, message = token_key(request)
+    if key is None:
+        return False, message
+    user, token = await aget_user(key)
+    if user is None or not user.is_active:
+        return False, 'No token found with the key'
+    request.user = user
+    return True, user.username
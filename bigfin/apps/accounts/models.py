@@ -99,5 +99,12 @@ class Address(models.Model):
     created = models.DateTimeField(auto_now_add=True, verbose_name=_('created'))
     updated = models.DateTimeField(auto_now=True, verbose_name=_('updated'))
 
+    class Meta:
+        indexes = [
+            # Filters of AddressFilterSet
+            models.Index(fields=['country', 'city'], name='address_country_city'),
+            models.Index(fields=['city'], name='address_city'),
+        ]
+
     def __str__(self):
         return f'{self.user.username}_address({self.id})'
@@ -1,4 +1,4 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.conf import settings
 from django.core.exceptions import ValidationError
@@ -6,6 +6,8 @@ from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
 from rest_framework.authtoken.models import Token
 
+from apps.accounts import authentication
+
 import decimal
 
 
@@ -48,3 +50,19 @@ def create_auth_token(sender, instance=None, created=False, **kwargs):
     """Create Authentication token for newly created user"""
     if created:
         Token.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, created=False, **kwargs):
+    """Cached user of a deleted or changed token is not used anymore (see 'authentication.py')"""
+    if not created:
+        authentication.invalidate([instance.key])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance, created=False, update_fields=None, **kwargs):
+    """Cached snapshots of a changed user (eg: deactivated) are not used anymore"""
+    if created or (update_fields is not None and not set(update_fields) & set(authentication.SNAPSHOT_FIELDS)):
+        return
+    authentication.invalidate(Token.objects.filter(user_id=instance.pk).values_list('key', flat=True))
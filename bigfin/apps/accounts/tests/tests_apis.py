@@ -66,10 +66,11 @@ class TestUserSerializer(TestCase):
         # NOTE: First we should simulate 'request' object for the HyperllinkedModelSerializer or if there
         # are needs that we should provide the 'request' object for our serializer:
         request = APIRequestFactory().get(reverse('accounts:user-list'))
-        user_list = UserNewSerializer(get_user_model().objects.all(), many=True, context={'request': request})
+        user_list = UserNewSerializer(get_user_model().objects.order_by('id'), many=True, context={'request': request})
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(user_list.data, response.json())
+        # Lists are paginated (bigfin.pagination.LimitOffsetPagination)
+        self.assertEqual(user_list.data, response.json()['results'])
     
     def test_user_api_retreive(self):
         """Test if we can retreive a user with api"""
@@ -203,13 +204,13 @@ class TestAddress(TestCase):
         # Use serializers to get data from the serializer:
         # Remember we should simulate request object first to use it in the serializer
         request = APIRequestFactory().get('admin:index')
-        serializer = AddressSerializer(instance=Address.objects.all(), many=True, context={'request': request})
+        serializer = AddressSerializer(instance=Address.objects.order_by('id'), many=True, context={'request': request})
 
         # Then we get all address objects with api and compare with the serializer data
         response = self.client.get(reverse('accounts:address-list'))
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(serializer.data, response.json())
+        self.assertEqual(serializer.data, response.json()['results'])
     
     def test_retreive_address_api(self):
         """Test if user can retreive an address."""
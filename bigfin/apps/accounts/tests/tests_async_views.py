@@ -0,0 +1,65 @@
+"""
+Async read views for ASGI servers ('profile_async', 'wallet_balance_async' and 'price_list_async') must send the
+same responses as their sync views.
+https://docs.djangoproject.com/en/3.2/topics/testing/tools/#testing-asynchronous-code
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, Client, TestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from apps.accounts import authentication
+from apps.currency.prices import PriceStore
+from bigfin.redis_pool import get_redis
+from bigfin.testing import RedisTestMixin
+
+
+class TestAsyncViews(RedisTestMixin, TestCase):
+    # Only 'test_price_list' needs redis, token lookups also work when it's down
+    redis_required = False
+
+    def setUp(self) -> None:
+        super().setUp()
+        authentication.local_cache.clear()
+        self.user = get_user_model().objects.create_user(username='reza', password='123456', name='reza')
+        self.token = Token.objects.get(user=self.user)
+        # 'AsyncClient' takes names of headers, 'Client' takes names of WSGI environ
+        self.header = {'authorization': f'Token {self.token.key}'}
+        self.sync_header = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+
+    async def get(self, name, **headers):
+        return await AsyncClient().get(reverse(name), **headers)
+
+    async def sync_get(self, name, **extra):
+        """Response of the sync view (the sync client can not run in the event loop of the test)"""
+        return await sync_to_async(Client().get)(reverse(name), **extra)
+
+    async def test_profile(self):
+        response = await self.get('accounts:profile_async', **self.header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['username'], 'reza')
+        self.assertEqual(response.json(), (await self.sync_get('accounts:profile', **self.sync_header)).json())
+        response = await self.get('accounts:profile_async', authorization='Token abc')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_wallet_balance(self):
+        response = await self.get('wallet:balance_async', **self.header)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['credit'], '0')
+        self.assertEqual(response.json(), (await self.sync_get('wallet:balance', **self.sync_header)).json())
+        self.assertEqual((await self.get('wallet:balance_async')).status_code, 401)
+
+    async def test_price_list(self):
+        self.require_redis()
+        PriceStore(get_redis()).publish_snapshot({'BTC': ('Bitcoin', 100), 'ETH': ('Ethereum', 10)})
+        for query in ('', '?symbols=btc'):
+            response = await AsyncClient().get(reverse('vitrin:price_list_async') + query)
+            sync_response = await sync_to_async(Client().get)(reverse('vitrin:price_list') + query)
+            self.assertEqual(response.content, sync_response.content)
+            self.assertEqual(response['ETag'], sync_response['ETag'])
+        response = await AsyncClient().get(reverse('vitrin:price_list_async') + '?symbols=btc',
+                                           **{'if-none-match': sync_response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        response = await AsyncClient().get(reverse('vitrin:price_list_async'), **{'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 200)
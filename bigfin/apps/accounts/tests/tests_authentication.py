@@ -0,0 +1,119 @@
+"""
+Token authentication with cached users of tokens (apps.accounts.authentication) and 'token_login'
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.test import RequestFactory, TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory
+
+from apps.accounts import authentication
+from apps.accounts.logins import token_login
+from bigfin.testing import RedisTestMixin
+
+import redis
+
+
+class TestCachedTokenAuthentication(RedisTestMixin, TestCase):
+    # Only 'test_cached_user' needs redis, others also work when it's down
+    redis_required = False
+
+    def setUp(self) -> None:
+        super().setUp()
+        authentication.local_cache.clear()
+        self.user = get_user_model().objects.create_user(username='reza', password='123456')
+        get_user_model().objects.filter(pk=self.user.pk).update(address='tehran')
+        self.token = Token.objects.get(user=self.user)
+        self.backend = authentication.CachedTokenAuthentication()
+
+    def authenticate(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        return self.backend.authenticate(request)
+
+    def test_cached_user(self):
+        """Token is looked up once, then from the local cache and then from redis"""
+        self.require_redis()
+        with self.assertNumQueries(1):
+            user, token = self.authenticate()
+        self.assertEqual((user.pk, user.username, user.is_active), (self.user.pk, 'reza', True))
+        self.assertEqual(token.key, self.token.key)
+        with self.assertNumQueries(0):
+            self.authenticate()
+        authentication.local_cache.clear()
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+        # Fields that are not in the snapshot are loaded when they are read
+        with self.assertNumQueries(1):
+            self.assertEqual(user.address, 'tehran')
+
+    def test_save_does_not_write_cached_values(self):
+        self.authenticate()
+        user, token = self.authenticate()
+        get_user_model().objects.filter(pk=self.user.pk).update(address='shiraz')
+        user.save()
+        self.assertEqual(get_user_model().objects.get(pk=self.user.pk).address, 'shiraz')
+
+    def test_invalidation(self):
+        """Deactivated users and deleted tokens are not authenticated from the caches"""
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+        self.user.is_active = True
+        self.user.save()
+        self.authenticate()
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_redis_down(self):
+        with mock.patch.object(authentication, 'get_redis', side_effect=redis.ConnectionError):
+            with self.assertNumQueries(1):
+                user, token = self.authenticate()
+            self.assertEqual(user.pk, self.user.pk)
+            self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_lru(self):
+        cache = authentication.LRUCache(size=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+        cache = authentication.LRUCache(size=2, ttl=-1)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
+
+
+class TestTokenLogin(RedisTestMixin, TestCase):
+    redis_required = False
+
+    def setUp(self) -> None:
+        super().setUp()
+        authentication.local_cache.clear()
+        self.user = get_user_model().objects.create_user(username='reza', password='123456')
+        self.token = Token.objects.get(user=self.user)
+
+    def request(self, header=None):
+        request = RequestFactory().get('/', **({'HTTP_AUTHORIZATION': header} if header else dict()))
+        request.user = mock.Mock(is_authenticated=False)
+        return request
+
+    def test_token_login(self):
+        """Users of tokens are set on the request without a session"""
+        request = self.request(f'Token {self.token.key}')
+        self.assertEqual(token_login(request), (True, 'reza'))
+        self.assertEqual(request.user.pk, self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(token_login(self.request(f'Token {self.token.key}')), (True, 'reza'))
+        self.assertFalse(Session.objects.exists())
+
+        self.assertEqual(token_login(self.request()), (False, 'No authentication made'))
+        self.assertEqual(token_login(self.request('Token')), (False, 'No user authenticated'))
+        self.assertEqual(token_login(self.request('Token abc')), (False, 'No token found with the key'))
@@ -0,0 +1,106 @@
+"""
+Middlewares of 'MIDDLEWARE' that hot paths skip (bigfin.middleware): axes and history still work on other paths
+"""
+from asgiref.sync import async_to_sync
+from axes.models import AccessAttempt
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django_hosts.defaults import host as Host
+from rest_framework import status
+from rest_framework.test import APIClient
+from simple_history.models import HistoricalRecords
+
+from apps.ticketing.models import Ticketing
+from bigfin.middleware import (HistoryRequestMiddleware, HostRouter, HostsRequestMiddleware, HostsResponseMiddleware,
+                               HotPathGuard, run_callback)
+
+import asyncio
+
+
+class ViewHookMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        return 'process_view'
+
+
+class ViewHookGuard(HotPathGuard):
+    middleware = f'{__name__}.ViewHookMiddleware'
+
+
+class TestHotPathGuards(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_superuser(username='reza', password='123456')
+        self.host = HostRouter().route('testserver').host
+
+    def request(self, path):
+        request = RequestFactory().get(path)
+        request.host = self.host
+        return request
+
+    def test_axes_lockout(self):
+        """Failed logins of the admin lock the user out"""
+        data = {'username': 'reza', 'password': 'wrong'}
+        for _ in range(settings.AXES_FAILURE_LIMIT):
+            response = self.client.post(reverse('admin:login'), data=data)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(AccessAttempt.objects.get(username='reza').failures_since_start, settings.AXES_FAILURE_LIMIT)
+
+    def test_history_user(self):
+        """History rows of changes made by views have the user of the request"""
+        client = APIClient()
+        client.force_login(self.user)
+        data = {'username': 'reza', 'title': 'title', 'message': 'message'}
+        response = client.post(reverse('ticketing:ticketing-list'), data=data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Ticketing.history.get().history_user, self.user)
+
+    def test_hot_paths(self):
+        """Hot paths skip the middleware and its hooks"""
+        def get_response(request):
+            return hasattr(HistoricalRecords.context, 'request')
+
+        middleware = HistoryRequestMiddleware(get_response)
+        self.assertIs(middleware(self.request('/price_list/')), False)
+        self.assertIs(middleware(self.request('/ticket/')), True)
+        guard = ViewHookGuard(get_response)
+        self.assertIsNone(guard.process_view(self.request('/price_list/'), None, (), {}))
+        self.assertEqual(guard.process_view(self.request('/ticket/'), None, (), {}), 'process_view')
+
+    def test_async(self):
+        """Middlewares of async handlers are awaited by django and skip the same hot paths"""
+        async def get_response(request):
+            return hasattr(HistoricalRecords.context, 'request')
+
+        for middleware in (HostsRequestMiddleware, HistoryRequestMiddleware, HostsResponseMiddleware):
+            self.assertTrue(asyncio.iscoroutinefunction(middleware(get_response)))
+            self.assertFalse(asyncio.iscoroutinefunction(middleware(lambda request: None)))
+        middleware = HistoryRequestMiddleware(get_response)
+        self.assertIs(async_to_sync(middleware)(self.request('/price_list/')), False)
+
+
+def host_callback(request, **kwargs):
+    request.callback_kwargs = kwargs
+
+
+class TestHostRouter(TestCase):
+    def test_callbacks(self):
+        """Only hosts with a callback run one"""
+        hosts = [Host(r'(?P<team>\w+)\.teams', settings.ROOT_URLCONF, name='teams',
+                      callback=f'{__name__}.host_callback'),
+                 Host(r'dashboard', 'apps.dashboard.urls', name='dashboard')]
+        router = HostRouter(host_patterns=hosts, default_host=hosts[1], size=1)
+        self.assertIsNone(router.route('dashboard').callback)
+        self.assertIsNone(router.route('other').callback)
+        route = router.route('red.teams')
+        self.assertEqual((route.host.name, route.kwargs, route.callback), ('teams', {'team': 'red'}, host_callback))
+        request = RequestFactory().get('/')
+        self.assertIsNone(run_callback(route, request))
+        self.assertEqual(request.callback_kwargs, {'team': 'red'})
+
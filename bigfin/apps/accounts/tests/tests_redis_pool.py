@@ -0,0 +1,83 @@
+"""
+Metrics of the shared redis connection pool (bigfin.redis_pool). Connections are stubs, so no server is needed
+"""
+from django.test import SimpleTestCase
+from unittest import mock
+
+from bigfin import redis_pool
+from bigfin.redis_pool import MeteredConnectionPool
+
+import os
+import redis
+import threading
+
+
+class StubConnection:
+    """Connection of a pool that never touches the network"""
+
+    def __init__(self, **kwargs):
+        self.pid = os.getpid()
+
+    def connect(self):
+        pass
+
+    def can_read(self):
+        return False
+
+    def disconnect(self):
+        pass
+
+
+class TestMeteredConnectionPool(SimpleTestCase):
+    def pool(self, max_connections=2, timeout=5):
+        return MeteredConnectionPool(connection_class=StubConnection, max_connections=max_connections,
+                                     timeout=timeout)
+
+    def assertStats(self, pool, **stats):
+        self.assertEqual({name: pool.stats()[name] for name in stats}, stats)
+
+    def test_in_use_and_idle(self):
+        pool = self.pool()
+        self.assertStats(pool, max_connections=2, created=0, in_use=0, idle=0, acquired=0, wait_time_avg=0.0)
+        first = pool.get_connection('GET')
+        second = pool.get_connection('GET')
+        self.assertStats(pool, created=2, in_use=2, idle=0, acquired=2)
+        pool.release(first)
+        self.assertStats(pool, created=2, in_use=1, idle=1)
+        # Idle connections are used again before new ones are made
+        self.assertIs(pool.get_connection('GET'), first)
+        pool.release(first)
+        pool.release(second)
+        self.assertStats(pool, created=2, in_use=0, idle=2, acquired=3)
+
+    def test_wait(self):
+        """Callers of a full pool wait for a released connection and the wait is counted"""
+        pool = self.pool(max_connections=1)
+        connection = pool.get_connection('GET')
+        self.assertLess(pool.stats()['wait_time_max'], 0.1)
+        release = threading.Timer(0.2, pool.release, args=[connection])
+        release.start()
+        self.addCleanup(release.cancel)
+        self.assertIs(pool.get_connection('GET'), connection)
+        stats = pool.stats()
+        self.assertEqual((stats['acquired'], stats['in_use']), (2, 1))
+        self.assertGreaterEqual(stats['wait_time_max'], 0.15)
+        self.assertGreaterEqual(stats['wait_time_total'], stats['wait_time_max'])
+        self.assertAlmostEqual(stats['wait_time_avg'], stats['wait_time_total'] / 2)
+
+    def test_timeout(self):
+        """A full pool raises after 'timeout' seconds instead of opening more connections"""
+        pool = self.pool(max_connections=1, timeout=0.05)
+        pool.get_connection('GET')
+        with self.assertRaises(redis.ConnectionError):
+            pool.get_connection('GET')
+        self.assertStats(pool, created=1, in_use=1, acquired=1)
+
+    def test_pool_stats(self):
+        pool = self.pool()
+        with mock.patch.object(redis_pool, '_pool', None), mock.patch.dict(redis_pool._async_clients, clear=True):
+            self.assertEqual(redis_pool.pool_stats(), {'sync': None, 'async': list()})
+            with mock.patch.object(redis_pool, '_pool', pool):
+                pool.get_connection('GET')
+                self.assertEqual(redis_pool.pool_stats()['sync'], pool.stats())
+                self.assertEqual(redis_pool.pool_stats()['sync']['in_use'], 1)
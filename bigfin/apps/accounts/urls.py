@@ -15,5 +15,7 @@ router.register('user', views.UserViewSet, 'user')
 router.register('address', views.AddressViewSet, 'address')
 
 urlpatterns = [
+    path('profile/', views.profile, name='profile'),
+    path('profile/async/', views.profile_async, name='profile_async'),
     path('', include(router.urls)),
 ]
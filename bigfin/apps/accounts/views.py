@@ -2,20 +2,28 @@
 ** It's highly recommended to override 'viewset' list or retreive method to send 'request' via the Serializer
 'context' attribute to be able do somethings in Serializer body.
 
+** Lists are not overridden anymore: default 'list' action applies filters and pagination (bigfin/pagination.py)
+and 'get_serializer' sends 'request' to the serializer context.
+
 ** When we use Serailizer inheritance, we can use in serializer class we want among parent or child
 class.
 
 ** To change 'lookup_field' attribute. And of course we should change 'lookupfield' on 'url' field of the related serializer
 IMPORTANT: But beware if change 'lookup_field' attribute, 'tests' must be written generics to support arbitrary 'lookup_field'.
+
+** 'profile' (WSGI) and 'profile_async' (ASGI) send profile of the user of a token with one query. The async one
+looks up the token on the event loop and runs only its query in a thread (no async queries in Django 3.2).
 """
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
+from django.http import JsonResponse
 from rest_framework.viewsets import ModelViewSet
-from rest_framework import status
 from rest_framework import permissions
 from rest_framework import authentication
-from rest_framework.response import Response
 from django_filters import rest_framework as filters
 
+from .authentication import CachedTokenAuthentication
+from .logins import atoken_login, token_login
 from .models import Address
 from .serializers import UserSerializer, AddressSerializer, UserNewSerializer
 from .filters import UserFilterSet, AddressFilterSet
@@ -28,7 +36,7 @@ class UserViewSet(ModelViewSet):
     # In production we rather use 'permissions.IsAdminUser' but for dev we use 'AllowAny'
     # permission_classes = [permissions.IsAdminUser, ]
     permission_classes = [permissions.AllowAny, ]
-    authentication_classes = [authentication.TokenAuthentication, authentication.SessionAuthentication, ]
+    authentication_classes = [CachedTokenAuthentication, authentication.SessionAuthentication, ]
     filter_backends = (filters.DjangoFilterBackend, )
     filterset_class = UserFilterSet
     lookup_field = get_user_model().USERNAME_FIELD
@@ -37,34 +45,48 @@ class UserViewSet(ModelViewSet):
         """Override this method. Remember it's so much faster to use 'get_queryset' method instead of 'queryset' attribute"""
         if self.request.user.is_authenticated:
             if self.request.user.is_staff:
-                queryset = get_user_model().objects.all()
+                # Limit/offset pagination needs a stable order
+                queryset = get_user_model().objects.order_by('id')
             else:
                 queryset = get_user_model().objects.filter(id=self.request.user.id)
         else:
             queryset = get_user_model().objects.none()
-        return queryset
-
-    def list(self, request, *args, **kwargs):
-        """Override 'list' method to send 'request' object to serializer - although it's not needed for ModelSerializer"""
-        # queryset = get_user_model().objects.all()
-        queryset = self.get_queryset()
-        if queryset.exists():
-            serializer = UserNewSerializer(instance=queryset, many=True, context={'request': request})
-            return Response(data=serializer.data, status=status.HTTP_200_OK)
-        return Response(data='Error: User is not authenticated!', status=status.HTTP_200_OK)
-    
+        # 'user_address' of every user in one query
+        return queryset.prefetch_related('user_address')
+
 
 class AddressViewSet(ModelViewSet):
     """This ViewSet used for list, retreive, post and update Address model"""
-    queryset = Address.objects.all()
+    queryset = Address.objects.select_related('user').order_by('id')
     serializer_class = AddressSerializer
     permission_classes = [permissions.IsAdminUser, ]
-    authentication_classes = [authentication.TokenAuthentication, authentication.SessionAuthentication, ]
+    authentication_classes = [CachedTokenAuthentication, authentication.SessionAuthentication, ]
     filter_backends = (filters.DjangoFilterBackend, )
     filterset_class = AddressFilterSet
 
-    def list(self, request, *args, **kwargs):
-        """Override 'list' method to send 'request' object to serializer - although it's not needed for ModelSerializer"""
-        queryset = Address.objects.all()
-        serializer = AddressSerializer(instance=queryset, many=True, context={'request': request})
-        return Response(data=serializer.data, status=status.HTTP_200_OK)
+
+PROFILE_FIELDS = ('id', 'username', 'email', 'name', 'address', 'score', 'discount_value', 'discount_percent',
+                  'created')
+
+
+def user_profile(user_id):
+    return get_user_model().objects.filter(pk=user_id).values(*PROFILE_FIELDS).first()
+
+
+def profile_response(logged_in, message, data):
+    if not logged_in:
+        return JsonResponse(data={'detail': message}, status=401)
+    return JsonResponse(data=data)
+
+
+def profile(request):
+    """Profile of the user of the token"""
+    logged_in, message = token_login(request)
+    return profile_response(logged_in, message, user_profile(request.user.pk) if logged_in else None)
+
+
+async def profile_async(request):
+    """'profile' for ASGI servers"""
+    logged_in, message = await atoken_login(request)
+    data = await sync_to_async(user_profile)(request.user.pk) if logged_in else None
+    return profile_response(logged_in, message, data)
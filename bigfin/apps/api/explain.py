@@ -0,0 +1,138 @@
+"""
+Query plan audit of the filters that our list APIs expose. For every list view with a 'filterset_class' it
+filters the view queryset by every combination of (up to 'max_fields') filters with a sample value, orders and
+slices it like the view paginator does and runs EXPLAIN on it. Plans that read a whole table (a sequential scan)
+are flagged. Use it on a database with realistic data ('ANALYZE' it first on postgres) because planners may
+prefer a sequential scan on small tables:
+    python manage.py explain_filters
+https://docs.djangoproject.com/en/3.2/ref/models/querysets/#explain
+https://www.sqlite.org/eqp.html
+https://www.postgresql.org/docs/current/using-explain.html
+"""
+import datetime
+import decimal
+import itertools
+import re
+import uuid
+
+from django.db import connections, models
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils import timezone
+
+
+# Lines of a plan that read a whole table. In sqlite 'SCAN table USING INDEX' walks an index (eg: for ORDER BY)
+# and is not flagged.
+FULL_SCAN = {
+    'sqlite': re.compile(r'\bSCAN (TABLE )?\w+( AS \w+)?\s*$', re.MULTILINE),
+    'postgresql': re.compile(r'Seq Scan on \w+'),
+}
+SORT = {
+    'sqlite': re.compile(r'USE TEMP B-TREE FOR ORDER BY'),
+    'postgresql': re.compile(r'^\s*(->\s*)?Sort\b', re.MULTILINE),
+}
+# Sample values of filters of empty tables
+DEFAULT_SAMPLES = {
+    models.BooleanField: True,
+    models.DecimalField: decimal.Decimal(1),
+    models.FloatField: 1.0,
+    models.IntegerField: 1,
+}
+
+
+def list_views(patterns=None, prefix=''):
+    """(route, view class) of every list view of the project that has a 'filterset_class'"""
+    patterns = get_resolver().url_patterns if patterns is None else patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from list_views(pattern.url_patterns, prefix + str(pattern.pattern))
+        elif isinstance(pattern, URLPattern):
+            cls = getattr(pattern.callback, 'cls', None)
+            actions = getattr(pattern.callback, 'actions', None) or {'get': 'list'}
+            if cls is not None and getattr(cls, 'filterset_class', None) and actions.get('get') == 'list':
+                yield prefix + str(pattern.pattern), cls
+
+
+def _default_sample(field):
+    if isinstance(field, models.DateTimeField):
+        return timezone.now()
+    if isinstance(field, models.DateField):
+        return datetime.date.today()
+    if isinstance(field, models.UUIDField):
+        return uuid.uuid4()
+    for field_class, value in DEFAULT_SAMPLES.items():
+        if isinstance(field, field_class):
+            return value
+    return 'a'
+
+
+def sample_value(model, field_name):
+    """A value of 'field_name' from the table or a made up value of its type if the table is empty"""
+    value = model._default_manager.filter(**{f'{field_name}__isnull': False}) \
+        .values_list(field_name, flat=True).first()
+    if value is not None:
+        return value
+    field = None
+    for part in field_name.split('__'):
+        field = model._meta.get_field(part)
+        if field.is_relation:
+            model = field.related_model
+            field = model._meta.pk
+    return _default_sample(field)
+
+
+def view_queryset(view_class, filterset_class):
+    queryset = getattr(view_class, 'queryset', None)
+    if queryset is None:
+        queryset = filterset_class._meta.model._default_manager.all()
+    return queryset.all()
+
+
+def paginate(queryset, view_class):
+    """Order and slice 'queryset' like the first page of the view paginator"""
+    pagination_class = getattr(view_class, 'pagination_class', None)
+    ordering = getattr(pagination_class, 'ordering', None)
+    if isinstance(ordering, str):
+        ordering = (ordering, )
+    if ordering:
+        queryset = queryset.order_by(*ordering)
+    elif not queryset.ordered:
+        queryset = queryset.order_by('pk')
+    page_size = getattr(pagination_class, 'page_size', None) or 100
+    return queryset[:page_size + 1]
+
+
+def explain(queryset):
+    """EXPLAIN of 'queryset' and lines of the plan that read a whole table or sort rows"""
+    plan = queryset.explain()
+    vendor = connections[queryset.db].vendor
+    full_scan, sort = FULL_SCAN.get(vendor), SORT.get(vendor)
+    scans = [match.group(0).strip() for match in full_scan.finditer(plan)] if full_scan else []
+    sorts = [match.group(0).strip() for match in sort.finditer(plan)] if sort else []
+    return plan, scans, sorts
+
+
+def audit(max_fields=2):
+    """
+    Yield a dictionary for every (route, filters) combination with keys: 'route', 'filterset', 'filters' (names of
+    filters), 'sql', 'plan', 'scans' and 'sorts'. Combinations of more than 'max_fields' filters are skipped.
+    """
+    seen = set()
+    for route, view_class in list_views():
+        filterset_class = view_class.filterset_class
+        if (view_class, filterset_class) in seen:
+            # Format suffix patterns of routers
+            continue
+        seen.add((view_class, filterset_class))
+        model = filterset_class._meta.model
+        filters = {name: f for name, f in filterset_class.base_filters.items() if not f.method}
+        samples = {name: sample_value(model, f.field_name) for name, f in filters.items()}
+        # Without filters a list is an ordered scan that stops at the end of the first page, which is fine
+        for size in range(1, max_fields + 1):
+            for names in itertools.combinations(filters, size):
+                queryset = view_queryset(view_class, filterset_class)
+                for name in names:
+                    queryset = filters[name].filter(queryset, samples[name])
+                queryset = paginate(queryset, view_class)
+                plan, scans, sorts = explain(queryset)
+                yield {'route': route, 'filterset': filterset_class.__name__, 'filters': names,
+                       'sql': str(queryset.query), 'plan': plan, 'scans': scans, 'sorts': sorts}
@@ -0,0 +1,38 @@
+"""
+Run EXPLAIN on every filter combination of our list APIs and flag the ones that scan a whole table
+(see 'apps.api.explain'):
+    python manage.py explain_filters
+    python manage.py explain_filters --max-fields 1 --plans
+    python manage.py explain_filters --fail-on-scan
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.api.explain import audit
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN every filterset combination of list APIs and flag sequential scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-fields', type=int, default=2, help='Maximum filters of one combination')
+        parser.add_argument('--plans', action='store_true', help='Print plans of all combinations')
+        parser.add_argument('--fail-on-scan', action='store_true', help='Exit with error if any scan is flagged')
+
+    def handle(self, *args, **options):
+        total = flagged = 0
+        for result in audit(options['max_fields']):
+            total += 1
+            filters = ', '.join(result['filters']) or '(no filter)'
+            if result['scans']:
+                flagged += 1
+                self.stdout.write(self.style.WARNING(
+                    f'SEQ SCAN  {result["route"]}  {result["filterset"]}: {filters}  -> {"; ".join(result["scans"])}'))
+            elif options['verbosity'] > 1 or options['plans']:
+                sort = '  (sort: ' + '; '.join(result['sorts']) + ')' if result['sorts'] else ''
+                self.stdout.write(f'OK        {result["route"]}  {result["filterset"]}: {filters}{sort}')
+            if options['plans'] or (result['scans'] and options['verbosity'] > 1):
+                self.stdout.write(f'    {result["sql"]}')
+                self.stdout.write('    ' + result['plan'].replace('\n', '\n    '))
+        self.stdout.write(f'{total} queries explained, {flagged} with sequential scans')
+        if flagged and options['fail_on_scan']:
+            raise CommandError(f'{flagged} queries scan a whole table')
@@ -0,0 +1,74 @@
+"""
+Optional micro-batching of chat messages. Without it every inbound message costs one history append and one
+'group_send' (one redis round-trip for the group plus one per member). With 'CHAT_BATCH_WINDOW' > 0, messages
+of a room received by one process are collected for at most that many seconds (or until 'CHAT_BATCH_MAX_SIZE'
+messages) and sent as one {'type': 'chat_message', 'messages': [...]} event and one history append.
+A bigger window means less redis round-trips and more throughput but more latency for every message.
+
+https://channels.readthedocs.io/en/stable/topics/channel_layers.html#groups
+"""
+import asyncio
+import logging
+import weakref
+
+from django.conf import settings
+
+from apps.chat.history import append_messages
+
+
+logger = logging.getLogger(__name__)
+
+# One batcher per event loop of the process
+_batchers = weakref.WeakKeyDictionary()
+
+
+class RoomBatcher:
+    """Collect messages of every room group and send them in batches"""
+
+    def __init__(self, channel_layer, window, max_size):
+        self.channel_layer = channel_layer
+        self.window = window
+        self.max_size = max_size
+        # Group name to (room name, list of messages) and to its scheduled flush
+        self.buffers = dict()
+        self.timers = dict()
+
+    async def add(self, room_name, group, message):
+        room_name, messages = self.buffers.setdefault(group, (room_name, list()))
+        messages.append(message)
+        if len(messages) >= self.max_size:
+            timer = self.timers.pop(group, None)
+            if timer is not None:
+                timer.cancel()
+            await self.flush(group)
+        elif group not in self.timers:
+            self.timers[group] = asyncio.get_running_loop().create_task(self.flush_later(group))
+
+    async def flush_later(self, group):
+        await asyncio.sleep(self.window)
+        self.timers.pop(group, None)
+        try:
+            await self.flush(group)
+        except Exception:
+            logger.exception('Could not send batch of chat messages to "%s"', group)
+
+    async def flush(self, group):
+        room_name, messages = self.buffers.pop(group, (None, None))
+        if not messages:
+            return
+        await asyncio.gather(
+            append_messages(room_name, messages),
+            self.channel_layer.group_send(group, {'type': 'chat_message', 'messages': messages}),
+        )
+
+
+def get_batcher(channel_layer):
+    """Batcher of the running event loop or None if batching is disabled"""
+    if not settings.CHAT_BATCH_WINDOW:
+        return None
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        batcher = _batchers[loop] = RoomBatcher(channel_layer, settings.CHAT_BATCH_WINDOW,
+                                                settings.CHAT_BATCH_MAX_SIZE)
+    return batcher
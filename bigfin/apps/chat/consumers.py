@@ -1,13 +1,22 @@
 # This code is Asynchronous
+import asyncio
 import json
+from urllib.parse import parse_qs
+
+from django.conf import settings
 from channels.generic.websocket import AsyncWebsocketConsumer
 
-import redis
+from apps.chat.batching import get_batcher
+from apps.chat.history import append_message, recent_messages, valid_cursor
+from apps.currency.streaming import price_group, valid_symbol
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
-    rds = redis.Redis(host="127.0.0.1", port=6379, db=0)
-    # print(rds)
+    """
+    Chat room. A connecting client first gets {"history": [...], "cursor": ...} with the last
+    'CHAT_HISTORY_ON_CONNECT' messages of the room and asks for older pages with {"load_older": "<cursor>"}.
+    New messages are sent as {"message": ...} or, if batching is enabled, as {"messages": [...]}.
+    """
     async def connect(self):
         self.room_name = self.scope['url_route']['kwargs']['room_name']
         self.room_group_name = 'chat_%s' % self.room_name
@@ -20,6 +29,13 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         await self.accept()
 
+        # Last messages of the room in one round-trip
+        await self.send_history(settings.CHAT_HISTORY_ON_CONNECT)
+
+    async def send_history(self, count, before=None):
+        messages, cursor = await recent_messages(self.room_name, count, before=before)
+        await self.send(text_data=json.dumps({'history': messages, 'cursor': cursor}))
+
     async def disconnect(self, close_code):
         # Leave room group
         await self.channel_layer.group_discard(
@@ -29,21 +45,41 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
     # Receive message from WebSocket
     async def receive(self, text_data):
-        text_data_json = json.loads(text_data)
-        message = text_data_json['message']
-        self.rds.set('a', message)
-
-        # Send message to room group
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'chat_message',
-                'message': message
-            }
+        try:
+            data = json.loads(text_data)
+            if 'load_older' in data:
+                if valid_cursor(data['load_older']):
+                    await self.send_history(settings.CHAT_HISTORY_PAGE_SIZE, before=data['load_older'])
+                return
+            message = data['message']
+        except (ValueError, KeyError, TypeError):
+            return
+        if not isinstance(message, str) or len(message) > settings.CHAT_MESSAGE_MAX_LENGTH:
+            return
+
+        batcher = get_batcher(self.channel_layer)
+        if batcher is not None:
+            await batcher.add(self.room_name, self.room_group_name, message)
+            return
+
+        # Save message in room history and send it to room group concurrently. Nothing here blocks the event loop
+        await asyncio.gather(
+            append_message(self.room_name, message),
+            self.channel_layer.group_send(
+                self.room_group_name,
+                {
+                    'type': 'chat_message',
+                    'message': message
+                }
+            ),
         )
 
-    # Receive message from room group
+    # Receive message (or a batch of messages, see 'apps.chat.batching') from room group
     async def chat_message(self, event):
+        if 'messages' in event:
+            # The whole batch in one frame
+            await self.send(text_data=json.dumps({'messages': event['messages']}))
+            return
         message = event['message']
 
         # Send message to WebSocket
@@ -52,6 +88,92 @@ class ChatConsumer(AsyncWebsocketConsumer):
         }))
 
 
+class PriceConsumer(AsyncWebsocketConsumer):
+    """
+    Live prices of symbols. Client subscribes with 'ws/prices/?symbols=BTC,ETH' and later with
+    {"subscribe": ["DOGE"]} or {"unsubscribe": ["BTC"]} messages. Every symbol is a channel layer group that
+    ingestion sends each price update to once (apps.currency.streaming).
+    Updates are not sent one by one: they are coalesced per connection to the latest price of every symbol and
+    sent in one {"prices": {...}} message at most every 'PRICE_STREAM_THROTTLE' seconds. So a slow client gets
+    latest prices instead of an unbounded backlog of old ones.
+    """
+    throttle = None
+    max_symbols = None
+
+    async def connect(self):
+        self.throttle = settings.PRICE_STREAM_THROTTLE if self.throttle is None else self.throttle
+        self.max_symbols = self.max_symbols or settings.PRICE_STREAM_MAX_SYMBOLS
+        self.symbols = set()
+        # Symbol to its latest not sent update
+        self.pending = dict()
+        self.flush_task = None
+        self.last_sent = 0.0
+        await self.accept()
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        await self.subscribe(','.join(query.get('symbols', [])).split(','))
+
+    async def disconnect(self, close_code):
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+        for symbol in self.symbols:
+            await self.channel_layer.group_discard(price_group(symbol), self.channel_name)
+
+    async def receive(self, text_data):
+        try:
+            data = json.loads(text_data)
+        except ValueError:
+            return
+        if not isinstance(data, dict):
+            return
+        if isinstance(data.get('subscribe'), list):
+            await self.subscribe(data['subscribe'])
+        if isinstance(data.get('unsubscribe'), list):
+            await self.unsubscribe(data['unsubscribe'])
+
+    async def subscribe(self, symbols):
+        symbols = {s.strip().upper() for s in symbols if isinstance(s, str) and s.strip()}
+        for symbol in sorted(symbols - self.symbols):
+            if len(self.symbols) >= self.max_symbols:
+                break
+            if valid_symbol(symbol):
+                await self.channel_layer.group_add(price_group(symbol), self.channel_name)
+                self.symbols.add(symbol)
+        await self.send(text_data=json.dumps({'symbols': sorted(self.symbols)}))
+
+    async def unsubscribe(self, symbols):
+        for symbol in {s.strip().upper() for s in symbols if isinstance(s, str)} & self.symbols:
+            await self.channel_layer.group_discard(price_group(symbol), self.channel_name)
+            self.symbols.discard(symbol)
+            self.pending.pop(symbol, None)
+        await self.send(text_data=json.dumps({'symbols': sorted(self.symbols)}))
+
+    # Receive a price update from a symbol group
+    async def price_update(self, event):
+        symbol = event['symbol']
+        if symbol not in self.symbols:
+            return
+        # Only the latest update of a symbol is kept
+        self.pending[symbol] = {'name': event['name'], 'price': event['price'], 'time': event['time']}
+        if self.flush_task is None:
+            loop = asyncio.get_running_loop()
+            delay = max(0.0, self.last_sent + self.throttle - loop.time())
+            self.flush_task = loop.create_task(self.flush(delay))
+
+    async def flush(self, delay):
+        """Send pending updates after 'delay' and keep sending (throttled) while new updates arrive"""
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.sleep(delay)
+            while self.pending:
+                prices, self.pending = self.pending, dict()
+                self.last_sent = loop.time()
+                await self.send(text_data=json.dumps({'prices': prices}))
+                if self.pending:
+                    await asyncio.sleep(max(0.0, self.last_sent + self.throttle - loop.time()))
+        finally:
+            self.flush_task = None
+
+
 """
 # This code is Synchronous
 import json
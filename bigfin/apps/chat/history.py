@@ -0,0 +1,107 @@
+"""
+Per-room chat history in redis. Every room has its own redis stream and messages are appended with the asyncio
+redis client of 'bigfin.redis_pool', so a consumer never blocks the event loop to save a message (the old code
+called a sync 'redis.Redis.set' in 'receive' and overwrote one 'a' key for all rooms).
+
+Retention of every room is bounded both by number of messages ('CHAT_HISTORY_MAX_LEN') and by their age
+('CHAT_HISTORY_MAX_AGE'), and the stream of an idle room expires, so memory stays flat for long-running rooms.
+Messages older than 'CHAT_HISTORY_MAX_AGE' are deleted by later appends ('TRIM_BATCH' at a time) and are never read.
+Only commands of redis 5.0 (streams) are used.
+Pages are read newest first and the cursor of the next (older) page is id of the oldest message of the page:
+    await append_message('lobby', 'hello')
+    await append_messages('lobby', ['hi', 'bye'])
+    messages, cursor = await recent_messages('lobby', 50)
+    older, cursor = await recent_messages('lobby', 50, before=cursor)
+
+https://redis.io/docs/data-types/streams/
+https://redis.io/commands/xrevrange/
+"""
+import time
+
+from django.conf import settings
+
+from bigfin.redis_pool import get_async_redis
+
+
+HISTORY_KEY = 'chat:history:{}'
+# Oldest messages that one append deletes at most, so an append of a room that was idle for long stays cheap
+TRIM_BATCH = 100
+# Append, trim by count and by age and refresh expiry of the stream in one round-trip. '~' lets redis trim
+# whole nodes of the stream, which is much cheaper than exact trimming. Messages older than ARGV[2] are found with
+# XRANGE and deleted with XDEL ('XTRIM MINID' needs redis 6.2).
+APPEND_SCRIPT = """
+local ids = {}
+for i = 5, #ARGV do
+    ids[#ids + 1] = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[1], '*', 'message', ARGV[i])
+end
+local expired = {}
+for i, entry in ipairs(redis.call('XRANGE', KEYS[1], '-', ARGV[2], 'COUNT', ARGV[3])) do
+    expired[i] = entry[1]
+end
+if #expired > 0 then
+    redis.call('XDEL', KEYS[1], unpack(expired))
+end
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return ids
+"""
+MAX_SEQUENCE = 2 ** 64 - 1
+
+
+def history_key(room_name):
+    return HISTORY_KEY.format(room_name)
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _previous_id(message_id):
+    """The largest stream id before 'message_id'. Exclusive ranges ('(id') need redis 6.2, this one does not"""
+    ms, seq = (int(part) for part in message_id.split('-'))
+    return f'{ms}-{seq - 1}' if seq else f'{ms - 1}-{MAX_SEQUENCE}'
+
+
+def valid_cursor(cursor):
+    parts = cursor.split('-') if isinstance(cursor, str) else []
+    return len(parts) == 2 and all(part.isdigit() for part in parts) and cursor != '0-0'
+
+
+def _min_id():
+    return f'{int((time.time() - settings.CHAT_HISTORY_MAX_AGE) * 1000)}-0'
+
+
+async def append_messages(room_name, messages, redis=None):
+    """Save messages in history of the room in one round-trip and return their ids"""
+    redis = redis or await get_async_redis()
+    args = [settings.CHAT_HISTORY_MAX_LEN, _previous_id(_min_id()), TRIM_BATCH, settings.CHAT_HISTORY_MAX_AGE]
+    ids = await redis.eval(APPEND_SCRIPT, keys=[history_key(room_name)], args=[*args, *messages])
+    return [_decode(message_id) for message_id in ids]
+
+
+async def append_message(room_name, message, redis=None):
+    """Save a message in history of the room and return its id"""
+    return (await append_messages(room_name, [message], redis=redis))[0]
+
+
+async def recent_messages(room_name, count, before=None, redis=None):
+    """
+    Up to 'count' messages of the room before the 'before' cursor (or the newest ones) in one round-trip. Returns
+    messages from oldest to newest as {'id', 'message', 'time'} dictionaries and the cursor of older messages,
+    which is None if there are no older messages.
+    """
+    redis = redis or await get_async_redis()
+    start = _previous_id(before) if before else '+'
+    # One more message than asked tells us if there is an older page
+    entries = await redis.xrevrange(history_key(room_name), start=start, stop=_min_id(), count=count + 1)
+    has_older = len(entries) > count
+    messages = list()
+    for message_id, fields in entries[:count]:
+        message_id = _decode(message_id)
+        messages.append({
+            'id': message_id,
+            'message': _decode(fields.get(b'message', fields.get('message'))),
+            'time': int(message_id.split('-')[0]) / 1000,
+        })
+    messages.reverse()
+    cursor = messages[0]['id'] if has_older and messages else None
+    return messages, cursor
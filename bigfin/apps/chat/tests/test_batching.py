@@ -0,0 +1,78 @@
+"""
+Micro-batching of chat messages (apps.chat.batching)
+"""
+import asyncio
+import json
+from unittest import mock
+
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import SimpleTestCase, override_settings
+
+from apps.chat.batching import RoomBatcher
+from apps.chat.history import recent_messages
+from apps.chat.routing import websocket_urlpatterns
+from bigfin.testing import RedisTestMixin
+
+WINDOW = 0.2
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+                   CHAT_BATCH_WINDOW=WINDOW, CHAT_BATCH_MAX_SIZE=3)
+class TestRoomBatcher(RedisTestMixin, SimpleTestCase):
+    async def connect(self, room='lobby'):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'/ws/chat/{room}/')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_from()
+        return communicator
+
+    async def send(self, communicator, *messages):
+        for message in messages:
+            await communicator.send_to(text_data=json.dumps({'message': message}))
+
+    async def receive(self, communicator, timeout=1):
+        return json.loads(await communicator.receive_from(timeout=timeout))
+
+    async def history(self, room='lobby'):
+        return [message['message'] for message in (await recent_messages(room, 10))[0]]
+
+    async def test_window(self):
+        """Messages of a room are sent together after the window"""
+        first, second, other = await self.connect(), await self.connect(), await self.connect('other')
+        await self.send(first, 'a')
+        await self.send(second, 'b')
+        await self.send(other, 'c')
+        self.assertTrue(await first.receive_nothing(timeout=WINDOW / 2))
+        for communicator in (first, second):
+            self.assertEqual(await self.receive(communicator), {'messages': ['a', 'b']})
+        self.assertEqual(await self.receive(other), {'messages': ['c']})
+        self.assertEqual(await self.history(), ['a', 'b'])
+        self.assertEqual(await self.history('other'), ['c'])
+        for communicator in (first, second, other):
+            await communicator.disconnect()
+
+    async def test_max_size(self):
+        """A full batch is sent without waiting for the window"""
+        communicator = await self.connect()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await self.send(communicator, 'a', 'b', 'c', 'd')
+        self.assertEqual(await self.receive(communicator, timeout=WINDOW / 2), {'messages': ['a', 'b', 'c']})
+        self.assertLess(loop.time() - start, WINDOW)
+        self.assertEqual(await self.receive(communicator), {'messages': ['d']})
+        self.assertEqual(await self.history(), ['a', 'b', 'c', 'd'])
+        await communicator.disconnect()
+
+    async def test_failed_flush(self):
+        """A batch that could not be sent does not stop the next ones"""
+        batcher = RoomBatcher(get_channel_layer(), WINDOW / 4, 10)
+        with mock.patch.object(batcher.channel_layer, 'group_send', side_effect=[ConnectionError, None]) as send, \
+                self.assertLogs('apps.chat.batching', 'ERROR'):
+            await batcher.add('lobby', 'chat_lobby', 'a')
+            await asyncio.sleep(WINDOW / 2)
+            await batcher.add('lobby', 'chat_lobby', 'b')
+            await asyncio.sleep(WINDOW / 2)
+        self.assertEqual([call.args[1]['messages'] for call in send.call_args_list], [['a'], ['b']])
+        self.assertEqual((batcher.buffers, batcher.timers), (dict(), dict()))
@@ -0,0 +1,84 @@
+"""
+Chat rooms over websockets (apps.chat.consumers.ChatConsumer) and their history in redis (apps.chat.history)
+"""
+import json
+from unittest import mock
+
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import SimpleTestCase, override_settings
+
+from apps.chat import history
+from apps.chat.history import append_messages, recent_messages
+from apps.chat.routing import websocket_urlpatterns
+from bigfin.redis_pool import get_async_redis
+from bigfin.testing import RedisTestMixin
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+                   CHAT_HISTORY_ON_CONNECT=3, CHAT_HISTORY_PAGE_SIZE=2, CHAT_MESSAGE_MAX_LENGTH=10)
+class TestChatConsumer(RedisTestMixin, SimpleTestCase):
+    async def connect(self, room='lobby'):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'/ws/chat/{room}/')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def receive(self, communicator):
+        return json.loads(await communicator.receive_from())
+
+    def texts(self, history):
+        return [message['message'] for message in history['history']]
+
+    async def test_history(self):
+        """Last messages on connect, then older pages until the cursor is null"""
+        ids = await append_messages('lobby', [f'message {number}' for number in range(6)])
+        communicator = await self.connect()
+        history = await self.receive(communicator)
+        self.assertEqual(self.texts(history), ['message 3', 'message 4', 'message 5'])
+        self.assertEqual(history['cursor'], ids[3])
+        pages = list()
+        while history['cursor']:
+            await communicator.send_to(text_data=json.dumps({'load_older': history['cursor']}))
+            history = await self.receive(communicator)
+            pages.append(self.texts(history))
+        self.assertEqual(pages, [['message 1', 'message 2'], ['message 0']])
+        for cursor in ('abc', '0-0', 12, None):
+            await communicator.send_to(text_data=json.dumps({'load_older': cursor}))
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_messages(self):
+        """Messages are sent to every member of the room and saved in its history"""
+        first, second, other = await self.connect(), await self.connect(), await self.connect('other')
+        for communicator in (first, second, other):
+            self.assertEqual(await self.receive(communicator), {'history': [], 'cursor': None})
+        # Only the first one is valid: the others are too long, not a string, without a message or not JSON
+        for text in (json.dumps({'message': 'hello'}), json.dumps({'message': 'x' * 11}), '{"message": 1}',
+                     '{"text": "hi"}', 'not json'):
+            await first.send_to(text_data=text)
+        for communicator in (first, second):
+            self.assertEqual(await self.receive(communicator), {'message': 'hello'})
+            self.assertTrue(await communicator.receive_nothing())
+        self.assertTrue(await other.receive_nothing())
+        messages, cursor = await recent_messages('lobby', 10)
+        self.assertEqual(([message['message'] for message in messages], cursor), (['hello'], None))
+        for communicator in (first, second, other):
+            await communicator.disconnect()
+
+
+class TestHistory(RedisTestMixin, SimpleTestCase):
+    @mock.patch.object(history, 'TRIM_BATCH', 2)
+    async def test_trim_by_age(self):
+        """Messages older than 'CHAT_HISTORY_MAX_AGE' are never read and appends delete them a batch at a time"""
+        redis = await get_async_redis()
+        key = history.history_key('lobby')
+        for number in range(3):
+            await redis.xadd(key, {'message': f'old {number}'}, message_id=f'1000-{number}'.encode())
+        await append_messages('lobby', ['new'])
+        self.assertEqual(await redis.xlen(key), 2)
+        messages, cursor = await recent_messages('lobby', 10)
+        self.assertEqual(([message['message'] for message in messages], cursor), (['new'], None))
+        await append_messages('lobby', ['newer'])
+        self.assertEqual([fields[b'message'] for _, fields in await redis.xrange(key)], [b'new', b'newer'])
+        self.assertGreater(await redis.ttl(key), 0)
@@ -0,0 +1,64 @@
+"""
+Live price streaming over websockets (apps.chat.consumers.PriceConsumer and apps.currency.streaming)
+"""
+import asyncio
+import json
+
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import SimpleTestCase, override_settings
+
+from apps.chat.routing import websocket_urlpatterns
+from apps.currency.streaming import apublish_prices
+
+THROTTLE = 0.2
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+                   PRICE_STREAM_THROTTLE=THROTTLE, PRICE_STREAM_MAX_SYMBOLS=3)
+class TestPriceConsumer(SimpleTestCase):
+    async def connect(self, symbols='btc,ETH'):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'/ws/prices/?symbols={symbols}')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def receive(self, communicator):
+        return json.loads(await communicator.receive_from(timeout=THROTTLE * 5))
+
+    async def publish(self, *ticks):
+        await apublish_prices([(symbol, symbol.lower(), price, 1000) for symbol, price in ticks], get_channel_layer())
+
+    async def test_subscriptions(self):
+        communicator = await self.connect('btc,ETH,bad symbol!')
+        self.assertEqual(await self.receive(communicator), {'symbols': ['BTC', 'ETH']})
+        await communicator.send_to(text_data=json.dumps({'subscribe': ['doge', 'XRP'], 'unsubscribe': ['BTC']}))
+        # At most 'PRICE_STREAM_MAX_SYMBOLS' symbols
+        self.assertEqual(await self.receive(communicator), {'symbols': ['BTC', 'DOGE', 'ETH']})
+        self.assertEqual(await self.receive(communicator), {'symbols': ['DOGE', 'ETH']})
+        for text in ('not json', '[]', '{"subscribe": "BTC"}'):
+            await communicator.send_to(text_data=text)
+        self.assertTrue(await communicator.receive_nothing())
+
+        await self.publish(('BTC', 1), ('DOGE', 2))
+        self.assertEqual(await self.receive(communicator),
+                         {'prices': {'DOGE': {'name': 'doge', 'price': 2.0, 'time': 1000}}})
+        await communicator.disconnect()
+
+    async def test_throttle(self):
+        """Updates in the throttle window are coalesced to the latest price of every symbol in one message"""
+        communicator = await self.connect()
+        await self.receive(communicator)
+        loop = asyncio.get_running_loop()
+        await self.publish(('BTC', 1))
+        self.assertEqual(await self.receive(communicator),
+                         {'prices': {'BTC': {'name': 'btc', 'price': 1.0, 'time': 1000}}})
+        sent = loop.time()
+        for price in (2, 3, 4):
+            await self.publish(('BTC', price), ('ETH', price * 10))
+        prices = (await self.receive(communicator))['prices']
+        self.assertGreaterEqual(loop.time() - sent, THROTTLE * 0.9)
+        self.assertEqual({symbol: update['price'] for symbol, update in prices.items()}, {'BTC': 4.0, 'ETH': 40.0})
+        self.assertTrue(await communicator.receive_nothing(timeout=THROTTLE * 2))
+        await communicator.disconnect()
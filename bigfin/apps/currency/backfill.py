@@ -0,0 +1,113 @@
+"""
+Rebuild 'Candle' rows of a date range from stored prices with NumPy. Instead of feeding every historical row to
+'CandleAggregator' one by one, prices are loaded to arrays sorted by (currency, time) once and every interval is
+aggregated with a few vectorized operations ('ufunc.reduceat' over bucket boundaries):
+    python manage.py backfill_candles 2022-01-01 2022-01-31
+    python manage.py backfill_candles 2022-01-01 2022-01-31 --source price_history --intervals 1h,1d
+
+Sources are 'HistoricalCurrency' of simple_history ('simple_history', default) and compact 'PriceHistory'
+('price_history'). Prices are aggregated as float64, so candles keep about 15 significant digits.
+Historical rows have no traded volume: 'volume' of backfilled candles is 0 and 'ticks' is number of prices.
+
+https://numpy.org/doc/stable/reference/generated/numpy.ufunc.reduceat.html
+"""
+from datetime import datetime, time, timedelta, timezone
+
+from django.db import transaction
+
+import numpy as np
+
+from apps.currency.candles import INTERVALS, to_datetime
+from apps.currency.models import Candle, Currency, PriceHistory
+
+
+SOURCES = ('simple_history', 'price_history')
+
+
+def day_range(start_date, end_date):
+    """Aware datetimes of midnight UTC of 'start_date' and of the day after 'end_date'"""
+    start = datetime.combine(start_date, time.min, tzinfo=timezone.utc)
+    end = datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    return start, end
+
+
+def load_prices(start, end, source='simple_history', currency_ids=None):
+    """(currency_ids, timestamps, prices) arrays of prices in [start, end) sorted by currency and time"""
+    if source == 'simple_history':
+        qs = Currency.history.filter(history_date__gte=start, history_date__lt=end).exclude(history_type='-')
+        fields = ('id', 'history_date', 'price')
+    elif source == 'price_history':
+        qs = PriceHistory.objects.filter(time__gte=start, time__lt=end)
+        fields = ('currency_id', 'time', 'price')
+    else:
+        raise ValueError(f'Unknown source "{source}". Use one of {SOURCES}')
+    if currency_ids is not None:
+        qs = qs.filter(**{f'{fields[0]}__in': currency_ids})
+    rows = qs.order_by(fields[0], fields[1]).values_list(*fields)
+    ids, timestamps, prices = list(), list(), list()
+    for currency_id, date, price in rows.iterator(chunk_size=10000):
+        if price is None:
+            continue
+        ids.append(currency_id)
+        timestamps.append(date.timestamp())
+        prices.append(price)
+    return (np.array(ids, dtype=np.int64),
+            np.array(timestamps, dtype=np.float64),
+            np.array(prices, dtype=np.float64))
+
+
+def aggregate(ids, timestamps, prices, seconds):
+    """
+    Candles of one interval from arrays sorted by (currency, time). Returns a dictionary of arrays with one item
+    per candle: currency, start, open, high, low, close and ticks.
+    """
+    if not len(ids):
+        return None
+    starts = (timestamps // seconds * seconds).astype(np.int64)
+    # A new candle begins where currency or bucket changes
+    boundary = np.empty(len(ids), dtype=bool)
+    boundary[0] = True
+    np.not_equal(ids[1:], ids[:-1], out=boundary[1:])
+    boundary[1:] |= starts[1:] != starts[:-1]
+    first = np.flatnonzero(boundary)
+    last = np.append(first[1:], len(ids)) - 1
+    return {
+        'currency': ids[first],
+        'start': starts[first],
+        'open': prices[first],
+        'high': np.maximum.reduceat(prices, first),
+        'low': np.minimum.reduceat(prices, first),
+        'close': prices[last],
+        'ticks': last - first + 1,
+    }
+
+
+def backfill_candles(start_date, end_date, intervals=None, source='simple_history', currency_ids=None,
+                     batch_size=1000):
+    """
+    Replace candles of whole days from 'start_date' to 'end_date' (both included) with candles aggregated from
+    'source'. Returns dictionary of interval to number of written candles.
+    """
+    start, end = day_range(start_date, end_date)
+    ids, timestamps, prices = load_prices(start, end, source=source, currency_ids=currency_ids)
+    intervals = intervals or list(INTERVALS)
+    written = dict()
+    with transaction.atomic():
+        old = Candle.objects.filter(interval__in=intervals, start__gte=start, start__lt=end)
+        if currency_ids is not None:
+            old = old.filter(currency_id__in=currency_ids)
+        old.delete()
+        for name in intervals:
+            candles = aggregate(ids, timestamps, prices, INTERVALS[name])
+            if candles is None:
+                written[name] = 0
+                continue
+            # Decimal fields convert floats with their repr: no binary float noise is saved
+            rows = [Candle(currency_id=int(c), interval=name, start=to_datetime(int(s)),
+                           open=repr(o), high=repr(h), low=repr(lo), close=repr(cl), ticks=int(n))
+                    for c, s, o, h, lo, cl, n in zip(candles['currency'], candles['start'], candles['open'].tolist(),
+                                                     candles['high'].tolist(), candles['low'].tolist(),
+                                                     candles['close'].tolist(), candles['ticks'])]
+            Candle.objects.bulk_create(rows, batch_size=batch_size)
+            written[name] = len(rows)
+    return written
@@ -0,0 +1,185 @@
+"""
+Incremental OHLCV candles of currency prices. 'CandleAggregator' keeps the open candle of every (symbol, interval)
+in memory and updates it in O(1) for every price tick, so charts read pre-aggregated 'Candle' rows instead of
+scanning raw ticks. The price ingestion process feeds it every cycle and saves changed candles with one upsert:
+    aggregator = CandleAggregator()
+    aggregator.add_ticks([('BTC', Decimal('20000.1'), time.time())])
+    aggregator.save()
+
+Candles are saved as deltas: 'open' of an existing row is kept, 'high'/'low' are merged and 'volume'/'ticks'
+are added, so restarting the process in the middle of a bucket does not reset the candle.
+Old candles are rebuilt from price history with 'python manage.py backfill_candles' (apps.currency.backfill).
+
+https://www.sqlite.org/lang_upsert.html
+https://www.postgresql.org/docs/current/sql-insert.html#SQL-ON-CONFLICT
+"""
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.db import connection, transaction
+
+from apps.currency.models import Candle, Currency
+
+# Interval name to its length in seconds. Every interval divides a day, so buckets are aligned to midnight UTC
+INTERVALS = {'1m': 60, '5m': 300, '1h': 3600, '1d': 86400}
+UPSERT_FIELDS = ['currency', 'interval', 'start', 'open', 'high', 'low', 'close', 'volume', 'ticks']
+# Scalar max/min functions of every vendor that supports 'ON CONFLICT'
+UPSERT_VENDORS = {'sqlite': ('MAX', 'MIN'), 'postgresql': ('GREATEST', 'LEAST')}
+
+
+def bucket_start(timestamp, seconds):
+    """Start (seconds since epoch) of the bucket that 'timestamp' is in"""
+    return int(timestamp // seconds * seconds)
+
+
+def to_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+class OpenCandle:
+    """In-memory candle of one bucket. 'volume' and 'ticks' are counted since the last save"""
+    __slots__ = ('start', 'open', 'high', 'low', 'close', 'volume', 'ticks')
+
+    def __init__(self, start, price, volume):
+        self.start = start
+        self.open = self.high = self.low = self.close = price
+        self.volume = volume
+        self.ticks = 1
+
+    def add(self, price, volume):
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += volume
+        self.ticks += 1
+
+
+class CandleAggregator:
+    """Aggregate price ticks of all symbols to candles of 'intervals' (all of 'INTERVALS' by default)"""
+
+    def __init__(self, intervals=None):
+        self.intervals = [(name, INTERVALS[name]) for name in (intervals or INTERVALS)]
+        # (symbol, interval) to its open candle
+        self.candles = dict()
+        # Candles that changed since the last save. Closed candles stay here until they are saved
+        self.dirty = dict()
+        self._currency_ids = dict()
+
+    def add_tick(self, symbol, price, timestamp, volume=0):
+        symbol = symbol.upper()
+        # Prices of CoinAPI json are floats: str() keeps their short repr instead of binary expansion
+        price = Decimal(str(price))
+        volume = Decimal(str(volume))
+        for name, seconds in self.intervals:
+            key = (symbol, name)
+            start = bucket_start(timestamp, seconds)
+            candle = self.candles.get(key)
+            if candle is not None and candle.start == start:
+                candle.add(price, volume)
+            elif candle is None or start > candle.start:
+                candle = self.candles[key] = OpenCandle(start, price, volume)
+            else:
+                # A late tick of a closed bucket is dropped: its candle may be already saved
+                continue
+            self.dirty[(symbol, name, start)] = candle
+
+    def add_ticks(self, ticks):
+        """Add (symbol, price, timestamp) or (symbol, price, timestamp, volume) tuples"""
+        for tick in ticks:
+            self.add_tick(*tick)
+
+    def currency_ids(self, symbols):
+        """Primary keys of 'Currency' rows of symbols. Symbols that are not in the database yet are skipped"""
+        missing = [s for s in symbols if s not in self._currency_ids]
+        if missing:
+            self._currency_ids.update(Currency.objects.filter(symbol__in=missing).values_list('symbol', 'id'))
+        return {s: self._currency_ids[s] for s in symbols if s in self._currency_ids}
+
+    def save(self, batch_size=500):
+        """
+        Upsert all changed candles. Their 'volume' and 'ticks' counters are reset only when the upsert is committed
+        (at the end of the outermost transaction), so a failed save is retried with the same deltas by the next one.
+        Open candles of symbols without a 'Currency' row are kept until the row is made (by 'flush_prices').
+        Returns number of saved candles.
+        """
+        if not self.dirty:
+            return 0
+        ids = self.currency_ids({symbol for symbol, _, _ in self.dirty})
+        rows, saved = list(), list()
+        for (symbol, name, start), candle in list(self.dirty.items()):
+            if symbol not in ids:
+                if self.candles[(symbol, name)] is not candle:
+                    del self.dirty[(symbol, name, start)]
+                continue
+            rows.append(Candle(currency_id=ids[symbol], interval=name, start=to_datetime(start),
+                               open=candle.open, high=candle.high, low=candle.low, close=candle.close,
+                               volume=candle.volume, ticks=candle.ticks))
+            saved.append(((symbol, name, start), candle, candle.volume, candle.ticks))
+        with transaction.atomic():
+            upsert_candles(rows, batch_size=batch_size)
+            transaction.on_commit(lambda: self._saved(saved))
+        return len(rows)
+
+    def _saved(self, saved):
+        """Subtract saved deltas from candles, the ones without ticks since they were saved are not dirty anymore"""
+        for key, candle, volume, ticks in saved:
+            candle.volume -= volume
+            candle.ticks -= ticks
+            if not candle.ticks and self.dirty.get(key) is candle:
+                del self.dirty[key]
+
+
+def _upsert_sql(batch_len):
+    qn = connection.ops.quote_name
+    greatest, least = UPSERT_VENDORS[connection.vendor]
+    table = qn(Candle._meta.db_table)
+    columns = [qn(Candle._meta.get_field(f).column) for f in UPSERT_FIELDS]
+    row = '(%s)' % ', '.join(['%s'] * len(UPSERT_FIELDS))
+    high, low, close, volume, ticks = (qn(f) for f in ('high', 'low', 'close', 'volume', 'ticks'))
+    return (f'INSERT INTO {table} ({", ".join(columns)}) VALUES {", ".join([row] * batch_len)} '
+            f'ON CONFLICT ({", ".join(columns[:3])}) DO UPDATE SET '
+            f'{high} = {greatest}({table}.{high}, EXCLUDED.{high}), '
+            f'{low} = {least}({table}.{low}, EXCLUDED.{low}), '
+            f'{close} = EXCLUDED.{close}, '
+            f'{volume} = {table}.{volume} + EXCLUDED.{volume}, '
+            f'{ticks} = {table}.{ticks} + EXCLUDED.{ticks}')
+
+
+def _orm_upsert(candles):
+    """Fallback for databases without 'ON CONFLICT'"""
+    for c in candles:
+        old = Candle.objects.select_for_update().filter(
+            currency_id=c.currency_id, interval=c.interval, start=c.start).first()
+        if old is None:
+            c.save()
+            continue
+        old.high, old.low, old.close = max(old.high, c.high), min(old.low, c.low), c.close
+        old.volume += c.volume
+        old.ticks += c.ticks
+        old.save(update_fields=['high', 'low', 'close', 'volume', 'ticks'])
+
+
+def upsert_candles(candles, batch_size=500):
+    """Insert unsaved 'Candle' instances or merge them into the saved candles of the same bucket"""
+    if connection.vendor not in UPSERT_VENDORS:
+        _orm_upsert(candles)
+        return
+    fields = [Candle._meta.get_field(f) for f in UPSERT_FIELDS]
+    with connection.cursor() as cursor:
+        for i in range(0, len(candles), batch_size):
+            batch = candles[i:i + batch_size]
+            params = [field.get_db_prep_save(getattr(c, field.attname), connection)
+                      for c in batch for field in fields]
+            cursor.execute(_upsert_sql(len(batch)), params)
+
+
+def get_candles(symbol, interval, start=None, end=None):
+    """Candles of a currency for an interval from oldest to newest (one range scan on the unique index)"""
+    qs = Candle.objects.filter(currency__symbol=symbol.upper(), interval=interval)
+    if start is not None:
+        qs = qs.filter(start__gte=start)
+    if end is not None:
+        qs = qs.filter(start__lt=end)
+    return qs.order_by('start')
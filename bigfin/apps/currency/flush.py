@@ -0,0 +1,124 @@
+"""
+Flush latest prices from redis price store into 'Currency' table. It replaces 'scripts/into_db.py' that was
+bypassing django (its own sqlite connection and table), scanning the whole redis keyspace with 'KEYS' and doing
+one INSERT and two LINDEX per coin.
+
+Now a flush is: one pipelined redis call for all tracked symbols, one query for names of new symbols that are
+taken, one 'INSERT ... ON CONFLICT DO UPDATE' statement per batch of currencies and one bulk insert of price
+history (apps.currency.history). Run it with:
+    python manage.py flush_prices
+or with celery 'flush_prices' task (apps.currency.tasks).
+
+https://www.sqlite.org/lang_upsert.html
+https://www.postgresql.org/docs/current/sql-insert.html#SQL-ON-CONFLICT
+https://django-simple-history.readthedocs.io/en/latest/common_issues.html#bulk-creating-and-queryset-updating
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.currency.history import record_prices
+from apps.currency.models import Currency
+from apps.currency.prices import PriceStore
+from bigfin.redis_pool import get_redis
+
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+UPSERT_FIELDS = ['name', 'symbol', 'price', 'time', 'founded', 'is_crypto']
+# Only these fields are changed when the symbol already exists
+UPDATE_FIELDS = ['price', 'time']
+UPSERT_VENDORS = ('sqlite', 'postgresql')
+
+
+def _upsert_sql(batch_len):
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(Currency._meta.get_field(f).column) for f in UPSERT_FIELDS)
+    row = '(%s)' % ', '.join(['%s'] * len(UPSERT_FIELDS))
+    updates = ', '.join('{0} = EXCLUDED.{0}'.format(qn(Currency._meta.get_field(f).column)) for f in UPDATE_FIELDS)
+    return (f'INSERT INTO {qn(Currency._meta.db_table)} ({columns}) VALUES {", ".join([row] * batch_len)} '
+            f'ON CONFLICT ({qn(Currency._meta.get_field("symbol").column)}) DO UPDATE SET {updates}')
+
+
+def _orm_upsert(currencies):
+    """Fallback for databases without 'ON CONFLICT': one bulk update and one bulk insert"""
+    existing = Currency.objects.in_bulk([c.symbol for c in currencies], field_name='symbol')
+    updated = list()
+    for c in currencies:
+        if c.symbol in existing:
+            old = existing[c.symbol]
+            old.price, old.time = c.price, c.time
+            updated.append(old)
+    Currency.objects.bulk_update(updated, UPDATE_FIELDS)
+    Currency.objects.bulk_create([c for c in currencies if c.symbol not in existing])
+
+
+def _without_name_collisions(currencies):
+    """
+    'Currency.name' is unique too, so a new symbol with the name of another symbol (in the database or earlier
+    in the list) would fail the INSERT of its whole batch. Such currencies are dropped (and logged) with one query.
+    Existing symbols are kept: their name is not written.
+    """
+    rows = Currency.objects.filter(Q(symbol__in=[c.symbol for c in currencies]) |
+                                   Q(name__in=[c.name for c in currencies])).values_list('symbol', 'name')
+    existing = {symbol for symbol, name in rows}
+    names = {name: symbol for symbol, name in rows}
+    kept = list()
+    for currency in currencies:
+        if currency.symbol in existing or names.setdefault(currency.name, currency.symbol) == currency.symbol:
+            kept.append(currency)
+        else:
+            logger.warning('Currency %s is not saved: its name "%s" is the name of %s', currency.symbol,
+                           currency.name, names[currency.name])
+    return kept
+
+
+def upsert_currencies(currencies, batch_size=500):
+    """
+    Insert 'Currency' instances or update price and time of the ones that their symbol already exists and return
+    the saved ones (new symbols with the name of another symbol are not saved).
+    'Currency.time' is 'auto_now' field but raw statements do not fill it, so instances must have 'time'.
+    """
+    currencies = _without_name_collisions(currencies)
+    if connection.vendor not in UPSERT_VENDORS:
+        _orm_upsert(currencies)
+        return currencies
+    fields = [Currency._meta.get_field(f) for f in UPSERT_FIELDS]
+    with connection.cursor() as cursor:
+        for i in range(0, len(currencies), batch_size):
+            batch = currencies[i:i + batch_size]
+            params = [field.get_db_prep_save(getattr(c, field.attname), connection)
+                      for c in batch for field in fields]
+            cursor.execute(_upsert_sql(len(batch)), params)
+    return currencies
+
+
+def flush_prices(symbols=None):
+    """
+    Save latest price of every tracked symbol (PRICE_INGESTION_ASSETS setting by default) in the database
+    and write one 'PriceHistory' row for every flushed currency. Returns number of flushed currencies.
+    """
+    symbols = symbols or settings.PRICE_INGESTION_ASSETS
+    ticks = PriceStore(get_redis()).latest_many(symbols)
+    if not ticks:
+        return 0
+    now = timezone.now()
+    currencies = [Currency(name=tick.name or symbol.lower(), symbol=symbol, price=tick.price, time=now,
+                           is_crypto=True)
+                  for symbol, tick in ticks.items()]
+    generic_history = settings.CURRENCY_GENERIC_HISTORY_ON_FLUSH
+    with transaction.atomic():
+        if generic_history:
+            existing = set(Currency.objects.filter(symbol__in=ticks).values_list('symbol', flat=True))
+        currencies = upsert_currencies(currencies)
+        saved = list(Currency.objects.filter(symbol__in=[c.symbol for c in currencies]))
+        record_prices(saved, time=now)
+        if generic_history:
+            # Historical rows of simple_history in bulk: '+' for new currencies and '~' for updated ones
+            Currency.history.bulk_history_create([c for c in saved if c.symbol not in existing], default_date=now)
+            Currency.history.bulk_history_create([c for c in saved if c.symbol in existing], update=True,
+                                                 default_date=now)
+    return len(currencies)
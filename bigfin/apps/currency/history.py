@@ -0,0 +1,50 @@
+"""
+Bulk price history of currencies. High-frequency price updates (every flush of ingested prices) must not go
+through simple_history: 'HistoricalRecords' writes one full row per instance in 'post_save' and is skipped by
+'bulk_update' and raw statements. Instead they are written here to compact 'PriceHistory' table with one
+INSERT statement for a whole batch of currencies. simple_history still records manual changes (eg: admin panel).
+    record_prices(currencies)
+    prune_prices(before=timezone.now() - timedelta(days=365))
+"""
+from django.db import connection
+from django.utils import timezone
+
+from apps.currency.models import PriceHistory
+
+
+INSERT_VENDORS = ('sqlite', 'postgresql')
+
+
+def _insert_sql(batch_len):
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(PriceHistory._meta.get_field(f).column) for f in ('currency', 'price', 'time'))
+    return (f'INSERT INTO {qn(PriceHistory._meta.db_table)} ({columns}) VALUES '
+            + ', '.join(['(%s, %s, %s)'] * batch_len))
+
+
+def record_prices(currencies, time=None, batch_size=5000):
+    """
+    Write one 'PriceHistory' row for every saved 'Currency' instance with its price at 'time' (default: the
+    instance 'time'). Django 'bulk_create' splits sqlite inserts to 333 rows for this table, so a raw multi-row
+    INSERT makes it one statement for up to 'batch_size' currencies. Returns number of written rows.
+    """
+    if connection.vendor not in INSERT_VENDORS:
+        rows = [PriceHistory(currency_id=c.pk, price=c.price, time=time or c.time) for c in currencies]
+        return len(PriceHistory.objects.bulk_create(rows))
+    price_field = PriceHistory._meta.get_field('price')
+    time_field = PriceHistory._meta.get_field('time')
+    with connection.cursor() as cursor:
+        for i in range(0, len(currencies), batch_size):
+            batch = currencies[i:i + batch_size]
+            params = list()
+            for c in batch:
+                params.extend((c.pk,
+                               price_field.get_db_prep_save(c.price, connection),
+                               time_field.get_db_prep_save(time or c.time or timezone.now(), connection)))
+            cursor.execute(_insert_sql(len(batch)), params)
+    return len(currencies)
+
+
+def prune_prices(before):
+    """Delete price history older than 'before' (a range delete on the 'time' index)"""
+    return PriceHistory.objects.filter(time__lt=before).delete()[0]
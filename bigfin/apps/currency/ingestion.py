@@ -0,0 +1,142 @@
+"""
+Price ingestion service. It replaces the old one-shot 'scripts/price_request.py' script.
+
+Instead of one blocking request for a hard-coded list of coins and up to three redis round-trips per coin, the
+'PriceIngestor' splits the asset universe into chunks, fetches all chunks concurrently over one pooled HTTP
+session and writes the whole cycle to the redis price store ('apps.currency.prices') with a single pipeline.
+The same pipeline publishes the JSON snapshot of latest prices of all assets that 'price_list' view serves.
+If a 'CandleAggregator' is given, ticks of every cycle also update OHLCV candles ('apps.currency.candles').
+If a 'publisher' is given (eg: 'apps.currency.streaming.publish_prices'), it's called with ticks of every cycle
+to stream them to websocket clients.
+The long-running process is started with 'python manage.py ingest_prices'.
+
+We use 'CoinAPI' apis here. Here is the docs: https://docs.coinapi.io/#md-docs
+Pooled sessions in 'requests': https://requests.readthedocs.io/en/latest/user/advanced/#transport-adapters
+Redis pipelines: https://github.com/redis/redis-py#pipelines
+"""
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from apps.currency.prices import PriceStore
+
+
+logger = logging.getLogger(__name__)
+
+ASSETS_PATH = '/v1/assets'
+
+
+def chunked(items, size):
+    """Split 'items' list to lists with maximum length of 'size'"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class PriceIngestor:
+    """Fetch prices of 'assets' from CoinAPI and cache them into redis"""
+
+    def __init__(self, redis_client, assets, base_url, api_key, chunk_size=50, concurrency=8, timeout=10,
+                 aggregator=None, publisher=None):
+        self.store = PriceStore(redis_client)
+        self.aggregator = aggregator
+        self.publisher = publisher
+        # Latest (name, price) of every symbol. A failed chunk keeps its previous prices in the snapshot
+        self.latest = dict()
+        self.assets = [asset.strip().upper() for asset in assets if asset.strip()]
+        self.url = base_url.rstrip('/') + ASSETS_PATH
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        # Every worker thread gets its own keep-alive connection from the session pool
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'X-CoinAPI-Key': api_key})
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='price-ingestion')
+
+    def fetch_chunk(self, symbols):
+        """Request one chunk of symbols. A failed chunk is logged and skipped: the rest of the cycle goes on"""
+        try:
+            r = self.session.get(self.url, params={'filter_asset_id': ','.join(symbols)}, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.warning('Could not get %d symbols from "coinAPI": %s', len(symbols), e)
+            return []
+        if r.status_code != 200:
+            logger.warning('There is a problem in answer from server (status %d)', r.status_code)
+            return []
+        try:
+            data = r.json()
+        except ValueError as e:
+            logger.warning('Answer of "coinAPI" for %d symbols is not JSON: %s', len(symbols), e)
+            return []
+        if not isinstance(data, list):
+            logger.warning('Answer of "coinAPI" for %d symbols is not a list', len(symbols))
+            return []
+        return [currency for currency in data if isinstance(currency, dict)]
+
+    def fetch(self):
+        """Fetch all chunks concurrently and return one flat list of currencies"""
+        data = list()
+        for currencies in self.executor.map(self.fetch_chunk, chunked(self.assets, self.chunk_size)):
+            data.extend(currencies)
+        return data
+
+    def write(self, data):
+        """
+        Write all received currencies to redis in one round-trip. Returns number of written currencies (entries
+        without a symbol, a name or a price are skipped)
+        """
+        now = time.time()
+        ticks = [(currency['asset_id'], currency['name'].lower(), currency['price_usd'], now)
+                 for currency in data
+                 if currency.get('asset_id') and currency.get('name') and currency.get('price_usd') is not None]
+        if ticks:
+            pipe = self.store.add_ticks(ticks, pipe=self.store.redis.pipeline(transaction=False))
+            self.latest.update((symbol.upper(), (name, price)) for symbol, name, price, _ in ticks)
+            self.store.publish_snapshot(self.latest, pipe=pipe)
+            pipe.execute()
+            if self.publisher is not None:
+                self.publisher(ticks)
+            if self.aggregator is not None:
+                self.aggregator.add_ticks((symbol, price, timestamp) for symbol, _, price, timestamp in ticks)
+        return len(ticks)
+
+    def run_cycle(self):
+        """Run one fetch-and-write cycle and return its statistics"""
+        start = time.perf_counter()
+        data = self.fetch()
+        fetched = time.perf_counter()
+        count = self.write(data)
+        written = time.perf_counter()
+        candles = self.aggregator.save() if self.aggregator is not None else 0
+        end = time.perf_counter()
+        return {'symbols': count, 'candles': candles, 'fetch': fetched - start, 'write': written - fetched,
+                'candles_write': end - written, 'total': end - start}
+
+    def run_forever(self, interval, cycles=None, on_cycle=None):
+        """
+        Run a cycle every 'interval' seconds. If 'cycles' is set, stop after that many cycles.
+        'on_cycle' is called with cycle number and statistics of the cycle after every successful cycle.
+        A failed cycle (eg: redis or the database is down) is logged and skipped, the process goes on.
+        """
+        done = 0
+        while cycles is None or done < cycles:
+            start = time.perf_counter()
+            done += 1
+            try:
+                stats = self.run_cycle()
+            except Exception:
+                logger.exception('Cycle %d failed', done)
+            else:
+                if on_cycle:
+                    on_cycle(done, stats)
+                logger.info('Cycle %d: %d symbols in %.3fs (fetch %.3fs, write %.3fs)',
+                            done, stats['symbols'], stats['total'], stats['fetch'], stats['write'])
+            if cycles is None or done < cycles:
+                time.sleep(max(0, interval - (time.perf_counter() - start)))
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
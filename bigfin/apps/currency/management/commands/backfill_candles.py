@@ -0,0 +1,43 @@
+"""
+Rebuild OHLCV candles of a date range from price history with NumPy (apps.currency.backfill):
+    python manage.py backfill_candles 2022-01-01 2022-01-31
+    python manage.py backfill_candles 2022-01-01 2022-01-01 --intervals 1m,5m --symbols BTC,ETH
+    python manage.py backfill_candles 2022-01-01 2022-01-31 --source price_history
+"""
+from datetime import date
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.currency.backfill import SOURCES, backfill_candles
+from apps.currency.candles import INTERVALS
+from apps.currency.models import Currency
+
+
+class Command(BaseCommand):
+    help = 'Rebuild candles of whole days from "start" to "end" (YYYY-MM-DD, both included) from price history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('start', type=date.fromisoformat)
+        parser.add_argument('end', type=date.fromisoformat)
+        parser.add_argument('--intervals', default=','.join(INTERVALS), help='Comma separated intervals')
+        parser.add_argument('--symbols', default=None, help='Comma separated symbols (default: all currencies)')
+        parser.add_argument('--source', default='simple_history', choices=SOURCES)
+
+    def handle(self, *args, **options):
+        if options['start'] > options['end']:
+            raise CommandError('"start" must not be after "end"')
+        intervals = [i.strip() for i in options['intervals'].split(',') if i.strip()]
+        unknown = set(intervals) - set(INTERVALS)
+        if unknown:
+            raise CommandError(f'Unknown intervals: {", ".join(sorted(unknown))}')
+        currency_ids = None
+        if options['symbols']:
+            symbols = [s.strip().upper() for s in options['symbols'].split(',')]
+            currency_ids = list(Currency.objects.filter(symbol__in=symbols).values_list('id', flat=True))
+        start = time.perf_counter()
+        written = backfill_candles(options['start'], options['end'], intervals=intervals,
+                                   source=options['source'], currency_ids=currency_ids)
+        for interval, count in written.items():
+            self.stdout.write(f'{interval}: {count} candles')
+        self.stdout.write(f'Done in {time.perf_counter() - start:.3f}s')
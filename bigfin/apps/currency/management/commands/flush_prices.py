@@ -0,0 +1,28 @@
+"""
+Save latest prices of tracked currencies from redis into the database. It replaces 'scripts/into_db.py':
+    python manage.py flush_prices
+    python manage.py flush_prices --assets BTC,ETH
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from redis import exceptions
+
+from apps.currency.flush import flush_prices
+
+import time
+
+
+class Command(BaseCommand):
+    help = 'Upsert latest prices of tracked currencies from redis into "Currency" table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--assets', default=None, help='Comma separated asset ids (default: all tracked assets)')
+
+    def handle(self, *args, **options):
+        symbols = options['assets'].split(',') if options['assets'] else None
+        start = time.perf_counter()
+        try:
+            count = flush_prices(symbols)
+        except (exceptions.ConnectionError, exceptions.TimeoutError):
+            raise CommandError('No connection made to redis...')
+        self.stdout.write(f'{count} currencies flushed in {time.perf_counter() - start:.3f}s')
@@ -0,0 +1,71 @@
+"""
+Long-running price ingestion process. It replaces 15 minutes cron of 'scripts/price_request.py':
+    python manage.py ingest_prices --interval 5
+    python manage.py ingest_prices --once --assets BTC,ETH,DOGE
+    python manage.py ingest_prices --assets-file assets.txt --base-url http://127.0.0.1:8765
+    python manage.py ingest_prices --no-candles --no-stream
+https://docs.djangoproject.com/en/3.2/howto/custom-management-commands/
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from redis import exceptions
+
+from apps.currency.candles import CandleAggregator
+from apps.currency.ingestion import PriceIngestor
+from apps.currency.streaming import publish_prices
+from bigfin.redis_pool import get_redis
+
+
+class Command(BaseCommand):
+    help = 'Fetch prices of tracked currencies from CoinAPI every "interval" seconds and cache them into redis'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=settings.PRICE_INGESTION_INTERVAL,
+                            help='Seconds between two cycles')
+        parser.add_argument('--assets', default=None, help='Comma separated asset ids')
+        parser.add_argument('--assets-file', default=None, help='File with one asset id per line')
+        parser.add_argument('--base-url', default=settings.COINAPI_BASE_URL)
+        parser.add_argument('--chunk-size', type=int, default=settings.PRICE_INGESTION_CHUNK_SIZE)
+        parser.add_argument('--concurrency', type=int, default=settings.PRICE_INGESTION_CONCURRENCY)
+        parser.add_argument('--cycles', type=int, default=None, help='Stop after this many cycles')
+        parser.add_argument('--once', action='store_true', help='Run just one cycle (same as --cycles 1)')
+        parser.add_argument('--no-candles', action='store_true', help='Do not update OHLCV candles')
+        parser.add_argument('--no-stream', action='store_true', help='Do not stream prices to websocket clients')
+
+    def get_assets(self, options):
+        if options['assets_file']:
+            with open(options['assets_file']) as f:
+                return [line.strip() for line in f if line.strip()]
+        if options['assets']:
+            return options['assets'].split(',')
+        return settings.PRICE_INGESTION_ASSETS
+
+    def report(self, cycle, stats):
+        self.stdout.write(f'Cycle {cycle}: {stats["symbols"]} symbols in {stats["total"]:.3f}s '
+                          f'(fetch {stats["fetch"]:.3f}s, write {stats["write"]:.3f}s, '
+                          f'{stats["candles"]} candles {stats["candles_write"]:.3f}s)')
+
+    def handle(self, *args, **options):
+        red = get_redis()
+        try:
+            red.ping()
+        except (exceptions.ConnectionError, exceptions.TimeoutError):
+            raise CommandError('No connection made to redis...')
+        ingestor = PriceIngestor(redis_client=red,
+                                 assets=self.get_assets(options),
+                                 base_url=options['base_url'],
+                                 api_key=settings.COINAPI_KEY,
+                                 chunk_size=options['chunk_size'],
+                                 concurrency=options['concurrency'],
+                                 timeout=settings.PRICE_INGESTION_TIMEOUT,
+                                 aggregator=None if options['no_candles'] else CandleAggregator(),
+                                 publisher=None if options['no_stream'] else publish_prices)
+        cycles = 1 if options['once'] else options['cycles']
+        self.stdout.write(f'Ingesting {len(ingestor.assets)} assets every {options["interval"]}s')
+        try:
+            ingestor.run_forever(interval=options['interval'], cycles=cycles, on_cycle=self.report)
+        except KeyboardInterrupt:
+            self.stdout.write('Price ingestion stopped')
+        finally:
+            ingestor.close()
@@ -18,3 +18,68 @@ class Currency(models.Model):
 
     def __str__(self):
         return f'{self.name}'.title()
+
+
+class PriceHistory(models.Model):
+    """
+    Compact price history of currencies. Unlike generic 'HistoricalCurrency' table of simple_history (a full copy
+    of the row plus user and change reason for every save) it has just currency, price and time and its
+    (currency, time) index serves range scans like 'prices of BTC between t1 and t2'.
+    Rows are written in bulk by 'apps.currency.history.record_prices'.
+    """
+    currency = models.ForeignKey('Currency',
+                                 related_name='price_history',
+                                 on_delete=models.CASCADE,
+                                 # Covered by the (currency, time) index
+                                 db_index=False,
+                                 verbose_name=_('currency'))
+    price = models.DecimalField(verbose_name=_('price (usd)'), max_digits=27, decimal_places=20)
+    time = models.DateTimeField(verbose_name=_('time'))
+
+    class Meta:
+        db_table = 'currency_price_history'
+        indexes = [
+            models.Index(fields=['currency', 'time'], name='price_history_currency_time'),
+            models.Index(fields=['time'], name='price_history_time'),
+        ]
+
+    def __str__(self):
+        return f'{self.currency_id}_{self.time}'
+
+
+class Candle(models.Model):
+    """
+    Open-high-low-close-volume candle of a currency price for one time bucket. Candles are updated incrementally
+    by 'apps.currency.candles.CandleAggregator' as price ticks arrive, so charts read these rows instead of
+    scanning raw ticks. 'ticks' is the number of price ticks in the bucket.
+    """
+    INTERVAL_CHOICES = [
+        ('1m', _('1 minute')),
+        ('5m', _('5 minutes')),
+        ('1h', _('1 hour')),
+        ('1d', _('1 day')),
+    ]
+
+    currency = models.ForeignKey('Currency',
+                                 related_name='candles',
+                                 on_delete=models.CASCADE,
+                                 # Covered by the unique (currency, interval, start) index
+                                 db_index=False,
+                                 verbose_name=_('currency'))
+    interval = models.CharField(verbose_name=_('interval'), max_length=2, choices=INTERVAL_CHOICES)
+    start = models.DateTimeField(verbose_name=_('bucket start'))
+    open = models.DecimalField(verbose_name=_('open'), max_digits=27, decimal_places=20)
+    high = models.DecimalField(verbose_name=_('high'), max_digits=27, decimal_places=20)
+    low = models.DecimalField(verbose_name=_('low'), max_digits=27, decimal_places=20)
+    close = models.DecimalField(verbose_name=_('close'), max_digits=27, decimal_places=20)
+    volume = models.DecimalField(verbose_name=_('volume'), max_digits=30, decimal_places=8, default=0)
+    ticks = models.PositiveIntegerField(verbose_name=_('ticks'), default=0)
+
+    class Meta:
+        db_table = 'currency_candle'
+        constraints = [
+            models.UniqueConstraint(fields=['currency', 'interval', 'start'], name='candle_currency_interval_start'),
+        ]
+
+    def __str__(self):
+        return f'{self.currency_id}_{self.interval}_{self.start}'
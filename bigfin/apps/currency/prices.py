@@ -0,0 +1,181 @@
+"""
+Redis price time-series store. Every currency has a 'sorted set' of ticks that its 'score' is tick timestamp
+(seconds since epoch) and its 'member' is '<timestamp>:<price>'. So unlike the old 3-slot redis lists
+([asset_id, price, data_end] overwritten in place) we keep history and can query it by time.
+Retention of every symbol is bounded both by number of ticks and by age of ticks.
+
+Every read method is exactly one redis round-trip:
+    store = PriceStore(redis_client)
+    store.latest('BTC')
+    store.latest_many(['BTC', 'ETH'])
+    store.last_n('BTC', 100)
+    store.between('BTC', t1, t2)
+    store.snapshot(['BTC', 'ETH'])
+    await PriceStore(await get_async_redis()).asnapshot(['BTC', 'ETH'])     # async views (aioredis)
+
+The ingestion also publishes a pre-serialized JSON snapshot of latest prices with its version (a hash of the
+body) in one redis hash, so 'price_list' view serves it with a single HMGET instead of building it per request.
+Every snapshot is a new hash renamed over the old one (RENAME is atomic), so it never has members of symbols that
+were dropped since the last one.
+
+https://redis.io/docs/data-types/sorted-sets/
+https://redis.io/commands/zrangebyscore/
+https://redis.io/commands/rename/
+"""
+from collections import namedtuple
+from decimal import Decimal
+import hashlib
+import json
+import time
+import uuid
+
+from django.conf import settings
+
+
+TICKS_KEY = 'prices:ticks:{}'
+NAMES_KEY = 'prices:names'
+# Fields: 'version', 'body' (the whole JSON object) and one '"<name>": <price>' JSON member per (upper case) symbol
+SNAPSHOT_KEY = 'prices:snapshot'
+
+# 'name' is only filled by 'latest' and 'latest_many'
+Tick = namedtuple('Tick', ['symbol', 'price', 'time', 'name'], defaults=[None])
+
+
+def ticks_key(symbol):
+    return TICKS_KEY.format(symbol.upper())
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _snapshot_symbols(symbols):
+    return None if symbols is None else [s.upper() for s in symbols]
+
+
+def _snapshot_fields(symbols):
+    return ['version', 'body'] if symbols is None else ['version', *symbols]
+
+
+def _to_snapshot(symbols, values):
+    """(version, body) of HMGET values of the snapshot hash"""
+    version, *members = values
+    if version is None:
+        return None
+    if symbols is None:
+        return _decode(version), _decode(members[0])
+    body = '{' + ', '.join(_decode(m) for m in members if m is not None) + '}'
+    key = hashlib.sha1(','.join(symbols).encode()).hexdigest()[:8]
+    return f'{_decode(version)}-{key}', body
+
+
+def _to_tick(symbol, member, score, name=None):
+    """Convert a sorted set member to a Tick"""
+    price = _decode(member).split(':', 1)[1]
+    return Tick(symbol, Decimal(price), score, _decode(name))
+
+
+class PriceStore:
+    """Access layer for price ticks of all currencies in redis"""
+
+    def __init__(self, redis_client, max_len=None, retention=None):
+        self.redis = redis_client
+        # Maximum number of ticks per symbol and maximum age of ticks in seconds
+        self.max_len = max_len or settings.PRICE_TICKS_MAX_LEN
+        self.retention = retention or settings.PRICE_TICKS_RETENTION
+
+    def add_ticks(self, ticks, pipe=None):
+        """
+        Add (symbol, name, price, timestamp) tuples to the store and trim old ticks. If a pipeline is given
+        commands are only queued on it, otherwise they are sent in one round-trip.
+        """
+        execute = pipe is None
+        if execute:
+            pipe = self.redis.pipeline(transaction=False)
+        names = dict()
+        for symbol, name, price, timestamp in ticks:
+            symbol = symbol.upper()
+            timestamp = timestamp or time.time()
+            key = ticks_key(symbol)
+            pipe.zadd(key, {f'{timestamp}:{price}': timestamp})
+            pipe.zremrangebyscore(key, '-inf', f'({timestamp - self.retention}')
+            pipe.zremrangebyrank(key, 0, -(self.max_len + 1))
+            if name:
+                names[symbol] = name
+        if names:
+            pipe.hset(NAMES_KEY, mapping=names)
+        if execute:
+            pipe.execute()
+        return pipe
+
+    def latest(self, symbol):
+        """Last tick of the symbol or None"""
+        return self.latest_many([symbol]).get(symbol.upper())
+
+    def latest_many(self, symbols):
+        """Dictionary of symbol to its last tick for every symbol that has any tick"""
+        symbols = [s.upper() for s in symbols]
+        if not symbols:
+            return dict()
+        pipe = self.redis.pipeline(transaction=False)
+        for symbol in symbols:
+            pipe.zrevrange(ticks_key(symbol), 0, 0, withscores=True)
+        pipe.hmget(NAMES_KEY, symbols)
+        *results, names = pipe.execute()
+        ticks = dict()
+        for symbol, result, name in zip(symbols, results, names):
+            if result:
+                member, score = result[0]
+                ticks[symbol] = _to_tick(symbol, member, score, name)
+        return ticks
+
+    def last_n(self, symbol, n):
+        """Last 'n' ticks of the symbol from oldest to newest"""
+        symbol = symbol.upper()
+        result = self.redis.zrevrange(ticks_key(symbol), 0, n - 1, withscores=True)
+        return [_to_tick(symbol, member, score) for member, score in reversed(result)]
+
+    def between(self, symbol, start, end):
+        """Ticks of the symbol with 'start' <= timestamp <= 'end' from oldest to newest"""
+        symbol = symbol.upper()
+        result = self.redis.zrangebyscore(ticks_key(symbol), start, end, withscores=True)
+        return [_to_tick(symbol, member, score) for member, score in result]
+
+    def publish_snapshot(self, prices, pipe=None):
+        """
+        Publish JSON snapshot of 'prices', a dictionary of symbol to (name, price). Members are serialized here
+        once and the snapshot is written to a new key that is renamed over the published one, so readers never see a
+        half-written snapshot and members of symbols that are not in 'prices' any more are dropped. If a pipeline
+        is given commands are only queued on it. Returns version of the snapshot.
+        """
+        members = {symbol.upper(): json.dumps({name: float(price)})[1:-1]
+                   for symbol, (name, price) in prices.items()}
+        body = '{' + ', '.join(members.values()) + '}'
+        version = hashlib.sha1(body.encode()).hexdigest()[:20]
+        # Every call has its own key, so concurrent publishers never write into each other's snapshot
+        new_key = f'{SNAPSHOT_KEY}:{uuid.uuid4().hex}'
+        execute = pipe is None
+        if execute:
+            pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(new_key, mapping={'version': version, 'body': body, **members})
+        pipe.rename(new_key, SNAPSHOT_KEY)
+        if execute:
+            pipe.execute()
+        return version
+
+    def snapshot(self, symbols=None):
+        """
+        (version, JSON body) of the published snapshot in one round-trip or None if nothing is published yet.
+        If 'symbols' is given body has only those symbols and version also depends on them.
+        """
+        symbols = _snapshot_symbols(symbols)
+        return _to_snapshot(symbols, self.redis.hmget(SNAPSHOT_KEY, _snapshot_fields(symbols)))
+
+    async def asnapshot(self, symbols=None):
+        """'snapshot' with an aioredis client"""
+        symbols = _snapshot_symbols(symbols)
+        return _to_snapshot(symbols, await self.redis.hmget(SNAPSHOT_KEY, *_snapshot_fields(symbols)))
+
+    def names(self):
+        """Dictionary of every tracked symbol to its currency name"""
+        return {_decode(k): _decode(v) for k, v in self.redis.hgetall(NAMES_KEY).items()}
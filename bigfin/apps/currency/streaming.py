@@ -0,0 +1,44 @@
+"""
+Fan-out of live prices over the channel layer. Every symbol has its own group and the ingestion process sends
+each price update once to the group of its symbol; channel layer delivers it to every subscribed websocket
+(apps.chat.consumers.PriceConsumer). Updates of one cycle are sent concurrently in one event loop run:
+    publish_prices([('BTC', 'bitcoin', 20000.1, time.time())])
+
+https://channels.readthedocs.io/en/stable/topics/channel_layers.html#groups
+"""
+import asyncio
+import re
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+
+GROUP_PREFIX = 'prices_'
+# Channel layer group names may only have ASCII alphanumerics, hyphens, underscores and periods
+SYMBOL_RE = re.compile(r'^[A-Z0-9\-_.]{1,50}$')
+
+
+def price_group(symbol):
+    return GROUP_PREFIX + symbol.upper()
+
+
+def valid_symbol(symbol):
+    return bool(SYMBOL_RE.match(symbol.upper()))
+
+
+def price_event(symbol, name, price, timestamp):
+    """Channel layer message of a price update. It's handled by 'price_update' method of consumers"""
+    return {'type': 'price.update', 'symbol': symbol.upper(), 'name': name, 'price': float(price),
+            'time': timestamp}
+
+
+async def apublish_prices(ticks, channel_layer=None):
+    """Send (symbol, name, price, timestamp) ticks to their groups concurrently"""
+    layer = channel_layer or get_channel_layer()
+    await asyncio.gather(*(layer.group_send(price_group(tick[0]), price_event(*tick))
+                           for tick in ticks if valid_symbol(tick[0])))
+
+
+def publish_prices(ticks, channel_layer=None):
+    """Sync version of 'apublish_prices' for the ingestion process"""
+    async_to_sync(apublish_prices)(ticks, channel_layer=channel_layer)
@@ -0,0 +1,9 @@
+from bigfin.celery import app
+
+from apps.currency.flush import flush_prices as flush
+
+
+@app.task(name='flush_prices')
+def flush_prices():
+    """Save latest prices of tracked currencies from redis into the database"""
+    return flush()
@@ -0,0 +1,141 @@
+"""
+OHLCV candles of price ticks (apps.currency.candles) and their backfill from price history (apps.currency.backfill)
+"""
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.db import DatabaseError, transaction
+from django.test import SimpleTestCase, TestCase
+
+import numpy as np
+
+from apps.currency import backfill, candles
+from apps.currency.candles import CandleAggregator, get_candles
+from apps.currency.history import record_prices
+from apps.currency.models import Candle, Currency
+
+# 2022-01-01 00:00:00 UTC
+DAY = 1640995200
+
+
+def to_tuples(queryset):
+    return [(c.start.timestamp() - DAY, c.open, c.high, c.low, c.close, c.volume, c.ticks) for c in queryset]
+
+
+class TestCandleAggregator(TestCase):
+    def setUp(self) -> None:
+        self.btc = Currency.objects.create(name='bitcoin', symbol='BTC')
+        self.aggregator = CandleAggregator(intervals=['1m', '1h'])
+
+    def save(self, aggregator=None):
+        """Save and commit: counters of candles are reset when the upsert is committed"""
+        with self.captureOnCommitCallbacks(execute=True):
+            return (aggregator or self.aggregator).save()
+
+    def test_candles(self):
+        self.aggregator.add_ticks([('btc', 10.5, DAY + 1, 1), ('BTC', 12, DAY + 20, 2), ('BTC', 9, DAY + 59),
+                                   ('BTC', 11, DAY + 60, '0.5')])
+        self.assertEqual(self.save(), 3)
+        self.assertEqual(to_tuples(get_candles('btc', '1m')),
+                         [(0, Decimal('10.5'), 12, 9, 9, 3, 3), (60, 11, 11, 11, 11, Decimal('0.5'), 1)])
+        self.assertEqual(to_tuples(get_candles('BTC', '1h')), [(0, Decimal('10.5'), 12, 9, 11, Decimal('3.5'), 4)])
+        self.assertEqual(self.save(), 0)
+
+    def test_late_ticks(self):
+        """Ticks of buckets older than the open candle are dropped"""
+        self.aggregator.add_ticks([('BTC', 10, DAY + 61), ('BTC', 20, DAY + 30), ('BTC', 11, DAY + 62)])
+        self.save()
+        self.assertEqual(to_tuples(get_candles('BTC', '1m')), [(60, 10, 11, 10, 11, 0, 2)])
+        # The late tick is in the open bucket of the longer interval
+        self.assertEqual(to_tuples(get_candles('BTC', '1h')), [(0, 10, 20, 10, 11, 0, 3)])
+
+    def assertMerges(self):
+        """Candles of a restarted process are merged into the saved candles of the same bucket"""
+        self.aggregator.add_ticks([('BTC', 10, DAY), ('BTC', 12, DAY + 10, 1)])
+        self.save()
+        self.aggregator.add_ticks([('BTC', 11, DAY + 20, 1)])
+        self.save()
+        restarted = CandleAggregator(intervals=['1m'])
+        restarted.add_ticks([('BTC', 8, DAY + 30, 2), ('BTC', 9, DAY + 40)])
+        self.save(restarted)
+        self.assertEqual(to_tuples(get_candles('BTC', '1m')), [(0, 10, 12, 8, 9, 4, 5)])
+
+    def test_restart(self):
+        self.assertMerges()
+
+    def test_restart_without_upsert(self):
+        """Databases without 'ON CONFLICT' merge with the ORM"""
+        with mock.patch.object(candles, 'UPSERT_VENDORS', dict()):
+            self.assertMerges()
+
+    def test_failed_save(self):
+        """Deltas of candles that were not committed are saved again by the next save"""
+        self.aggregator.add_ticks([('BTC', 10, DAY, 1), ('BTC', 12, DAY + 61, 2)])
+        with mock.patch.object(candles, 'upsert_candles', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.save()
+        # Rolled back with the transaction of the caller
+        with self.assertRaises(DatabaseError), self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.aggregator.save()
+                raise DatabaseError
+        self.assertFalse(Candle.objects.exists())
+        self.aggregator.add_ticks([('BTC', 11, DAY + 62, 1)])
+        self.assertEqual(self.save(), 3)
+        self.assertEqual(to_tuples(get_candles('BTC', '1m')), [(0, 10, 10, 10, 10, 1, 1), (60, 12, 12, 11, 11, 3, 2)])
+        self.assertEqual(to_tuples(get_candles('BTC', '1h')), [(0, 10, 12, 10, 11, 4, 3)])
+        self.assertEqual(self.save(), 0)
+
+    def test_unknown_symbols(self):
+        """Open candles of symbols without a currency row wait for it, closed ones are dropped"""
+        self.aggregator.add_ticks([('ETH', 1, DAY), ('ETH', 2, DAY + 60), ('BTC', 10, DAY)])
+        self.assertEqual(self.save(), 2)
+        Currency.objects.create(name='ethereum', symbol='ETH')
+        self.assertEqual(self.save(), 2)
+        self.assertEqual(to_tuples(get_candles('ETH', '1m')), [(60, 2, 2, 2, 2, 0, 1)])
+        self.assertEqual(to_tuples(get_candles('ETH', '1h')), [(0, 1, 2, 1, 2, 0, 2)])
+
+
+class TestAggregate(SimpleTestCase):
+    def aggregate(self, rows, seconds=60):
+        """Candles of (currency, timestamp, price) rows as (currency, start, open, high, low, close, ticks) tuples"""
+        ids, timestamps, prices = zip(*rows)
+        result = backfill.aggregate(np.array(ids, dtype=np.int64), np.array(timestamps, dtype=np.float64),
+                                    np.array(prices, dtype=np.float64), seconds)
+        columns = [result[name].tolist() for name in ('currency', 'start', 'open', 'high', 'low', 'close', 'ticks')]
+        return list(zip(*columns))
+
+    def test_boundaries(self):
+        """A candle ends where the currency or the bucket changes"""
+        rows = [(1, 0, 5), (1, 59.9, 7), (1, 60, 6), (1, 61, 4), (1, 180, 3),
+                # The same bucket of another currency right after the last candle of the previous one
+                (2, 180, 9), (2, 181, 8),
+                (3, 0, 1)]
+        self.assertEqual(self.aggregate(rows), [(1, 0, 5, 7, 5, 7, 2), (1, 60, 6, 6, 4, 4, 2), (1, 180, 3, 3, 3, 3, 1),
+                                                (2, 180, 9, 9, 8, 8, 2), (3, 0, 1, 1, 1, 1, 1)])
+        self.assertEqual(self.aggregate(rows, seconds=3600), [(1, 0, 5, 7, 3, 3, 5), (2, 0, 9, 9, 8, 8, 2),
+                                                              (3, 0, 1, 1, 1, 1, 1)])
+        self.assertEqual(self.aggregate([(1, 30, 2)]), [(1, 0, 2, 2, 2, 2, 1)])
+        self.assertIsNone(backfill.aggregate(np.array([]), np.array([]), np.array([]), 60))
+
+
+class TestBackfill(TestCase):
+    def test_backfill(self):
+        """Candles of the days are replaced by the ones of price history"""
+        btc = Currency.objects.create(name='bitcoin', symbol='BTC', price=10)
+        eth = Currency.objects.create(name='ethereum', symbol='ETH', price=1)
+        Candle.objects.create(currency=btc, interval='1m', start=datetime.fromtimestamp(DAY, tz=timezone.utc),
+                              open=1, high=1, low=1, close=1, volume=5, ticks=1)
+        # The last prices are of the next day
+        for offset, btc_price, eth_price in ((0, 10, 1), (30, 12, 2), (90, 11, 3), (86400, 13, 4)):
+            btc.price, eth.price = btc_price, eth_price
+            record_prices([btc, eth], time=datetime.fromtimestamp(DAY + offset, tz=timezone.utc))
+        written = backfill.backfill_candles(date(2022, 1, 1), date(2022, 1, 1), intervals=['1m', '1d'],
+                                            source='price_history', currency_ids=[btc.pk])
+        self.assertEqual(written, {'1m': 2, '1d': 1})
+        self.assertEqual(to_tuples(get_candles('BTC', '1m')), [(0, 10, 12, 10, 12, 0, 2), (60, 11, 11, 11, 11, 0, 1)])
+        self.assertEqual(to_tuples(get_candles('BTC', '1d')), [(0, 10, 12, 10, 11, 0, 3)])
+        self.assertFalse(get_candles('ETH', '1m').exists())
+        with self.assertRaises(ValueError):
+            backfill.load_prices(DAY, DAY, source='ticks')
@@ -0,0 +1,73 @@
+"""
+Flush of latest prices of the redis price store into 'Currency' (apps.currency.flush)
+"""
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+
+from apps.currency import flush
+from apps.currency.models import Currency
+from apps.currency.prices import PriceStore
+from bigfin.redis_pool import get_redis
+from bigfin.testing import RedisTestMixin
+
+
+class TestFlushPrices(RedisTestMixin, TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.store = PriceStore(get_redis())
+        self.btc = Currency.objects.create(name='bitcoin', symbol='BTC', founded='2009', price=1)
+
+    def prices(self):
+        return dict(Currency.objects.values_list('symbol', 'price'))
+
+    def assertFlushes(self):
+        """New symbols are inserted and only price and time of the existing ones change"""
+        self.assertEqual(flush.flush_prices(['BTC', 'ETH', 'DOGE']), 0)
+        self.store.add_ticks([('BTC', 'Bitcoin', '20000.5', 1000), ('ETH', 'Ethereum', '1500', 1000)])
+        self.assertEqual(flush.flush_prices(['BTC', 'ETH', 'DOGE']), 2)
+        self.assertEqual(self.prices(), {'BTC': Decimal('20000.5'), 'ETH': Decimal('1500')})
+        btc = Currency.objects.get(symbol='BTC')
+        self.assertEqual((btc.pk, btc.name, btc.founded, btc.is_crypto), (self.btc.pk, 'bitcoin', '2009', False))
+        self.assertIsNotNone(btc.time)
+        eth = Currency.objects.get(symbol='ETH')
+        self.assertEqual((eth.name, eth.is_crypto), ('Ethereum', True))
+
+        self.store.add_ticks([('ETH', None, '1600', 1001)])
+        self.assertEqual(flush.flush_prices(['BTC', 'ETH']), 2)
+        self.assertEqual(self.prices(), {'BTC': Decimal('20000.5'), 'ETH': Decimal('1600')})
+        self.assertEqual(Currency.objects.get(symbol='ETH').pk, eth.pk)
+
+    def test_flush(self):
+        self.assertFlushes()
+
+    def test_flush_without_upsert(self):
+        """Databases without 'ON CONFLICT' update and insert with the ORM"""
+        with mock.patch.object(flush, 'UPSERT_VENDORS', ()):
+            self.assertFlushes()
+
+    def test_batches(self):
+        """One upsert statement per batch (after one query for taken names)"""
+        currencies = [Currency(name=f'coin {number}', symbol=f'C{number}', price=number, time=self.btc.time)
+                      for number in range(5)]
+        with self.assertNumQueries(4):
+            self.assertEqual(flush.upsert_currencies(currencies, batch_size=2), currencies)
+        self.assertEqual(Currency.objects.count(), 6)
+
+    def assertSkipsTakenNames(self):
+        """New symbols with the name of another symbol are dropped, the rest of the batch is saved"""
+        self.store.add_ticks([('BTC', 'Bitcoin', '20000', 1000), ('XBT', 'bitcoin', '19999', 1000),
+                              ('ETH', 'Ethereum', '1500', 1000), ('ETC', 'Ethereum', '20', 1000),
+                              ('DOGE', 'Dogecoin', '0.1', 1000)])
+        with self.assertLogs(flush.logger, 'WARNING') as logs:
+            self.assertEqual(flush.flush_prices(['BTC', 'XBT', 'ETH', 'ETC', 'DOGE']), 3)
+        self.assertEqual(len(logs.output), 2)
+        self.assertEqual(self.prices(), {'BTC': Decimal('20000'), 'ETH': Decimal('1500'), 'DOGE': Decimal('0.1')})
+
+    def test_taken_names(self):
+        self.assertSkipsTakenNames()
+
+    def test_taken_names_without_upsert(self):
+        with mock.patch.object(flush, 'UPSERT_VENDORS', ()):
+            self.assertSkipsTakenNames()
@@ -0,0 +1,82 @@
+"""
+Bulk price history of currencies (apps.currency.history) and the history rows of price flushes
+"""
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.currency import history
+from apps.currency.flush import flush_prices
+from apps.currency.models import Currency, PriceHistory
+from apps.currency.prices import PriceStore
+from bigfin.redis_pool import get_redis
+from bigfin.testing import RedisTestMixin
+
+
+class TestPriceHistory(TestCase):
+    def setUp(self) -> None:
+        self.now = timezone.now()
+        self.currencies = [Currency.objects.create(name=f'coin {number}', symbol=f'C{number}', price=number)
+                           for number in range(5)]
+
+    def rows(self):
+        return list(PriceHistory.objects.order_by('id').values_list('currency_id', 'price', 'time'))
+
+    def assertRecords(self, queries):
+        with self.assertNumQueries(queries):
+            self.assertEqual(history.record_prices(self.currencies, time=self.now, batch_size=2), 5)
+        self.assertEqual(self.rows(), [(c.pk, Decimal(c.price), self.now) for c in self.currencies])
+        PriceHistory.objects.all().delete()
+        # Time of the instances by default
+        history.record_prices(self.currencies[:1])
+        self.assertEqual(self.rows(), [(self.currencies[0].pk, 0, self.currencies[0].time)])
+
+    def test_record_prices(self):
+        """One INSERT per batch"""
+        self.assertRecords(3)
+
+    def test_record_prices_without_insert(self):
+        """Other databases use 'bulk_create' (batches of the database)"""
+        with mock.patch.object(history, 'INSERT_VENDORS', ()):
+            self.assertRecords(1)
+
+    def test_prune_prices(self):
+        history.record_prices(self.currencies, time=self.now - timedelta(days=2))
+        history.record_prices(self.currencies, time=self.now)
+        self.assertEqual(history.prune_prices(before=self.now - timedelta(days=1)), 5)
+        self.assertEqual(set(PriceHistory.objects.values_list('time', flat=True)), {self.now})
+
+
+class TestFlushHistory(RedisTestMixin, TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.store = PriceStore(get_redis())
+        Currency.objects.create(name='bitcoin', symbol='BTC', price=1)
+        # Only rows of the flushes are checked
+        Currency.history.all().delete()
+
+    def flush(self, *ticks):
+        self.store.add_ticks(ticks)
+        flush_prices(['BTC', 'ETH'])
+        return Currency.objects.get(symbol='BTC').time
+
+    def test_flush_history(self):
+        """Every flush writes one price history row per flushed currency at the time of the flush"""
+        first = self.flush(('BTC', 'Bitcoin', '100', 1000), ('ETH', 'Ethereum', '10', 1000))
+        second = self.flush(('BTC', None, '101', 1001))
+        rows = PriceHistory.objects.order_by('id').values_list('currency__symbol', 'price', 'time')
+        self.assertEqual(list(rows), [('BTC', 100, first), ('ETH', 10, first), ('BTC', 101, second),
+                                      ('ETH', 10, second)])
+        self.assertFalse(Currency.history.exists())
+
+    @override_settings(CURRENCY_GENERIC_HISTORY_ON_FLUSH=True)
+    def test_generic_history(self):
+        """simple_history rows are also written in bulk: '+' for new currencies and '~' for updated ones"""
+        first = self.flush(('BTC', 'Bitcoin', '100', 1000), ('ETH', 'Ethereum', '10', 1000))
+        second = self.flush(('ETH', None, '11', 1001))
+        rows = Currency.history.order_by('history_id').values_list('symbol', 'history_type', 'price', 'history_date')
+        self.assertEqual(list(rows), [('ETH', '+', 10, first), ('BTC', '~', 100, first), ('BTC', '~', 100, second),
+                                      ('ETH', '~', 11, second)])
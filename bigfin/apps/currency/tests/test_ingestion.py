@@ -0,0 +1,75 @@
+"""
+Price ingestion (apps.currency.ingestion): failed chunks, failed cycles and malformed entries do not stop the ingestion
+"""
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from apps.currency.ingestion import PriceIngestor
+
+import requests
+
+
+class TestPriceIngestor(SimpleTestCase):
+    def setUp(self) -> None:
+        self.ingestor = PriceIngestor(mock.MagicMock(), ['btc', 'eth', ' '], 'http://coinapi.test/', 'key',
+                                      chunk_size=1, concurrency=2)
+        self.addCleanup(self.ingestor.close)
+
+    def response(self, status_code=200, data=None, text=None):
+        response = mock.Mock(status_code=status_code)
+        if text is None:
+            response.json.return_value = data
+        else:
+            response.json.side_effect = ValueError(f'Expecting value: {text}')
+        return response
+
+    def test_fetch_chunk_errors(self):
+        """Errors of a chunk are logged and the chunk has no currencies"""
+        results = {
+            'connection': requests.ConnectionError('refused'),
+            'redirects': requests.TooManyRedirects('redirects'),
+            'status': self.response(status_code=500),
+            'html': self.response(text='<html>'),
+            'object': self.response(data={'error': 'quota'}),
+        }
+        for name, result in results.items():
+            with self.subTest(name), mock.patch.object(self.ingestor.session, 'get', side_effect=[result]), \
+                    self.assertLogs('apps.currency.ingestion', 'WARNING'):
+                self.assertEqual(self.ingestor.fetch_chunk(['BTC']), [])
+        currency = {'asset_id': 'BTC', 'name': 'Bitcoin', 'price_usd': 100}
+        with mock.patch.object(self.ingestor.session, 'get', return_value=self.response(data=[currency, 'BTC'])):
+            self.assertEqual(self.ingestor.fetch_chunk(['BTC']), [currency])
+
+    def test_fetch(self):
+        """Chunks are fetched concurrently and a failed chunk does not fail the others"""
+        def get(url, params, timeout):
+            if params['filter_asset_id'] == 'ETH':
+                return self.response(text='')
+            return self.response(data=[{'asset_id': 'BTC', 'name': 'Bitcoin', 'price_usd': 100}])
+
+        with mock.patch.object(self.ingestor.session, 'get', side_effect=get), self.assertLogs(level='WARNING'):
+            self.assertEqual([currency['asset_id'] for currency in self.ingestor.fetch()], ['BTC'])
+
+    def test_write_skips_malformed_entries(self):
+        """Entries without a symbol, a name or a price do not drop the other ticks of the cycle"""
+        data = [{'asset_id': 'BTC', 'name': 'Bitcoin', 'price_usd': 100}, {'asset_id': 'ETH', 'price_usd': 10},
+                {'name': 'Dogecoin', 'price_usd': 1}, {'asset_id': 'XRP', 'name': None, 'price_usd': 1},
+                {'asset_id': 'LTC', 'name': 'Litecoin', 'price_usd': None}, {'asset_id': 'SOL', 'name': 'Solana'}]
+        ticks = list()
+        self.ingestor.publisher = ticks.extend
+        self.assertEqual(self.ingestor.write(data), 1)
+        self.assertEqual([tick[:3] for tick in ticks], [('BTC', 'bitcoin', 100)])
+        self.assertEqual(self.ingestor.latest, {'BTC': ('bitcoin', 100)})
+
+    def test_run_forever_skips_failed_cycles(self):
+        """An error of a cycle (eg: redis or the database is down) is logged and next cycles run"""
+        stats = {'symbols': 1, 'candles': 0, 'fetch': 0.0, 'write': 0.0, 'candles_write': 0.0, 'total': 0.0}
+        cycles = list()
+        with mock.patch.object(self.ingestor, 'run_cycle', side_effect=[stats, OSError('redis'), stats]), \
+                mock.patch('apps.currency.ingestion.time.sleep') as sleep, \
+                self.assertLogs('apps.currency.ingestion', 'ERROR') as logs:
+            self.ingestor.run_forever(1, cycles=3, on_cycle=lambda cycle, stats: cycles.append(cycle))
+        self.assertEqual(cycles, [1, 3])
+        self.assertEqual(sleep.call_count, 2)
+        self.assertIn('Cycle 2 failed', logs.output[0])
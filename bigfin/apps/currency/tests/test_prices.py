@@ -0,0 +1,61 @@
+"""
+Redis price store (apps.currency.prices)
+"""
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from apps.currency.prices import SNAPSHOT_KEY, PriceStore, Tick
+from bigfin.redis_pool import get_redis
+from bigfin.testing import RedisTestMixin
+
+
+class TestPriceStore(RedisTestMixin, SimpleTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.store = PriceStore(get_redis(), max_len=3, retention=100)
+
+    def test_trim(self):
+        """Ticks are trimmed to the last 'max_len' ones and to 'retention' seconds before the newest tick"""
+        self.store.add_ticks([('btc', 'Bitcoin', f'{number}.5', 1000 + number) for number in range(5)])
+        self.assertEqual([tick.time for tick in self.store.last_n('BTC', 10)], [1002, 1003, 1004])
+        self.store.add_ticks([('BTC', None, '7', 1150)])
+        self.assertEqual(self.store.last_n('btc', 10), [Tick('BTC', Decimal('7'), 1150)])
+        # A tick exactly 'retention' seconds old is kept
+        self.store.add_ticks([('BTC', None, '8', 1250)])
+        self.assertEqual([tick.price for tick in self.store.last_n('BTC', 10)], [Decimal('7'), Decimal('8')])
+
+    def test_latest_many(self):
+        self.assertEqual(self.store.latest_many([]), dict())
+        self.store.add_ticks([('BTC', 'Bitcoin', '100', 1000), ('BTC', None, '101.25', 1001),
+                              ('eth', 'Ethereum', '10', 1000)])
+        self.assertEqual(self.store.latest_many(['btc', 'ETH', 'DOGE']),
+                         {'BTC': Tick('BTC', Decimal('101.25'), 1001, 'Bitcoin'),
+                          'ETH': Tick('ETH', Decimal('10'), 1000, 'Ethereum')})
+        self.assertEqual(self.store.latest('eth').price, Decimal('10'))
+        self.assertIsNone(self.store.latest('DOGE'))
+        self.assertEqual(self.store.names(), {'BTC': 'Bitcoin', 'ETH': 'Ethereum'})
+
+    def test_between(self):
+        """Both ends are included, ticks are from oldest to newest"""
+        self.store.add_ticks([('BTC', None, str(number), 1000 + number) for number in (2, 0, 1)])
+        self.assertEqual([(tick.price, tick.time) for tick in self.store.between('btc', 1000, 1001)],
+                         [(Decimal('0'), 1000), (Decimal('1'), 1001)])
+        self.assertEqual(len(self.store.between('BTC', 1000.5, 1002)), 2)
+        self.assertEqual(self.store.between('BTC', 1003, 1010), list())
+        self.assertEqual(self.store.between('ETH', 0, 2000), list())
+
+    def test_snapshot(self):
+        version = self.store.publish_snapshot({'btc': ('Bitcoin', 100), 'ETH': ('Ethereum', 10)})
+        self.assertEqual(self.store.snapshot(), (version, '{"Bitcoin": 100.0, "Ethereum": 10.0}'))
+        self.assertEqual(self.store.snapshot(['eth'])[1], '{"Ethereum": 10.0}')
+
+        # Dropped symbols are not in the next snapshot
+        pipe = self.store.redis.pipeline(transaction=False)
+        new_version = self.store.publish_snapshot({'BTC': ('Bitcoin', 101)}, pipe=pipe)
+        self.assertEqual(self.store.snapshot()[0], version)
+        pipe.execute()
+        self.assertEqual(self.store.snapshot(), (new_version, '{"Bitcoin": 101.0}'))
+        self.assertEqual(self.store.snapshot(['ETH'])[1], '{}')
+        self.assertEqual(self.store.redis.hkeys(SNAPSHOT_KEY), [b'version', b'body', b'BTC'])
+        self.assertEqual(self.store.redis.keys(), [SNAPSHOT_KEY.encode()])
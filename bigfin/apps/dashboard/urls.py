@@ -8,4 +8,7 @@ app_name = 'dashboard'
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('dashboard/change/', views.dashboard_change, name='dashboard_change'),
+    path('tickets/', views.tickets, name='tickets'),
+    path('tickets/users/', views.user_tickets, name='user_tickets'),
+    path('tickets/groups/', views.group_tickets, name='group_tickets'),
 ]
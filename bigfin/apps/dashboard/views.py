@@ -2,11 +2,20 @@
 Django views does not support DRF authentication tokens. But with a little work we can do this.
 but we should remember that it's better to have a only full stack django project or only client-
 server based project.
+
+Support dashboards ('tickets', 'users' and 'groups' views) read counters that are kept up to date when tickets and
+answers change (see 'apps.ticketing.counters'), so every row of a page is read as it is: no 'COUNT(*)' of answers
+or tickets per row. Pages are '?limit=50&offset=100'.
 """
 from django.shortcuts import render, HttpResponse
 from django.http import JsonResponse
 
 from apps.accounts.logins import token_login
+from apps.ticketing.models import TicketCounter, Ticketing
+
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
 
 
 def dashboard(request):
@@ -19,3 +28,55 @@ def dashboard(request):
 def dashboard_change(request):
     """Dashboard change test"""
     return HttpResponse('<h2><b>Change in dashboard settings</b></h2>')
+
+
+def staff_error(request):
+    """Error response if user of the request (logged in with token or session) is not staff, else None"""
+    logged_in, message = token_login(request)
+    if not logged_in:
+        return JsonResponse(data={'detail': message}, status=401)
+    if not request.user.is_staff:
+        return JsonResponse(data={'detail': 'Only staff can see support dashboards'}, status=403)
+    return None
+
+
+def page(request, queryset):
+    """A limit/offset page of '.values()' rows. One more row is fetched to know if there is a next page"""
+    try:
+        limit = min(max(int(request.GET.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        offset = max(int(request.GET.get('offset', 0)), 0)
+    except ValueError:
+        limit, offset = DEFAULT_LIMIT, 0
+    rows = list(queryset[offset:offset + limit + 1])
+    return JsonResponse(data={'limit': limit, 'offset': offset, 'has_next': len(rows) > limit,
+                              'results': rows[:limit]})
+
+
+def tickets(request):
+    """Newest tickets with number and time of their answers. Only open tickets with '?open=1'"""
+    error = staff_error(request)
+    if error:
+        return error
+    queryset = Ticketing.objects.order_by('-created', '-id')
+    if request.GET.get('open') in ('1', 'true', 'True'):
+        queryset = queryset.filter(is_answered=False)
+    return page(request, queryset.values('id', 'ticket_id', 'title', 'emergency', 'user_id', 'group_id',
+                                         'is_answered', 'answers_count', 'last_answered', 'created'))
+
+
+def user_tickets(request):
+    """Users with most open tickets first"""
+    error = staff_error(request)
+    if error:
+        return error
+    queryset = TicketCounter.objects.filter(user__isnull=False).order_by('-open_tickets', '-id')
+    return page(request, queryset.values('user_id', 'user__username', 'tickets', 'open_tickets'))
+
+
+def group_tickets(request):
+    """Groups with most open tickets first"""
+    error = staff_error(request)
+    if error:
+        return error
+    queryset = TicketCounter.objects.filter(group__isnull=False).order_by('-open_tickets', '-id')
+    return page(request, queryset.values('group_id', 'group__name', 'tickets', 'open_tickets'))
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class TicketingConfig(AppConfig):
@@ -6,3 +7,6 @@ class TicketingConfig(AppConfig):
 
     def ready(self):
         from . import signals
+        from .search import create_search_index
+        # The search table is not a model, so it is created after every 'migrate' (if it does not exist)
+        post_migrate.connect(create_search_index, sender=self)
@@ -0,0 +1,111 @@
+"""
+Counters of tickets for support dashboards. Counting answers of every ticket and open tickets of every user or
+group on each dashboard request means a 'COUNT(*)' (or 'MAX(created)') per row, so the numbers are kept up to date
+when tickets and answers are created, changed or deleted (see 'signals.py'):
+- 'Ticketing.answers_count' and 'Ticketing.last_answered' of every ticket
+- 'TicketCounter' rows: number of tickets and open (not answered) tickets of every user and group
+Every change is a single 'UPDATE ... SET x = x + n' (F expressions), so concurrent writers do not lose counts, and it
+runs in the transaction of the saved or deleted row (see 'Ticketing.save' and 'Answer.save').
+https://docs.djangoproject.com/en/3.2/ref/models/expressions/#avoiding-race-conditions-using-f
+
+Rows written without model signals (eg: 'bulk_create', 'QuerySet.update' or raw SQL) are counted again with:
+    python manage.py reconcile_ticket_counters
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from apps.ticketing.models import Answer, TicketCounter, Ticketing
+
+
+def add(user_id=None, group_id=None, tickets=0, open_tickets=0, create=True):
+    """
+    Add 'tickets' and 'open_tickets' to counters of the user and the group (any of them can be None). Missing
+    counter rows are made if 'create' is True.
+    """
+    for field, value in (('user_id', user_id), ('group_id', group_id)):
+        if value is None:
+            continue
+        counter = TicketCounter.objects.filter(**{field: value})
+        changes = {'tickets': F('tickets') + tickets, 'open_tickets': F('open_tickets') + open_tickets}
+        if counter.update(**changes) or not create:
+            continue
+        try:
+            with transaction.atomic():
+                TicketCounter.objects.create(**{field: value, 'tickets': tickets, 'open_tickets': open_tickets})
+        except IntegrityError:
+            # A concurrent transaction made the row after our UPDATE
+            counter.update(**changes)
+
+
+def ticket_created(ticket):
+    add(ticket.user_id, ticket.group_id, tickets=1, open_tickets=int(not ticket.is_answered))
+
+
+def ticket_deleted(ticket):
+    # Counters of a deleted user or group are deleted with it (cascade), they are not made again
+    add(ticket.user_id, ticket.group_id, tickets=-1, open_tickets=-int(not ticket.is_answered), create=False)
+
+
+def ticket_changed(old, ticket):
+    """'old' is (user_id, group_id, is_answered) of the ticket before it was changed"""
+    user_id, group_id, is_answered = old
+    if old == (ticket.user_id, ticket.group_id, ticket.is_answered):
+        return
+    add(user_id, group_id, tickets=-1, open_tickets=-int(not is_answered), create=False)
+    ticket_created(ticket)
+
+
+def answer_created(answer):
+    """
+    Count the answer on its ticket and set 'is_answered' of the ticket (True for answers of staff and False for
+    answers of customers). The ticket is changed with one UPDATE; only if 'is_answered' flips, open tickets of
+    its user and group are changed with a second one.
+    """
+    is_answered = answer.user.is_staff
+    ticket = Ticketing.objects.filter(pk=answer.ticketing_id)
+    changes = {'answers_count': F('answers_count') + 1, 'last_answered': answer.created}
+    if ticket.filter(is_answered=not is_answered).update(is_answered=is_answered, **changes):
+        owners = Q(user_id=Subquery(ticket.values('user_id'))) | Q(group_id=Subquery(ticket.values('group_id')))
+        TicketCounter.objects.filter(owners).update(open_tickets=F('open_tickets') + (-1 if is_answered else 1))
+    else:
+        ticket.update(**changes)
+    return is_answered
+
+
+def answer_deleted(answer):
+    """Uncount the answer on its ticket ('last_answered' becomes time of the newest remaining answer)"""
+    refresh_tickets([answer.ticketing_id])
+
+
+def refresh_tickets(ticket_ids):
+    """Count answers of the tickets again (eg: after answers are moved to another ticket)"""
+    Ticketing.objects.filter(pk__in=ticket_ids).update(**ticket_counter_values())
+
+
+def ticket_counter_values():
+    """Expressions of 'answers_count' and 'last_answered' of a ticket computed from its answers"""
+    answers = Answer.objects.filter(ticketing_id=OuterRef('pk')).order_by()
+    return {
+        'answers_count': Coalesce(Subquery(answers.values('ticketing_id').annotate(count=Count('id'))
+                                           .values('count')), 0),
+        'last_answered': Subquery(answers.order_by('-created', '-id').values('created')[:1]),
+    }
+
+
+def reconcile():
+    """
+    Count everything again from tickets and answers: answer counters of all tickets are set with one UPDATE and
+    'TicketCounter' rows are made again from two grouped queries. Returns (tickets, counters) numbers of rows.
+    """
+    with transaction.atomic():
+        tickets = Ticketing.objects.update(**ticket_counter_values())
+        TicketCounter.objects.all().delete()
+        counters = list()
+        for field in ('user', 'group'):
+            rows = (Ticketing.objects.filter(**{f'{field}__isnull': False}).order_by().values(field)
+                    .annotate(tickets=Count('id'), open_tickets=Count('id', filter=Q(is_answered=False))))
+            counters.extend(TicketCounter(**{f'{field}_id': row[field]}, tickets=row['tickets'],
+                                          open_tickets=row['open_tickets']) for row in rows)
+        TicketCounter.objects.bulk_create(counters, batch_size=1000)
+    return tickets, len(counters)
@@ -0,0 +1,219 @@
+"""
+Read-only list serializers of tickets and answers. TicketingSerializer and AnswerSerializer build every row with
+the full HyperlinkedModelSerializer machinery: model instances, bound fields (write-only 'file_N' and 'caption_N'
+fields included) and one 'reverse()' for every hyperlink of every row. For 'list' actions we build exactly the
+same JSON from '.values()' rows instead:
+- Every hyperlink is made from a url template that is reversed once per response.
+- Nested users are built once for every distinct user.
+- Answers and files of the page are loaded with one query each, only the columns needed for the links.
+Create, retrieve and update still use the serializers in 'serializers.py'. Hits of the search index
+(apps.ticketing.search) are serialized with 'FastSearchResultSerializer'.
+https://docs.djangoproject.com/en/3.2/ref/models/querysets/#values
+https://www.django-rest-framework.org/api-guide/relations/#hyperlinkedrelatedfield
+"""
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from rest_framework import serializers
+from rest_framework.relations import PKOnlyObject
+from rest_framework.reverse import reverse
+
+from apps.ticketing.models import Answer, FileUpload, Ticketing
+from apps.ticketing.search import ANSWER, KIND_NAMES, TICKET
+
+
+# Fields of UserSerializer that are shown (in this order) for the nested 'user' objects
+USER_FIELDS = ('username', 'email', 'name', 'is_active', 'is_staff', 'is_admin', 'is_superuser')
+TICKETING_FIELDS = ('id', 'ticket_id', 'title', 'emergency', 'message', 'is_published', 'is_answered', 'created',
+                    'answers_count', 'last_answered', 'group_id', 'user_id') + tuple(f'user__{name}' for name in USER_FIELDS)
+ANSWER_FIELDS = ('id', 'message', 'created', 'user_id') + tuple(f'user__{name}' for name in USER_FIELDS) + \
+                tuple(f'ticketing__{name}' for name in TICKETING_FIELDS)
+# Any string that is a valid 'pk' of router urls and is never part of a host or path
+PK_PLACEHOLDER = '__pk__'
+
+
+def ticketing_values(queryset):
+    """'queryset' of tickets as rows that 'FastTicketingSerializer' needs"""
+    return queryset.prefetch_related(None).values(*TICKETING_FIELDS)
+
+
+def answer_values(queryset):
+    """'queryset' of answers as rows that 'FastAnswerSerializer' needs"""
+    return queryset.prefetch_related(None).values(*ANSWER_FIELDS)
+
+
+class FastListSerializer:
+    """
+    Base of the fast serializers. Like a DRF serializer it gets 'instance' (here a list of '.values()' rows) and
+    'context' (the same context of the view) and the output is in 'data'. 'represent' builds the output of all rows
+    with the helpers of the serializer: 'represent(serializer, rows)'.
+    """
+
+    def __init__(self, instance, context, represent):
+        self.instance = list(instance)
+        self.context = context
+        self.represent = represent
+        self.request = context.get('request')
+        self.format = context.get('format')
+        self.templates = dict()
+        self.users = dict()
+        self.group_field = None
+        self.datetime_field = serializers.DateTimeField()
+
+    @property
+    def data(self):
+        return self.to_representation(self.instance)
+
+    def to_representation(self, rows):
+        return self.represent(self, rows)
+
+    def url(self, view_name, pk):
+        """Same url as 'reverse(view_name, kwargs={"pk": pk})' of a HyperlinkedRelatedField"""
+        template = self.templates.get(view_name)
+        if template is None:
+            url = reverse(view_name, kwargs={'pk': PK_PLACEHOLDER}, request=self.request, format=self.format)
+            template = self.templates[view_name] = url.split(PK_PLACEHOLDER, 1)
+        return f'{template[0]}{pk}{template[1]}'
+
+    def user(self, row, prefix='user__'):
+        """Nested user just like UserSerializer, built once for every user"""
+        user = self.users.get(row[f'{prefix[:-2]}_id'])
+        if user is None:
+            username = row[f'{prefix}username']
+            # Usernames are not numbers and are quoted in the url, so they are reversed as DRF does
+            user = {'url': reverse('accounts:user-detail', kwargs={'username': username},
+                                   request=self.request, format=self.format)}
+            for name in USER_FIELDS:
+                user[name] = row[f'{prefix}{name}']
+            self.users[row[f'{prefix[:-2]}_id']] = user
+        return user
+
+    def datetime(self, value):
+        """Like DateTimeField of a serializer, None is not formatted"""
+        return None if value is None else self.datetime_field.to_representation(value)
+
+    def group(self, group_id):
+        if group_id is None:
+            return None
+        # Tickets with group are rare, so the 'group' field of TicketingSerializer builds its hyperlink
+        if self.group_field is None:
+            from apps.ticketing.serializers import TicketingSerializer
+            self.group_field = TicketingSerializer(context=self.context).fields['group']
+        return self.group_field.to_representation(PKOnlyObject(pk=group_id))
+
+    def answer_links(self, ticket_ids):
+        """Urls of answers of every ticket in one query"""
+        links = defaultdict(list)
+        answers = Answer.objects.filter(ticketing_id__in=ticket_ids).order_by('id').values_list('ticketing_id', 'id')
+        for ticketing_id, answer_id in answers:
+            links[ticketing_id].append(self.url('ticketing:answer-detail', answer_id))
+        return links
+
+    def file_links(self, model, object_ids):
+        """Urls of files of every 'model' object in one query"""
+        links = defaultdict(list)
+        files = FileUpload.objects.filter(content_type=ContentType.objects.get_for_model(model),
+                                          object_id__in=object_ids).order_by('id').values_list('object_id', 'id')
+        for object_id, file_id in files:
+            links[object_id].append(self.url('ticketing:fileupload-detail', file_id))
+        return links
+
+    def ticketing(self, row, answer_links, file_links, prefix=''):
+        """A ticket in the same order and format of TicketingSerializer fields"""
+        ticket_id = row[f'{prefix}id']
+        return {
+            'url': self.url('ticketing:ticketing-detail', ticket_id),
+            'ticketing_answers': answer_links.get(ticket_id, []),
+            'files': file_links.get(ticket_id, []),
+            'user': self.user(row, f'{prefix}user__'),
+            'ticket_id': str(row[f'{prefix}ticket_id']),
+            'title': row[f'{prefix}title'],
+            'emergency': row[f'{prefix}emergency'],
+            'message': row[f'{prefix}message'],
+            'is_published': row[f'{prefix}is_published'],
+            'is_answered': row[f'{prefix}is_answered'],
+            'created': self.datetime_field.to_representation(row[f'{prefix}created']),
+            'answers_count': row[f'{prefix}answers_count'],
+            'last_answered': self.datetime(row[f'{prefix}last_answered']),
+            'group': self.group(row[f'{prefix}group_id']),
+        }
+
+
+def represent_tickets(serializer, rows):
+    """Rows of 'ticketing_values' as 'TicketingSerializer(many=True)' does"""
+    ticket_ids = [row['id'] for row in rows]
+    answer_links = serializer.answer_links(ticket_ids)
+    file_links = serializer.file_links(Ticketing, ticket_ids)
+    return [serializer.ticketing(row, answer_links, file_links) for row in rows]
+
+
+def represent_answers(serializer, rows):
+    """Rows of 'answer_values' as 'AnswerSerializer(many=True)' does"""
+    ticket_ids = {row['ticketing__id'] for row in rows}
+    answer_links = serializer.answer_links(ticket_ids)
+    ticket_file_links = serializer.file_links(Ticketing, ticket_ids)
+    file_links = serializer.file_links(Answer, [row['id'] for row in rows])
+    return [
+        {
+            'url': serializer.url('ticketing:answer-detail', row['id']),
+            'files': file_links.get(row['id'], []),
+            'ticketing': serializer.ticketing(row, answer_links, ticket_file_links, prefix='ticketing__'),
+            'user': serializer.user(row),
+            'message': row['message'],
+            'created': serializer.datetime_field.to_representation(row['created']),
+        }
+        for row in rows
+    ]
+
+
+def represent_search_hits(serializer, hits):
+    """
+    Hits of 'apps.ticketing.search.search' in the same order. Tickets and answers of the hits are loaded with one
+    query each and hits of deleted objects are skipped.
+    """
+    ids = {TICKET: set(), ANSWER: set()}
+    for kind, object_id, ticketing_id, score in hits:
+        ids[kind].add(object_id)
+        ids[TICKET].add(ticketing_id)
+    tickets = {row['id']: row for row in Ticketing.objects.filter(id__in=ids[TICKET])
+               .values('id', 'title', 'message', 'is_answered', 'created')}
+    answers = {row['id']: row for row in Answer.objects.filter(id__in=ids[ANSWER])
+               .values('id', 'ticketing_id', 'message', 'created')}
+    results = list()
+    for kind, object_id, ticketing_id, score in hits:
+        row = (tickets if kind == TICKET else answers).get(object_id)
+        ticket = tickets.get(ticketing_id)
+        if row is None or ticket is None:
+            continue
+        results.append({
+            'type': KIND_NAMES[kind],
+            'url': serializer.url(f'ticketing:{KIND_NAMES[kind]}-detail', object_id),
+            'ticketing': serializer.url('ticketing:ticketing-detail', ticketing_id),
+            'title': ticket['title'],
+            'message': row['message'],
+            'is_answered': ticket['is_answered'],
+            'created': serializer.datetime_field.to_representation(row['created']),
+            'score': score,
+        })
+    return results
+
+
+class FastTicketingSerializer(FastListSerializer):
+    """Same output as 'TicketingSerializer(many=True)' for rows of 'ticketing_values'"""
+
+    def __init__(self, instance, context):
+        super().__init__(instance, context, represent_tickets)
+
+
+class FastAnswerSerializer(FastListSerializer):
+    """Same output as 'AnswerSerializer(many=True)' for rows of 'answer_values'"""
+
+    def __init__(self, instance, context):
+        super().__init__(instance, context, represent_answers)
+
+
+class FastSearchResultSerializer(FastListSerializer):
+    """Hits of the search index (see 'represent_search_hits')"""
+
+    def __init__(self, instance, context):
+        super().__init__(instance, context, represent_search_hits)
@@ -1,3 +1,10 @@
+"""
+Filters of ticketing APIs are an explicit allow-list of lookups that an index serves (see 'Meta.indexes' of the
+models), so a query string can not make the database scan a whole table. 'created' is filtered by range:
+    /ticket/ticketing/?is_answered=false&created__gte=2022-07-01T00:00:00Z
+Free text ('title' and 'message') is not filterable; words are searched with the search index instead.
+https://django-filter.readthedocs.io/en/stable/ref/filterset.html#declaring-filterable-fields
+"""
 from django_filters import rest_framework as filters
 
 from .models import Ticketing, Answer, FileUpload
@@ -8,7 +15,14 @@ class TicketingFilterSet(filters.FilterSet):
 
     class Meta:
         model = Ticketing
-        fields = '__all__'
+        fields = {
+            'ticket_id': ['exact'],
+            'user': ['exact'],
+            'group': ['exact'],
+            'emergency': ['exact'],
+            'is_answered': ['exact'],
+            'created': ['gte', 'lte'],
+        }
 
 
 class AnswerFilterSet(filters.FilterSet):
@@ -16,12 +30,22 @@ class AnswerFilterSet(filters.FilterSet):
 
     class Meta:
         model = Answer
-        fields = '__all__'
+        fields = {
+            'ticketing': ['exact'],
+            'user': ['exact'],
+            'created': ['gte', 'lte'],
+        }
 
 
 class FileUploadFilterSet(filters.FilterSet):
-    """Filterset for FileUpload Model"""
+    """
+    Filterset for FileUpload Model. Files of a ticket or an answer are filtered with 'ticketing' and 'answer'
+    (related_query_name of the 'files' GenericRelations), which become 'content_type' and 'object_id' lookups
+    that the (content_type, object_id) index serves. 'object_id' alone has no index.
+    """
+    ticketing = filters.NumberFilter(field_name='ticketing')
+    answer = filters.NumberFilter(field_name='answer')
 
     class Meta:
         model = FileUpload
-        exclude = ['file', ]
+        fields = ['content_type', 'ticketing', 'answer']
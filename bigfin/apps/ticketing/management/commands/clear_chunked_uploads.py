@@ -0,0 +1,19 @@
+"""
+Delete unfinished chunked uploads and their part files (see 'apps.ticketing.uploads'). Run it periodically:
+    python manage.py clear_chunked_uploads
+    python manage.py clear_chunked_uploads --age 3600
+"""
+from django.core.management.base import BaseCommand
+
+from apps.ticketing import uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked uploads that are not attached after TICKETING_UPLOAD_EXPIRE seconds'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--age', type=int, default=None, help='Seconds (default: TICKETING_UPLOAD_EXPIRE)')
+
+    def handle(self, *args, **options):
+        count = uploads.clear_expired(options['age'])
+        self.stdout.write(f'{count} expired uploads deleted')
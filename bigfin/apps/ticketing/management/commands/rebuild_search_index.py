@@ -0,0 +1,28 @@
+"""
+Index every ticket and answer in the full-text search index again (see 'apps.ticketing.search'). Use it after
+rows are written without model signals (eg: 'bulk_create' or raw SQL):
+    python manage.py rebuild_search_index
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.ticketing import search
+
+import time
+
+
+class Command(BaseCommand):
+    help = 'Rebuild full-text search index of tickets and answers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if search.get_backend() is None:
+            raise CommandError('Full-text search is not supported on this database')
+        start = time.perf_counter()
+        search.create_search_index()
+        # Searches do not see a half built index
+        with transaction.atomic():
+            count = search.rebuild(options['batch_size'])
+        self.stdout.write(f'{count} documents indexed in {time.perf_counter() - start:.3f}s')
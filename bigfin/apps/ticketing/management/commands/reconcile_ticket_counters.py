@@ -0,0 +1,20 @@
+"""
+Count answers of every ticket and tickets of every user and group again (see 'apps.ticketing.counters'). Use it
+after rows are written without model signals (eg: 'bulk_create', 'QuerySet.update' or raw SQL):
+    python manage.py reconcile_ticket_counters
+"""
+from django.core.management.base import BaseCommand
+
+from apps.ticketing import counters
+
+import time
+
+
+class Command(BaseCommand):
+    help = 'Recompute answer counters of tickets and ticket counters of users and groups'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        tickets, counter_rows = counters.reconcile()
+        self.stdout.write(f'{tickets} tickets and {counter_rows} user and group counters reconciled in '
+                          f'{time.perf_counter() - start:.3f}s')
@@ -5,7 +5,8 @@ https://docs.djangoproject.com/en/dev/ref/contrib/contenttypes/
 Remember that if we want flexibility for the Generic model, we better to set 'content_type' and 'content_object'
 fields to null for the model. Like the things we did on FileUpload model.
 """
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
@@ -14,6 +15,7 @@ from django.utils.translation import gettext_lazy as _
 from simple_history.models import HistoricalRecords
 
 import datetime
+import os
 import uuid
 
 
@@ -34,15 +36,57 @@ class FileUpload(models.Model):
     file = models.FileField(verbose_name=_('attach file (if any)'), upload_to=file_upload_to, blank=True, null=True)
     caption = models.CharField(verbose_name=_('caption'), max_length=200, blank=True, null=True)
     created = models.DateTimeField(verbose_name=_('created'), auto_now_add=True)
-    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True,
+                                     # Covered by the (content_type, object_id) index
+                                     db_index=False)
     object_id = models.PositiveIntegerField(blank=True, null=True)
     content_object = GenericForeignKey('content_type', 'object_id')
     history = HistoricalRecords()
 
+    class Meta:
+        indexes = [
+            # 'files' GenericRelation of tickets and answers
+            models.Index(fields=['content_type', 'object_id'], name='fileupload_content_object'),
+        ]
+
     def __str__(self):
         return f'File({self.id})'
 
 
+class ChunkedUpload(models.Model):
+    """
+    A file that is uploaded in chunks (see 'uploads.py'). Received bytes are appended to a part file in
+    'TICKETING_UPLOAD_TEMP_DIR' and 'offset' is how many of them are written, so a broken upload resumes from
+    there. When it's complete, the file is moved to the storage of 'FileUpload' and this row is deleted.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(get_user_model(),
+                             related_name='chunked_uploads',
+                             on_delete=models.CASCADE,
+                             verbose_name=_('user'))
+    filename = models.CharField(verbose_name=_('file name'), max_length=255)
+    size = models.PositiveBigIntegerField(verbose_name=_('size'))
+    offset = models.PositiveBigIntegerField(verbose_name=_('offset'), default=0)
+    created = models.DateTimeField(verbose_name=_('created'), auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Expired uploads are deleted by age
+            models.Index(fields=['created'], name='chunkedupload_created'),
+        ]
+
+    def __str__(self):
+        return f'{self.filename}_{self.offset}/{self.size}'
+
+    @property
+    def path(self):
+        return os.path.join(settings.TICKETING_UPLOAD_TEMP_DIR, f'{self.id.hex}.part')
+
+    @property
+    def is_complete(self):
+        return self.offset >= self.size
+
+
 class Ticketing(models.Model):
     """This model represents Tickets that user creates"""
     EMERGENCY_CHOISES = [
@@ -57,6 +101,8 @@ class Ticketing(models.Model):
     user = models.ForeignKey(get_user_model(),
                              related_name='user_tickets',
                              on_delete=models.CASCADE,
+                             # Covered by the (user, created) index
+                             db_index=False,
                              verbose_name=_('user'))
     group = models.ForeignKey(Group,
                               on_delete=models.SET_NULL,
@@ -72,7 +118,66 @@ class Ticketing(models.Model):
     files = GenericRelation('FileUpload', related_query_name='ticketing')
     # file = models.FileField(verbose_name=_('attach file (if any)'), upload_to=file_upload_to, blank=True, null=True)
     created = models.DateTimeField(verbose_name=_('created'), auto_now_add=True)
-    history = HistoricalRecords()
+    # Denormalized counters of answers. They are updated in the database (not by saving the ticket) when answers
+    # are created or deleted (see 'counters.py'), so they are not part of the ticket history.
+    answers_count = models.PositiveIntegerField(verbose_name=_('answers count'), default=0, editable=False)
+    last_answered = models.DateTimeField(verbose_name=_('last answer time'), blank=True, null=True, editable=False)
+    history = HistoricalRecords(excluded_fields=['answers_count', 'last_answered'])
+
+    class Meta:
+        constraints = [
+            # Answers find their ticket by 'ticket_id' (AnswerSerializer)
+            models.UniqueConstraint(fields=['ticket_id'], name='ticketing_ticket_id'),
+        ]
+        indexes = [
+            # Cursor pagination of lists (bigfin.pagination.CreatedCursorPagination)
+            models.Index(fields=['created', 'id'], name='ticketing_created_id'),
+            models.Index(fields=['is_answered', 'created'], name='ticketing_is_answered_created'),
+            models.Index(fields=['emergency', 'created'], name='ticketing_emergency_created'),
+            models.Index(fields=['user', 'created'], name='ticketing_user_created'),
+        ]
+
+    COUNTER_FIELDS = ('answers_count', 'last_answered')
+    # Values of the row when it was loaded or saved, to see what a later 'save()' changes without reading the row
+    # again (see 'signals.py'): owner and flag move the ticket between counters and the text is indexed for search
+    LOADED_FIELDS = ('user_id', 'group_id', 'is_answered', 'title', 'message')
+    _loaded_values = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {name: value for name, value in zip(field_names, values)
+                                   if name in cls.LOADED_FIELDS}
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._loaded_values = self.current_values()
+
+    def current_values(self):
+        deferred = self.get_deferred_fields()
+        return {name: getattr(self, name) for name in self.LOADED_FIELDS if name not in deferred}
+
+    def save(self, *args, **kwargs):
+        """
+        Ticket and its counters (see 'counters.py', called from 'post_save' signals) are saved in one transaction.
+        Saving a loaded ticket never writes its (maybe stale) answer counters back to the database, nor its
+        'is_answered' flag that answers also set, unless the flag was changed on this object.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            skipped = set(self.COUNTER_FIELDS)
+            if self._loaded_values and self._loaded_values.get('is_answered') == self.is_answered:
+                skipped.add('is_answered')
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in skipped]
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+        values = self.current_values()
+        if kwargs.get('update_fields') is not None and self._loaded_values is not None:
+            # Fields that were not written keep the values they were loaded with
+            written = {self._meta.get_field(name).attname for name in kwargs['update_fields']}
+            values = {**self._loaded_values, **{name: values[name] for name in written & values.keys()}}
+        self._loaded_values = values
 
 
 class Answer(models.Model):
@@ -84,6 +189,8 @@ class Answer(models.Model):
     user = models.ForeignKey(get_user_model(),
                              related_name='user_answers',
                              on_delete=models.CASCADE,
+                             # Covered by the (user, created) index
+                             db_index=False,
                              verbose_name=_('user'))
     message = models.TextField(verbose_name=_('message'))
     # file = models.FileField(verbose_name=_('attach file (if any)'), upload_to=file_upload_to, blank=True, null=True)
@@ -91,5 +198,55 @@ class Answer(models.Model):
     created = models.DateTimeField(verbose_name=_('created'), auto_now_add=True)
     history = HistoricalRecords()
 
+    class Meta:
+        indexes = [
+            # Cursor pagination of lists (bigfin.pagination.CreatedCursorPagination)
+            models.Index(fields=['created', 'id'], name='answer_created_id'),
+            # Answers of a non-staff user (AnswerViewset)
+            models.Index(fields=['user', 'created'], name='answer_user_created'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Answer and the counters of its ticket (see 'counters.py') are saved in one transaction"""
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f'{self.id}_{self.message[:10]}'
+
+
+class TicketCounter(models.Model):
+    """
+    Number of tickets and open (not answered) tickets of a user or a group. Rows are updated in the same
+    transaction as tickets and answers are created or deleted (see 'counters.py'), so dashboards read one row
+    per user or group instead of counting tickets on every request.
+    """
+    user = models.OneToOneField(get_user_model(),
+                                related_name='ticket_counter',
+                                on_delete=models.CASCADE,
+                                blank=True,
+                                null=True,
+                                verbose_name=_('user'))
+    group = models.OneToOneField(Group,
+                                 related_name='ticket_counter',
+                                 on_delete=models.CASCADE,
+                                 blank=True,
+                                 null=True,
+                                 verbose_name=_('group'))
+    tickets = models.IntegerField(verbose_name=_('tickets'), default=0)
+    open_tickets = models.IntegerField(verbose_name=_('open tickets'), default=0)
+
+    class Meta:
+        constraints = [
+            # A row counts tickets of either a user or a group
+            models.CheckConstraint(check=models.Q(user__isnull=True, group__isnull=False) |
+                                   models.Q(user__isnull=False, group__isnull=True),
+                                   name='ticket_counter_user_or_group'),
+        ]
+        indexes = [
+            # Dashboards list users and groups with most open tickets first
+            models.Index(fields=['open_tickets', 'id'], name='ticket_counter_open_tickets'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id or self.group_id}_{self.open_tickets}/{self.tickets}'
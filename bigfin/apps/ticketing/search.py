@@ -0,0 +1,234 @@
+"""
+Full-text search of tickets (title and message) and answers (message) for support staff. Documents live in one
+'ticketing_search' table of the default database:
+- SQLite: an FTS5 virtual table ranked with bm25 (title weighs more than message)
+  https://www.sqlite.org/fts5.html
+- PostgreSQL: a 'tsvector' column with a GIN index ranked with 'ts_rank' (title has weight A, message B)
+  https://www.postgresql.org/docs/current/textsearch-tables.html
+The table is created after 'migrate' (see 'apps.py') and kept up to date from model saves and deletes
+(see 'signals.py'). Rows that are written without signals (eg: 'bulk_create') are indexed by:
+    python manage.py rebuild_search_index
+
+Matches are ranked inside the full-text query (ORDER BY rank (bm25) or 'ts_rank' with LIMIT/OFFSET), so a page
+is the best matches of the whole index. Words are ANDed. Ranking every match of a common word is what makes a
+search slow on a big table: if 'TICKETING_SEARCH_MAX_CANDIDATES' is set only that many newest matches (newest
+documents have bigger ids) are ranked and 'is_truncated' tells if older matches were left out.
+
+Every document id is made from the object id and its kind, so tickets and answers share one table and one
+index and a document is replaced or deleted by its primary key:
+    search('withdraw failed', limit=20)  ->  [(kind, object_id, ticketing_id, score), ...]
+"""
+import re
+
+from django.conf import settings
+from django.db import connections, router
+
+from apps.ticketing.models import Answer, Ticketing
+
+
+SEARCH_TABLE = 'ticketing_search'
+TICKET, ANSWER = 0, 1
+KIND_NAMES = {TICKET: 'ticketing', ANSWER: 'answer'}
+WORD = re.compile(r'\w+')
+
+
+def document_id(kind, object_id):
+    return object_id * 2 + kind
+
+
+def split_document_id(doc_id):
+    """(kind, object_id) of a document id"""
+    return doc_id % 2, doc_id // 2
+
+
+def ticket_document(ticket):
+    return document_id(TICKET, ticket.id), ticket.id, ticket.title, ticket.message
+
+
+def answer_document(answer):
+    return document_id(ANSWER, answer.id), answer.ticketing_id, '', answer.message
+
+
+class SqliteBackend:
+    vendor = 'sqlite'
+
+    def create(self, cursor):
+        cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+                       f"ticketing_id UNINDEXED, title, message, tokenize = 'unicode61 remove_diacritics 2')")
+        # 'ORDER BY rank' uses this bm25 weighting of columns (ticketing_id, title, message)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rank) VALUES ('rank', 'bm25(0, 10.0, 1.0)')")
+
+    def delete(self, cursor, doc_ids):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({", ".join(["%s"] * len(doc_ids))})',
+                       list(doc_ids))
+
+    def upsert(self, cursor, documents):
+        self.delete(cursor, [document[0] for document in documents])
+        # One multi-row INSERT (the SQL panel of django-debug-toolbar can not format 'executemany' on SQLite)
+        cursor.execute(f'INSERT INTO {SEARCH_TABLE} (rowid, ticketing_id, title, message) '
+                       f'VALUES {", ".join(["(%s, %s, %s, %s)"] * len(documents))}',
+                       [value for document in documents for value in document])
+
+    def clear(self, cursor):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+    def match(self, words):
+        # Every word is quoted, so no input is parsed as FTS5 query syntax
+        return ' '.join('"{}"'.format(word.replace('"', '""')) for word in words)
+
+    def search(self, cursor, words, limit, offset, max_candidates=None):
+        if max_candidates is None:
+            cursor.execute(f'SELECT rowid, ticketing_id, -rank AS score FROM {SEARCH_TABLE} '
+                           f'WHERE {SEARCH_TABLE} MATCH %s ORDER BY rank, rowid DESC LIMIT %s OFFSET %s',
+                           [self.match(words), limit, offset])
+        else:
+            cursor.execute(f'SELECT rowid, ticketing_id, -rank AS score FROM ('
+                           f'SELECT rowid, ticketing_id, rank FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+                           f'ORDER BY rowid DESC LIMIT %s) ORDER BY rank, rowid DESC LIMIT %s OFFSET %s',
+                           [self.match(words), max_candidates, limit, offset])
+        return cursor.fetchall()
+
+    def has_more(self, cursor, words, count):
+        cursor.execute(f'SELECT 1 FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s LIMIT 1 OFFSET %s',
+                       [self.match(words), count])
+        return cursor.fetchone() is not None
+
+
+class PostgresBackend:
+    vendor = 'postgresql'
+    document_sql = "setweight(to_tsvector(%s::regconfig, %s), 'A') || setweight(to_tsvector(%s::regconfig, %s), 'B')"
+
+    def create(self, cursor):
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+                       f'id bigint PRIMARY KEY, ticketing_id integer NOT NULL, document tsvector NOT NULL)')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)')
+
+    def delete(self, cursor, doc_ids):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE id = ANY(%s)', [list(doc_ids)])
+
+    def upsert(self, cursor, documents):
+        config = settings.TICKETING_SEARCH_CONFIG
+        cursor.executemany(f'INSERT INTO {SEARCH_TABLE} (id, ticketing_id, document) '
+                           f'VALUES (%s, %s, {self.document_sql}) '
+                           f'ON CONFLICT (id) DO UPDATE SET ticketing_id = EXCLUDED.ticketing_id, '
+                           f'document = EXCLUDED.document',
+                           [(doc_id, ticketing_id, config, title, config, message)
+                            for doc_id, ticketing_id, title, message in documents])
+
+    def clear(self, cursor):
+        cursor.execute(f'TRUNCATE {SEARCH_TABLE}')
+
+    matches = f'FROM {SEARCH_TABLE}, plainto_tsquery(%s::regconfig, %s) query WHERE document @@ query'
+
+    def search(self, cursor, words, limit, offset, max_candidates=None):
+        params = [settings.TICKETING_SEARCH_CONFIG, ' '.join(words)]
+        if max_candidates is None:
+            # The GIN index finds the matches and only they are ranked
+            cursor.execute(f'SELECT id, ticketing_id, ts_rank(document, query) AS score {self.matches} '
+                           f'ORDER BY score DESC, id DESC LIMIT %s OFFSET %s', [*params, limit, offset])
+        else:
+            cursor.execute(f'SELECT id, ticketing_id, ts_rank(document, query) AS score FROM ('
+                           f'SELECT id, ticketing_id, document, query {self.matches} '
+                           f'ORDER BY id DESC LIMIT %s) candidates ORDER BY score DESC, id DESC LIMIT %s OFFSET %s',
+                           [*params, max_candidates, limit, offset])
+        return cursor.fetchall()
+
+    def has_more(self, cursor, words, count):
+        cursor.execute(f'SELECT 1 {self.matches} LIMIT 1 OFFSET %s',
+                       [settings.TICKETING_SEARCH_CONFIG, ' '.join(words), count])
+        return cursor.fetchone() is not None
+
+
+BACKENDS = {backend.vendor: backend() for backend in (SqliteBackend, PostgresBackend)}
+
+
+def get_connection():
+    return connections[router.db_for_write(Ticketing)]
+
+
+def get_backend(connection=None):
+    """Search backend of the database or None if full-text search is not supported on it"""
+    return BACKENDS.get((connection or get_connection()).vendor)
+
+
+def create_search_index(using=None, **kwargs):
+    """Create the search table if it does not exist. Connected to 'post_migrate'"""
+    connection = connections[using] if using else get_connection()
+    backend = get_backend(connection)
+    if backend is not None:
+        with connection.cursor() as cursor:
+            backend.create(cursor)
+
+
+def index_documents(documents):
+    backend = get_backend()
+    if backend is not None and documents:
+        with get_connection().cursor() as cursor:
+            backend.upsert(cursor, documents)
+
+
+def index_tickets(tickets):
+    index_documents([ticket_document(ticket) for ticket in tickets])
+
+
+def index_answers(answers):
+    index_documents([answer_document(answer) for answer in answers])
+
+
+def unindex(kind, object_ids):
+    backend = get_backend()
+    if backend is not None and object_ids:
+        with get_connection().cursor() as cursor:
+            backend.delete(cursor, [document_id(kind, object_id) for object_id in object_ids])
+
+
+def rebuild(batch_size=2000):
+    """Index every ticket and answer again and return number of documents"""
+    backend = get_backend()
+    if backend is None:
+        return 0
+    count = 0
+    with get_connection().cursor() as cursor:
+        backend.clear(cursor)
+    querysets = (
+        (Ticketing.objects.order_by('id').values_list('id', 'title', 'message'),
+         lambda row: (document_id(TICKET, row[0]), row[0], row[1], row[2])),
+        (Answer.objects.order_by('id').values_list('id', 'ticketing_id', 'message'),
+         lambda row: (document_id(ANSWER, row[0]), row[1], '', row[2])),
+    )
+    for queryset, document in querysets:
+        batch = list()
+        for row in queryset.iterator(chunk_size=batch_size):
+            batch.append(document(row))
+            if len(batch) >= batch_size:
+                index_documents(batch)
+                count, batch = count + len(batch), list()
+        index_documents(batch)
+        count += len(batch)
+    return count
+
+
+def search(query, limit, offset=0):
+    """
+    Documents that have every word of 'query', best first, as (kind, object_id, ticketing_id, score). Returns
+    None if full-text search is not supported on the database.
+    """
+    backend = get_backend()
+    if backend is None:
+        return None
+    words = WORD.findall(query)
+    if not words:
+        return []
+    with get_connection().cursor() as cursor:
+        rows = backend.search(cursor, words, limit, offset, settings.TICKETING_SEARCH_MAX_CANDIDATES)
+    return [(*split_document_id(doc_id), ticketing_id, score) for doc_id, ticketing_id, score in rows]
+
+
+def is_truncated(query):
+    """If 'query' has more matches than 'TICKETING_SEARCH_MAX_CANDIDATES', so older ones are not ranked"""
+    backend = get_backend()
+    words = WORD.findall(query)
+    if backend is None or not words or settings.TICKETING_SEARCH_MAX_CANDIDATES is None:
+        return False
+    with get_connection().cursor() as cursor:
+        return backend.has_more(cursor, words, settings.TICKETING_SEARCH_MAX_CANDIDATES)
@@ -18,7 +18,8 @@ from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.status import HTTP_400_BAD_REQUEST
 
-from apps.ticketing.models import FileUpload, Ticketing, Answer
+from apps.ticketing import counters, uploads
+from apps.ticketing.models import ChunkedUpload, FileUpload, Ticketing, Answer
 from apps.accounts.serializers import UserSerializer
 
 
@@ -28,9 +29,9 @@ def files_upload_create_api(files_upload, parent_instance=False):
     new files for them (if any data received for this optional field). This function used for API.
     'files_upload' is a dictionary consists of data received by FileUploadSerializer from client.
     'parent_instance' is a model instance that could be Answer or Ticketing.
+    Rows (and their history rows) are inserted by 'uploads.create_files'.
     """
-    for file_data in files_upload:
-        FileUpload.objects.create(**file_data)
+    uploads.create_files([FileUpload(**file_data) for file_data in files_upload])
 
 
 def files_upload_create_gui(files_upload_list, parent_instance):
@@ -38,12 +39,12 @@ def files_upload_create_gui(files_upload_list, parent_instance):
     This function is comparable to 'files_upload_create_api' but used for DRF GUI
     'file_upload_list' consists of a list that each of its elements is a 2 elements tuple: first argument is
     file obj and second element is the caption for the file.
+    Files are saved to storage by the INSERT of their rows ('uploads.create_files'). Parent instance is not saved
+    again.
     """
-    for file_data in files_upload_list:
-        data = {'file': file_data[0], 'caption': file_data[1]}
-        if data['file']:
-            parent_instance.files.create(**data)
-            parent_instance.save()
+    files = [FileUpload(file=file, caption=caption, content_object=parent_instance)
+             for file, caption in files_upload_list if file]
+    uploads.create_files(files)
 
 
 class FileUploadRelatedField(serializers.HyperlinkedRelatedField):
@@ -211,6 +212,8 @@ class TicketingSerializer(serializers.HyperlinkedModelSerializer):
         Overriding 'update' method to support methods to update Ticketing object with DRF GUI or from
         client side technologies
         """
+        # 'QuerySet.update' sends no signals, so counters of users and groups are changed here (see 'counters.py')
+        counter_values = (instance.user_id, instance.group_id, instance.is_answered)
         # First we should pop additional fields from validated data to prevent 'TypeError'
         files_upload = validated_data.pop('files_upload', None)
         user_obj = validated_data.pop('user_obj', None)
@@ -234,6 +237,7 @@ class TicketingSerializer(serializers.HyperlinkedModelSerializer):
             Ticketing.objects.filter(id=instance.id).update(**validated_data)
             # https://docs.djangoproject.com/en/4.0/ref/models/instances/#django.db.models.Model.refresh_from_db
             instance.refresh_from_db()
+            counters.ticket_changed(counter_values, instance)
 
             # If any 'file_<number>' field is not None, create new file for the field:
             if file_1 or file_2 or file_3:
@@ -248,6 +252,7 @@ class TicketingSerializer(serializers.HyperlinkedModelSerializer):
                 validated_data.update({'user': user})
                 Ticketing.objects.filter(id=instance.id).update(**validated_data)
                 instance.refresh_from_db()
+                counters.ticket_changed(counter_values, instance)
                 # Before returning updated ticket, we create attached files to the ticket's 'files' field (If any)
                 if files_upload:
                     files_upload_create_api(files_upload, parent_instance=instance)
@@ -426,6 +431,8 @@ class AnswerSerializer(serializers.HyperlinkedModelSerializer):
         Overriding 'update' method to support methods to update Answer object with DRF GUI or from
         client side technologies
         """
+        # Answers can be moved to another ticket, then answers of both tickets are counted again
+        ticketing_id = instance.ticketing_id
         files_upload = validated_data.pop('files_upload', None)
         ticketing_obj = validated_data.pop('ticketing_obj', None)
         ticket_id = validated_data.pop('ticket_id', None)
@@ -472,6 +479,8 @@ class AnswerSerializer(serializers.HyperlinkedModelSerializer):
             Answer.objects.filter(id=instance.id).update(**validated_data)
             'https://docs.djangoproject.com/en/4.0/ref/models/instances/#django.db.models.Model.refresh_from_db'
             instance.refresh_from_db()
+            if instance.ticketing_id != ticketing_id:
+                counters.refresh_tickets([ticketing_id, instance.ticketing_id])
             # If any 'file_<number>' field is not None, create new file for the field:
             if file_1 or file_2 or file_3:
                 files_upload_create_gui(files_data_list, instance)
@@ -485,6 +494,8 @@ class AnswerSerializer(serializers.HyperlinkedModelSerializer):
                 validated_data.update({'user': user})
                 Answer.objects.filter(id=instance.id).update(**validated_data)
                 instance.refresh_from_db()
+                if instance.ticketing_id != ticketing_id:
+                    counters.refresh_tickets([ticketing_id, instance.ticketing_id])
 
                 # Before returning newly created answer, we create attached files to the answer's 'files' field (If any)
                 if files_upload:
@@ -496,3 +507,44 @@ class AnswerSerializer(serializers.HyperlinkedModelSerializer):
         # If no user object or username found, raise the following error:
         else:
             raise ValidationError(detail={'error': 'No user found'}, code=HTTP_400_BAD_REQUEST)
+
+
+class ChunkedUploadSerializer(serializers.HyperlinkedModelSerializer):
+    """Start a chunked upload (see 'uploads.py'). Chunks are sent to 'url' with PATCH"""
+    url = serializers.HyperlinkedIdentityField(view_name='ticketing:upload-detail')
+
+    class Meta:
+        model = ChunkedUpload
+        fields = ['url', 'id', 'filename', 'size', 'offset', 'created']
+        read_only_fields = ['offset']
+
+    def create(self, validated_data):
+        return uploads.create(self.context['request'].user, validated_data['filename'], validated_data['size'])
+
+
+class AttachedUploadSerializer(serializers.Serializer):
+    id = serializers.UUIDField()
+    caption = serializers.CharField(max_length=200, allow_null=True, required=False, default=None)
+
+
+class AttachUploadsSerializer(serializers.Serializer):
+    """Complete uploads of the user and the ticket or answer that they are attached to"""
+    ticketing = serializers.PrimaryKeyRelatedField(queryset=Ticketing.objects.all(), allow_null=True, default=None)
+    answer = serializers.PrimaryKeyRelatedField(queryset=Answer.objects.all(), allow_null=True, default=None)
+    uploads = serializers.ListField(child=AttachedUploadSerializer(), allow_empty=False)
+
+    def validate(self, attrs):
+        if (attrs['ticketing'] is None) == (attrs['answer'] is None):
+            raise ValidationError({'Error': 'Enter a ticketing or an answer'})
+        user = self.context['request'].user
+        content_object = attrs['ticketing'] or attrs['answer']
+        if not user.is_staff and content_object.user_id != user.id:
+            raise ValidationError({'Error': 'Files can only be attached to your own tickets and answers'})
+        captions = {item['id']: item['caption'] for item in attrs['uploads']}
+        found = {upload.id: upload for upload in ChunkedUpload.objects.filter(user=user, id__in=captions)}
+        missing = [str(upload_id) for upload_id in captions if upload_id not in found]
+        if missing:
+            raise ValidationError({'uploads': f'No upload found with these ids: {", ".join(missing)}'})
+        attrs['content_object'] = content_object
+        attrs['uploads'] = [(found[upload_id], caption) for upload_id, caption in captions.items()]
+        return attrs
@@ -1,24 +1,101 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
+from apps.ticketing import counters, search
+from apps.ticketing.models import Answer
+
 import uuid
 
 
-@receiver(post_save, sender='ticketing.Ticketing')
+@receiver(pre_save, sender='ticketing.Ticketing')
 def ticket_uuid(sender, instance, **kwargs):
-    """Check if there is uuid on ticketing"""
+    """Check if there is uuid on ticketing. It's set before the row is saved, so it needs no second save"""
     if not instance.ticket_id:
-        instance.ticket_id = str(uuid.uuid4())
-        instance.save()
+        instance.ticket_id = uuid.uuid4()
 
 
 @receiver(post_save, sender='ticketing.Answer')
 def is_answered_ticketing(sender, instance, created, **kwargs):
-    """If is_staff create answer, Ticketing is_answered flag turn to True"""
+    """
+    If is_staff create answer, Ticketing is_answered flag turn to True (and to False for answers of customers).
+    The flag and the answer counters of the ticket are changed with one UPDATE: no full 'save()' of the ticket
+    and no simple_history row is made for it (see 'counters.answer_created').
+    """
     if created:
-        if instance.user.is_staff:
-            instance.ticketing.is_answered = True
-            instance.ticketing.save()
+        is_answered = counters.answer_created(instance)
+        # Keep the ticket object of the answer (if it's loaded) in sync with the database
+        if Answer.ticketing.is_cached(instance):
+            instance.ticketing.is_answered = is_answered
+            if instance.ticketing._loaded_values is not None:
+                instance.ticketing._loaded_values['is_answered'] = is_answered
+            instance.ticketing.answers_count += 1
+            instance.ticketing.last_answered = instance.created
+
+
+@receiver(post_delete, sender='ticketing.Answer')
+def uncount_answer(sender, instance, **kwargs):
+    counters.answer_deleted(instance)
+
+
+def loaded_values(instance, names, update_fields):
+    """
+    Values of the fields of a saved ticket before the save: values it was loaded with (see 'Ticketing.from_db'),
+    or its own values for fields the save did not write. None if some of them are unknown (eg: deferred fields).
+    """
+    loaded = instance._loaded_values or dict()
+    written = None if update_fields is None else {instance._meta.get_field(name).attname for name in update_fields}
+    values = list()
+    for name in names:
+        if written is not None and name not in written:
+            values.append(getattr(instance, name))
+        elif name in loaded:
+            values.append(loaded[name])
         else:
-            instance.ticketing.is_answered = False
-            instance.ticketing.save()
+            return None
+    return tuple(values)
+
+
+@receiver(post_save, sender='ticketing.Ticketing')
+def count_ticket(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Count tickets and open tickets of users and groups. A changed ticket is moved between counters by the values
+    it was loaded with, so saves do not read the row again. Tickets saved without being loaded (or with deferred
+    owner fields) are not moved: 'reconcile_ticket_counters' counts them again.
+    """
+    if created:
+        counters.ticket_created(instance)
+        return
+    old = loaded_values(instance, ('user_id', 'group_id', 'is_answered'), update_fields)
+    if old is not None:
+        counters.ticket_changed(old, instance)
+
+
+@receiver(post_delete, sender='ticketing.Ticketing')
+def uncount_ticket(sender, instance, **kwargs):
+    counters.ticket_deleted(instance)
+
+
+@receiver(post_save, sender='ticketing.Ticketing')
+def index_ticket(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the search index of the ticket up to date (only if its text was changed)"""
+    text = ('title', 'message')
+    old = None if created else loaded_values(instance, text, update_fields)
+    if old is None or old != tuple(getattr(instance, name) for name in text):
+        search.index_tickets([instance])
+
+
+@receiver(post_save, sender='ticketing.Answer')
+def index_answer(sender, instance, update_fields=None, **kwargs):
+    """Keep the search index of the answer up to date (only if its text could be changed)"""
+    if update_fields is None or {'message', 'ticketing'} & set(update_fields):
+        search.index_answers([instance])
+
+
+@receiver(post_delete, sender='ticketing.Ticketing')
+def unindex_ticket(sender, instance, **kwargs):
+    search.unindex(search.TICKET, [instance.id])
+
+
+@receiver(post_delete, sender='ticketing.Answer')
+def unindex_answer(sender, instance, **kwargs):
+    search.unindex(search.ANSWER, [instance.id])
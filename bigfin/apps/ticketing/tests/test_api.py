@@ -45,10 +45,12 @@ class TestTicketing(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         # Get all ticketing data using serializer
-        serializer = TicketingSerializer(instance=Ticketing.objects.all(), many=True, context={'request': self.request})
+        # Tickets are paginated newest first (bigfin.pagination.CreatedCursorPagination)
+        serializer = TicketingSerializer(instance=Ticketing.objects.order_by('-created', '-id'), many=True,
+                                         context={'request': self.request})
         self.assertIsNotNone(serializer.data)
         
-        self.assertEqual(serializer.data, response.json())
+        self.assertEqual(serializer.data, response.json()['results'])
     
     def test_ticketing_reterive_api(self):
         """Test if we can retreive a ticket successfully"""
@@ -101,6 +103,18 @@ class TestTicketing(TestCase):
         response_both = self.client.post(reverse('ticketing:ticketing-list'), data=ticket_data_both)
         self.assertEqual(response_both.status_code, status.HTTP_201_CREATED)
     
+    def test_ticketing_create_files_without_file_api(self):
+        """Files of 'files_upload' may have only a caption"""
+        content_type = ContentType.objects.get_for_model(Ticketing)
+        files = [{'caption': caption, 'content_type': content_type.id, 'object_id': self.ticket.id}
+                 for caption in ('first', 'second')]
+        data = {'username': self.user.username, 'title': 'title', 'message': 'message', 'files_upload': files}
+        response = self.client.post(reverse('ticketing:ticketing-list'), data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        files = FileUpload.objects.filter(caption__in=['first', 'second']).order_by('id')
+        self.assertEqual([(file.caption, bool(file.file)) for file in files], [('first', False), ('second', False)])
+        self.assertEqual(FileUpload.history.filter(caption__in=['first', 'second']).count(), 2)
+
     def test_ticketing_delete_api(self):
         """Test if we can delete ticketing using api"""
         # Test if ticket exist:
@@ -191,9 +205,11 @@ class TestAnswer(TestCase):
         response = self.client.get(path=reverse('ticketing:answer-list'))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
-        serializer = AnswerSerializer(instance=Answer.objects.all(), many=True, context={'request': self.request})
+        # Answers are paginated newest first (bigfin.pagination.CreatedCursorPagination)
+        serializer = AnswerSerializer(instance=Answer.objects.order_by('-created', '-id'), many=True,
+                                      context={'request': self.request})
 
-        self.assertEqual(response.json(), serializer.data)
+        self.assertEqual(response.json()['results'], serializer.data)
     
     def test_answer_retreive_api(self):
         """Test if retreive answer properly using api"""
@@ -394,9 +410,9 @@ class TestFileUpload(TestCase):
         response = self.client.get(reverse('ticketing:fileupload-list'))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
-        serializer = FileUploadSerializer(instance=FileUpload.objects.all(), many=True, context={'request': self.request})
+        serializer = FileUploadSerializer(instance=FileUpload.objects.order_by('id'), many=True, context={'request': self.request})
 
-        self.assertEqual(serializer.data, response.json())
+        self.assertEqual(serializer.data, response.json()['results'])
     
     def test_fileupload_retreive_api(self):
         """Test if retreive fileupload properly using api"""
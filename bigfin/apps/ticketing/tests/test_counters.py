@@ -0,0 +1,199 @@
+"""
+Counters of answers, tickets and open tickets (apps.ticketing.counters) and the support dashboard views
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, TransactionTestCase
+from rest_framework.authtoken.models import Token
+
+from apps.ticketing import counters, search
+from apps.ticketing.models import Answer, TicketCounter, Ticketing
+from bigfin.testing import RedisTestMixin
+
+from unittest import mock
+
+import io
+
+
+class TestCounters(TestCase):
+    def setUp(self) -> None:
+        self.admin = get_user_model().objects.create_superuser(username='ehsan', password='123456', name='essi')
+        self.user = get_user_model().objects.create_user(username='reza', password='123456')
+        self.group = Group.objects.create(name='vip')
+
+    def counter(self, **kwargs):
+        return TicketCounter.objects.values_list('tickets', 'open_tickets').get(**kwargs)
+
+    def assertCountersReconciled(self):
+        """Maintained counters are the same as counters computed again from all rows"""
+        tickets = list(Ticketing.objects.order_by('id').values_list('id', 'answers_count', 'last_answered'))
+        # Reconcile makes no rows for users and groups without tickets
+        rows = set(TicketCounter.objects.exclude(tickets=0).values_list('user_id', 'group_id', 'tickets',
+                                                                          'open_tickets'))
+        counters.reconcile()
+        self.assertEqual(list(Ticketing.objects.order_by('id').values_list('id', 'answers_count', 'last_answered')),
+                         tickets)
+        self.assertEqual(set(TicketCounter.objects.values_list('user_id', 'group_id', 'tickets', 'open_tickets')),
+                         rows)
+
+    def test_ticket_counters(self):
+        """Tickets and open tickets of users and groups follow tickets and answers"""
+        ticket = Ticketing.objects.create(user=self.user, group=self.group, title='title', message='message')
+        Ticketing.objects.create(user=self.user, title='other', message='message')
+        self.assertEqual(self.counter(user=self.user), (2, 2))
+        self.assertEqual(self.counter(group=self.group), (1, 1))
+
+        Answer.objects.create(ticketing=ticket, user=self.admin, message='answer')
+        self.assertEqual(self.counter(user=self.user), (2, 1))
+        self.assertEqual(self.counter(group=self.group), (1, 0))
+        Answer.objects.create(ticketing=ticket, user=self.user, message='question')
+        self.assertEqual(self.counter(user=self.user), (2, 2))
+        self.assertCountersReconciled()
+
+        ticket.delete()
+        self.assertEqual(self.counter(user=self.user), (1, 1))
+        self.assertEqual(self.counter(group=self.group), (0, 0))
+        self.assertCountersReconciled()
+
+    def test_ticket_change(self):
+        """A ticket that is saved with another owner or flag is moved between counters"""
+        ticket = Ticketing.objects.create(user=self.user, title='title', message='message')
+        ticket = Ticketing.objects.get(id=ticket.id)
+        Answer.objects.create(ticketing_id=ticket.id, user=self.user, message='question')
+        ticket.group = self.group
+        ticket.save()
+        self.assertEqual(self.counter(group=self.group), (1, 1))
+        ticket.is_answered = True
+        ticket.save()
+        self.assertEqual(self.counter(group=self.group), (1, 0))
+        self.assertEqual(self.counter(user=self.user), (1, 0))
+        # Answer counters of the database are not overwritten by the loaded (stale) ticket
+        self.assertEqual(Ticketing.objects.get(id=ticket.id).answers_count, 1)
+        self.assertCountersReconciled()
+
+    def test_stale_ticket_save(self):
+        """Saving a loaded ticket writes only the ticket (and its history row) and never its stale counters"""
+        ticket = Ticketing.objects.create(user=self.user, group=self.group, title='title', message='message')
+        ticket = Ticketing.objects.get(id=ticket.id)
+        Answer.objects.create(ticketing_id=ticket.id, user=self.admin, message='answer')
+        ticket.emergency = '5'
+        with mock.patch.object(search, 'index_tickets') as index_tickets, self.assertNumQueries(2):
+            ticket.save()
+        index_tickets.assert_not_called()
+        self.assertEqual(Ticketing.objects.values_list('emergency', 'is_answered', 'answers_count').get(),
+                         ('5', True, 1))
+        self.assertEqual(self.counter(user=self.user), (1, 0))
+        # Changed text is indexed again
+        ticket.title = 'other title'
+        with mock.patch.object(search, 'index_tickets') as index_tickets:
+            ticket.save()
+        index_tickets.assert_called_once_with([ticket])
+        # A flag changed on the object is written and moves the ticket between counters
+        ticket.refresh_from_db()
+        ticket.is_answered = False
+        ticket.save()
+        self.assertEqual(self.counter(group=self.group), (1, 1))
+        self.assertCountersReconciled()
+
+    def test_answer_counters(self):
+        """Number and time of answers of a ticket follow answers"""
+        ticket = Ticketing.objects.create(user=self.user, title='title', message='message')
+        first = Answer.objects.create(ticketing=ticket, user=self.admin, message='first')
+        second = Answer.objects.create(ticketing=ticket, user=self.user, message='second')
+        self.assertEqual((ticket.answers_count, ticket.last_answered), (2, second.created))
+        ticket.refresh_from_db()
+        self.assertEqual((ticket.answers_count, ticket.last_answered), (2, second.created))
+
+        second.delete()
+        ticket.refresh_from_db()
+        self.assertEqual((ticket.answers_count, ticket.last_answered), (1, first.created))
+        first.delete()
+        ticket.refresh_from_db()
+        self.assertEqual((ticket.answers_count, ticket.last_answered), (0, None))
+
+    def test_reconcile_command(self):
+        """Rows written without signals are counted by the command"""
+        ticket = Ticketing.objects.create(user=self.user, title='title', message='message')
+        Answer.objects.bulk_create([Answer(ticketing=ticket, user=self.admin, message='answer')] * 3)
+        Ticketing.objects.bulk_create([Ticketing(user=self.user, group=self.group, title='bulk', message='bulk',
+                                                 is_answered=True)])
+        out = io.StringIO()
+        call_command('reconcile_ticket_counters', stdout=out)
+        self.assertIn('2 tickets and 2 user and group counters', out.getvalue())
+        self.assertEqual(Ticketing.objects.get(id=ticket.id).answers_count, 3)
+        self.assertEqual(self.counter(user=self.user), (2, 1))
+        self.assertEqual(self.counter(group=self.group), (1, 0))
+
+
+class TestCountersTransaction(TransactionTestCase):
+    """Rows and their counters are saved in one transaction (no 'ATOMIC_REQUESTS', so saves run in autocommit)"""
+    def setUp(self) -> None:
+        self.admin = get_user_model().objects.create_superuser(username='ehsan', password='123456', name='essi')
+        self.user = get_user_model().objects.create_user(username='reza', password='123456')
+
+    def test_rollback(self):
+        with mock.patch.object(counters, 'ticket_created', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                Ticketing.objects.create(user=self.user, title='title', message='message')
+        self.assertFalse(Ticketing.objects.exists())
+        self.assertFalse(Ticketing.history.exists())
+
+        ticket = Ticketing.objects.create(user=self.user, title='title', message='message')
+        with mock.patch.object(counters, 'answer_created', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                Answer.objects.create(ticketing=ticket, user=self.admin, message='answer')
+        self.assertFalse(Answer.objects.exists())
+
+        ticket = Ticketing.objects.get(id=ticket.id)
+        ticket.title = 'other title'
+        ticket.is_answered = True
+        with mock.patch.object(counters, 'ticket_changed', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                ticket.save()
+        self.assertEqual(Ticketing.objects.values_list('title', 'is_answered').get(), ('title', False))
+        self.assertEqual(TicketCounter.objects.values_list('tickets', 'open_tickets').get(), (1, 1))
+
+
+class TestDashboard(RedisTestMixin, TestCase):
+    HOST = 'dashboard.localhost'
+    # Users of tokens are cached in redis when it's up
+    redis_required = False
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.admin = get_user_model().objects.create_superuser(username='ehsan', password='123456', name='essi')
+        self.user = get_user_model().objects.create_user(username='reza', password='123456')
+        self.token, created = Token.objects.get_or_create(user=self.admin)
+        for number in range(3):
+            ticket = Ticketing.objects.create(user=self.user, title=f'title {number}', message='message')
+        Answer.objects.create(ticketing=ticket, user=self.admin, message='answer')
+        self.ticket = ticket
+
+    def get(self, path, token=None, **data):
+        return self.client.get(path, data=data, HTTP_HOST=self.HOST,
+                               HTTP_AUTHORIZATION=f'Token {(token or self.token).key}')
+
+    def test_tickets(self):
+        response = self.get('/tickets/', limit=2)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['has_next'])
+        self.assertEqual(data['results'][0]['id'], self.ticket.id)
+        self.assertEqual(data['results'][0]['answers_count'], 1)
+        data = self.get('/tickets/', open=1).json()
+        self.assertEqual(len(data['results']), 2)
+        self.assertFalse(data['has_next'])
+
+    def test_user_and_group_tickets(self):
+        data = self.get('/tickets/users/').json()
+        self.assertEqual(data['results'], [{'user_id': self.user.id, 'user__username': 'reza', 'tickets': 3,
+                                            'open_tickets': 2}])
+        self.assertEqual(self.get('/tickets/groups/').json()['results'], [])
+
+    def test_staff_only(self):
+        response = self.get('/tickets/users/', token=Token.objects.get_or_create(user=self.user)[0])
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get('/tickets/users/', HTTP_HOST=self.HOST)
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,72 @@
+"""
+Fast list serializers (apps.ticketing.fast_serializers) must have exactly the same output of TicketingSerializer
+and AnswerSerializer.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.request import Request
+
+from apps.ticketing.fast_serializers import (FastAnswerSerializer, FastListSerializer, FastTicketingSerializer,
+                                             answer_values, ticketing_values)
+from apps.ticketing.models import Answer, FileUpload, Ticketing
+from apps.ticketing.serializers import AnswerSerializer, TicketingSerializer
+
+
+class TestFastSerializers(TestCase):
+    def setUp(self) -> None:
+        self.admin = get_user_model().objects.create_superuser(username='ehsan', password='123456', name='essi')
+        self.user = get_user_model().objects.create_user(username='reza', password='123456', email='reza@bigfin.ir')
+        self.request = Request(APIRequestFactory().get('/'))
+        # A ticket without answers or files, a ticket with two answers and files and a ticket of another user
+        Ticketing.objects.create(user=self.user, title='no answer', message='ticket 1', emergency='1')
+        ticket = Ticketing.objects.create(user=self.user, title='answered', message='ticket 2')
+        Ticketing.objects.create(user=self.admin, title='admin', message='ticket 3', is_published=False)
+        answer_1 = Answer.objects.create(ticketing=ticket, user=self.admin, message='answer 1')
+        answer_2 = Answer.objects.create(ticketing=ticket, user=self.user, message='answer 2')
+        for obj in (ticket, ticket, answer_1):
+            FileUpload.objects.create(content_object=obj, caption='file')
+        self.answers = [answer_1, answer_2]
+
+    def test_ticketing_fast_serializer(self):
+        """FastTicketingSerializer has the same output of TicketingSerializer"""
+        queryset = Ticketing.objects.order_by('id')
+        serializer = TicketingSerializer(queryset, many=True, context={'request': self.request})
+        fast_serializer = FastTicketingSerializer(ticketing_values(queryset), context={'request': self.request})
+        self.assertEqual(fast_serializer.data, serializer.data)
+
+    def test_answer_fast_serializer(self):
+        """FastAnswerSerializer has the same output of AnswerSerializer"""
+        queryset = Answer.objects.order_by('id')
+        serializer = AnswerSerializer(queryset, many=True, context={'request': self.request})
+        fast_serializer = FastAnswerSerializer(answer_values(queryset), context={'request': self.request})
+        self.assertEqual(fast_serializer.data, serializer.data)
+
+    def test_represent(self):
+        """Other rows are serialized with the helpers of the base serializer and a 'represent' callable"""
+        def represent(serializer, rows):
+            return [{'url': serializer.url('ticketing:ticketing-detail', row['id']), 'user': serializer.user(row)}
+                    for row in rows]
+
+        rows = ticketing_values(Ticketing.objects.filter(user=self.user).order_by('id'))
+        data = FastListSerializer(rows, {'request': self.request}, represent).data
+        serializer = TicketingSerializer(Ticketing.objects.filter(user=self.user).order_by('id'), many=True,
+                                         context={'request': self.request})
+        self.assertEqual(data, [{'url': ticket['url'], 'user': ticket['user']} for ticket in serializer.data])
+        with self.assertRaises(TypeError):
+            FastListSerializer(rows, {'request': self.request})
+
+    def test_list_pages(self):
+        """Pages of the list api are the same as pages of the serializers"""
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get(reverse('ticketing:ticketing-list'), data={'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first_page = response.json()['results']
+        response = client.get(response.json()['next'])
+        queryset = Ticketing.objects.order_by('-created', '-id')
+        request = Request(APIRequestFactory().get(reverse('ticketing:ticketing-list')))
+        serializer = TicketingSerializer(queryset, many=True, context={'request': request})
+        self.assertEqual(first_page + response.json()['results'], serializer.data)
@@ -0,0 +1,137 @@
+"""
+Number of queries of ticketing list endpoints must not grow with number of rows (no 'N+1' queries).
+https://docs.djangoproject.com/en/3.2/topics/testing/tools/#django.test.TransactionTestCase.assertNumQueries
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.accounts.filters import AddressFilterSet, UserFilterSet
+from apps.api.explain import audit, explain
+from apps.ticketing.filters import AnswerFilterSet, FileUploadFilterSet, TicketingFilterSet
+from apps.ticketing.models import Answer, FileUpload, Ticketing
+
+import datetime
+import uuid
+
+
+class TestListQueries(TestCase):
+    # tickets, answers of tickets and files of tickets
+    TICKETING_LIST_QUERIES = 3
+    # answers with their users and tickets, files of answers, answers of tickets and files of tickets
+    ANSWER_LIST_QUERIES = 4
+    # Lists are paginated with 'PAGE_SIZE' rows in every page
+    PAGE_SIZE = 100
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_superuser(username='ehsan', password='123456', name='essi')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Content types are cached after the first use
+        ContentType.objects.get_for_models(Ticketing, Answer)
+
+    def create_rows(self, count):
+        """Create 'count' tickets and for every ticket an answer and a file for each of them"""
+        Ticketing.objects.all().delete()
+        tickets = Ticketing.objects.bulk_create(
+            [Ticketing(user=self.user, title=f'title {i}', message='message') for i in range(count)])
+        # bulk_create does not set primary keys of sqlite rows in django 3.2
+        tickets = list(Ticketing.objects.all())
+        Answer.objects.bulk_create([Answer(ticketing=t, user=self.user, message='answer') for t in tickets])
+        answers = list(Answer.objects.all())
+        FileUpload.objects.bulk_create([FileUpload(content_object=obj, caption='file') for obj in tickets + answers])
+
+    def test_ticketing_list_queries(self):
+        """Ticketing list is sent in a constant number of queries"""
+        for count in (1, 100, 1000):
+            self.create_rows(count)
+            with self.assertNumQueries(self.TICKETING_LIST_QUERIES):
+                response = self.client.get(reverse('ticketing:ticketing-list'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            results = response.json()['results']
+            self.assertEqual(len(results), min(count, self.PAGE_SIZE))
+            self.assertEqual(len(results[0]['ticketing_answers']), 1)
+            self.assertEqual(len(results[0]['files']), 1)
+
+    def test_answer_list_queries(self):
+        """Answer list with nested tickets is sent in a constant number of queries"""
+        for count in (1, 100, 1000):
+            self.create_rows(count)
+            with self.assertNumQueries(self.ANSWER_LIST_QUERIES):
+                response = self.client.get(reverse('ticketing:answer-list'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            results = response.json()['results']
+            self.assertEqual(len(results), min(count, self.PAGE_SIZE))
+            self.assertEqual(len(results[0]['files']), 1)
+            self.assertEqual(len(results[0]['ticketing']['files']), 1)
+
+
+class TestIndexes(TestCase):
+    def test_indexed_lookups(self):
+        """Lookups of our access patterns use indexes rather than scanning the whole table"""
+        user = get_user_model().objects.create_user(username='reza', password='123456')
+        querysets = [
+            Ticketing.objects.filter(ticket_id=uuid.uuid4()),
+            Ticketing.objects.filter(user=user).order_by('-created')[:100],
+            Answer.objects.filter(user=user).order_by('-created', '-id')[:100],
+            FileUpload.objects.filter(content_type=ContentType.objects.get_for_model(Answer), object_id=1),
+        ]
+        for queryset in querysets:
+            plan, scans, sorts = explain(queryset)
+            self.assertEqual(scans, [], plan)
+
+
+class TestFilters(TestCase):
+    def test_allowed_filters(self):
+        """Filtersets only expose the allow-listed lookups (no free text or password)"""
+        self.assertEqual(set(TicketingFilterSet.base_filters), {'ticket_id', 'user', 'group', 'emergency',
+                                                                'is_answered', 'created__gte', 'created__lte'})
+        self.assertEqual(set(AnswerFilterSet.base_filters), {'ticketing', 'user', 'created__gte', 'created__lte'})
+        self.assertEqual(set(FileUploadFilterSet.base_filters), {'content_type', 'ticketing', 'answer'})
+        self.assertEqual(set(UserFilterSet.base_filters), {'username', 'email'})
+        self.assertEqual(set(AddressFilterSet.base_filters), {'user', 'country', 'city'})
+
+    def test_filters_use_indexes(self):
+        """Every allowed filter and every pair of them is served by an index"""
+        results = list(audit(max_fields=2))
+        self.assertTrue(results)
+        for result in results:
+            self.assertEqual(result['scans'], [], f'{result["filterset"]} {result["filters"]}\n{result["plan"]}')
+
+    def test_created_range(self):
+        """Tickets are filtered by a range of 'created'"""
+        user = get_user_model().objects.create_superuser(username='ehsan', password='123456', name='essi')
+        old, new = (Ticketing.objects.create(user=user, title=title, message='message') for title in ('old', 'new'))
+        Ticketing.objects.filter(id=old.id).update(created=new.created - datetime.timedelta(days=10))
+        client = APIClient()
+        client.force_authenticate(user)
+        since = (new.created - datetime.timedelta(days=1)).isoformat()
+        response = client.get(reverse('ticketing:ticketing-list'), data={'created__gte': since})
+        self.assertEqual([ticket['title'] for ticket in response.json()['results']], ['new'])
+        response = client.get(reverse('ticketing:ticketing-list'), data={'created__lte': since})
+        self.assertEqual([ticket['title'] for ticket in response.json()['results']], ['old'])
+
+
+class TestAnswerCreateQueries(TestCase):
+    # Answer, its history row, two UPDATEs of counters (see 'counters.answer_created': conditional UPDATE of
+    # 'is_answered' and answer counters of the ticket, then open tickets of its user and group if the flag changed
+    # or else answer counters alone) and replacing the answer in the search index (delete and insert)
+    ANSWER_CREATE_QUERIES = 6
+
+    def test_answer_create_queries(self):
+        """Creating an answer costs a fixed number of queries and makes no history of the ticket"""
+        admin = get_user_model().objects.create_superuser(username='ehsan', password='123456', name='essi')
+        user = get_user_model().objects.create_user(username='reza', password='123456')
+        ticket = Ticketing.objects.create(user=user, title='title', message='message')
+        history = ticket.history.count()
+        # Staff answers (flag changes, then it does not) and a customer answer (flag changes back)
+        for answer_user, is_answered in ((admin, True), (admin, True), (user, False)):
+            with self.assertNumQueries(self.ANSWER_CREATE_QUERIES):
+                Answer.objects.create(ticketing=ticket, user=answer_user, message='answer')
+            self.assertEqual(ticket.is_answered, is_answered)
+            self.assertEqual(Ticketing.objects.get(id=ticket.id).is_answered, is_answered)
+        self.assertEqual(ticket.history.count(), history)
+        self.assertEqual(Ticketing.objects.get(id=ticket.id).answers_count, 3)
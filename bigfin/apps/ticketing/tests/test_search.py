@@ -0,0 +1,104 @@
+"""
+Full-text search of tickets and answers (apps.ticketing.search) and '/ticket/search/' endpoint
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.ticketing import search
+from apps.ticketing.models import Answer, Ticketing
+
+
+class TestSearch(TestCase):
+    def setUp(self) -> None:
+        self.admin = get_user_model().objects.create_superuser(username='ehsan', password='123456', name='essi')
+        self.user = get_user_model().objects.create_user(username='reza', password='123456')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.ticket = Ticketing.objects.create(user=self.user, title='Withdraw failed',
+                                               message='My bitcoin withdraw is pending for two days')
+        self.other = Ticketing.objects.create(user=self.user, title='Profile picture',
+                                              message='I can not change my picture after withdraw')
+
+    def hits(self, query):
+        return [(kind, object_id) for kind, object_id, ticketing_id, score in search.search(query, 10)]
+
+    def test_index_is_updated_on_save_and_delete(self):
+        """Tickets and answers are searchable after save and not after delete"""
+        self.assertEqual(self.hits('bitcoin'), [(search.TICKET, self.ticket.id)])
+        answer = Answer.objects.create(ticketing=self.ticket, user=self.admin, message='Your dogecoin is sent')
+        self.assertEqual(self.hits('dogecoin'), [(search.ANSWER, answer.id)])
+
+        self.ticket.message = 'My ethereum withdraw'
+        self.ticket.save()
+        self.assertEqual(self.hits('bitcoin'), [])
+        self.assertEqual(self.hits('ethereum'), [(search.TICKET, self.ticket.id)])
+
+        self.ticket.delete()
+        self.assertEqual(self.hits('ethereum'), [])
+        self.assertEqual(self.hits('dogecoin'), [])
+
+    def test_ranking_and_words(self):
+        """Every word must match and a word in title ranks above the same word in message"""
+        self.assertEqual(self.hits('withdraw'), [(search.TICKET, self.ticket.id), (search.TICKET, self.other.id)])
+        self.assertEqual(self.hits('picture withdraw'), [(search.TICKET, self.other.id)])
+        # Query syntax of the database is not parsed
+        self.assertEqual(self.hits('"withdraw* (-'), [(search.TICKET, self.ticket.id), (search.TICKET, self.other.id)])
+        self.assertEqual(self.hits('!!!'), [])
+
+    def test_max_candidates(self):
+        """Every match is ranked unless the newest candidates are capped, then truncation is reported"""
+        newest = Ticketing.objects.create(user=self.user, title='Deposit', message='deposit after withdraw')
+        self.assertEqual(self.hits('withdraw')[0], (search.TICKET, self.ticket.id))
+        self.assertFalse(search.is_truncated('withdraw'))
+        with override_settings(TICKETING_SEARCH_MAX_CANDIDATES=2):
+            self.assertEqual(self.hits('withdraw'), [(search.TICKET, newest.id), (search.TICKET, self.other.id)])
+            self.assertTrue(search.is_truncated('withdraw'))
+            self.assertFalse(search.is_truncated('deposit'))
+            self.assertFalse(search.is_truncated('!!!'))
+            response = self.client.get(reverse('ticketing:search-list'), data={'q': 'withdraw'})
+            self.assertIs(response.json()['truncated'], True)
+        response = self.client.get(reverse('ticketing:search-list'), data={'q': 'withdraw'})
+        self.assertEqual(len(response.json()['results']), 3)
+        self.assertIs(response.json()['truncated'], False)
+
+    def test_rebuild(self):
+        """Rows written without signals are searchable after rebuild"""
+        Answer.objects.bulk_create([Answer(ticketing=self.other, user=self.admin, message='litecoin')])
+        self.assertEqual(self.hits('litecoin'), [])
+        self.assertEqual(search.rebuild(batch_size=1), 3)
+        self.assertEqual(len(self.hits('litecoin')), 1)
+        self.assertEqual(len(self.hits('withdraw')), 2)
+
+    def test_search_api(self):
+        """Search endpoint returns ranked pages of tickets and answers"""
+        answer = Answer.objects.create(ticketing=self.other, user=self.admin, message='Withdraw is fixed')
+        response = self.client.get(reverse('ticketing:search-list'), data={'q': 'withdraw', 'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(len(data['results']), 2)
+        self.assertEqual(data['results'][0]['type'], 'ticketing')
+        self.assertEqual(data['results'][0]['title'], 'Withdraw failed')
+        self.assertIsNone(data['previous'])
+
+        response = self.client.get(data['next'])
+        data = response.json()
+        self.assertEqual(len(data['results']), 1)
+        self.assertIsNone(data['next'])
+        self.assertIsNotNone(data['previous'])
+        urls = {result['url'] for result in response.json()['results']}
+        answer_url = response.wsgi_request.build_absolute_uri(reverse('ticketing:answer-detail', args=[answer.id]))
+        ticket_url = response.wsgi_request.build_absolute_uri(reverse('ticketing:ticketing-detail',
+                                                                      args=[self.other.id]))
+        self.assertTrue(urls & {answer_url, ticket_url})
+
+    def test_search_api_errors(self):
+        """Search needs words and is only for staff"""
+        response = self.client.get(reverse('ticketing:search-list'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(reverse('ticketing:search-list'), data={'q': 'withdraw'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
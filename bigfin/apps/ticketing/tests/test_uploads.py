@@ -0,0 +1,157 @@
+"""
+Resumable chunked uploads (apps.ticketing.uploads) and '/ticket/upload/' endpoints
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.ticketing import uploads
+from apps.ticketing.models import Answer, ChunkedUpload, FileUpload, Ticketing
+from apps.ticketing.serializers import files_upload_create_gui
+
+from unittest import mock
+
+import io
+import os
+import shutil
+import tempfile
+
+
+class TestChunkedUpload(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        settings = override_settings(MEDIA_ROOT=os.path.join(self.directory, 'media'),
+                                     TICKETING_UPLOAD_TEMP_DIR=os.path.join(self.directory, 'uploads'),
+                                     TICKETING_UPLOAD_BUFFER_SIZE=4)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(shutil.rmtree, self.directory)
+        # Query counts include the content type query
+        ContentType.objects.clear_cache()
+        self.user = get_user_model().objects.create_user(username='reza', password='123456')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.ticket = Ticketing.objects.create(user=self.user, title='title', message='message')
+
+    def start(self, filename='a.txt', size=10):
+        response = self.client.post(reverse('ticketing:upload-list'), data={'filename': filename, 'size': size})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.json()
+
+    def patch(self, upload, offset, data):
+        return self.client.generic('PATCH', upload['url'], data, content_type='application/offset+octet-stream',
+                                   HTTP_UPLOAD_OFFSET=str(offset))
+
+    @staticmethod
+    def file_queries():
+        """INSERTs of files and their history rows (and ids of the files if the INSERT does not return them)"""
+        return 2 if connection.features.can_return_rows_from_bulk_insert else 3
+
+    def test_upload_and_attach(self):
+        """Chunks are appended in order and complete files are attached with one INSERT"""
+        first, second = self.start('a.txt', 10), self.start('../b.txt', 3)
+        self.assertEqual(self.patch(first, 0, b'012345').json()['offset'], 6)
+        self.assertEqual(self.patch(first, 4, b'45').status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.patch(first, 6, b'6789X').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(first['url']).json()['offset'], 6)
+        self.patch(first, 6, b'6789')
+        self.patch(second, 0, b'abc')
+
+        data = {'ticketing': self.ticket.id, 'uploads': [{'id': first['id'], 'caption': 'first'},
+                                                          {'id': second['id']}]}
+        # Ticket, uploads, content type of tickets, files and their history rows and deleting uploads
+        with self.assertNumQueries(4 + self.file_queries()):
+            response = self.client.post(reverse('ticketing:upload-attach'), data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.json()['files']), 2)
+        files = list(FileUpload.objects.filter(ticketing=self.ticket).order_by('id'))
+        self.assertEqual([file.caption for file in files], ['first', None])
+        self.assertEqual([file.file.read() for file in files], [b'0123456789', b'abc'])
+        self.assertTrue(files[1].file.name.endswith('b.txt'))
+        self.assertFalse(ChunkedUpload.objects.exists())
+        self.assertFalse(os.listdir(os.path.join(self.directory, 'uploads')))
+
+    def test_attach_errors(self):
+        """Only complete uploads of the user are attached to their own tickets"""
+        upload = self.start()
+        url = reverse('ticketing:upload-attach')
+        data = {'ticketing': self.ticket.id, 'uploads': [{'id': upload['id']}]}
+        self.assertEqual(self.client.post(url, data=data, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        other = get_user_model().objects.create_user(username='ali', password='123456')
+        client = APIClient()
+        client.force_authenticate(other)
+        self.assertEqual(client.get(upload['url']).status_code, status.HTTP_404_NOT_FOUND)
+        other_ticket = Ticketing.objects.create(user=other, title='title', message='message')
+        self.patch(upload, 0, b'0123456789')
+        data['ticketing'] = other_ticket.id
+        self.assertEqual(self.client.post(url, data=data, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(FileUpload.objects.count(), 0)
+
+    def test_attach_rollback(self):
+        """Files of uploads that are not attached go back to their part files and the uploads are kept"""
+        upload = self.start(size=3)
+        self.patch(upload, 0, b'abc')
+        with mock.patch.object(uploads, 'create_files', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                uploads.attach([(ChunkedUpload.objects.get(), None)], self.ticket, self.user)
+        self.assertFalse(FileUpload.objects.exists())
+        self.assertTrue(ChunkedUpload.objects.exists())
+        media = os.path.join(self.directory, 'media')
+        self.assertEqual([files for path, directories, files in os.walk(media) if files], list())
+        with open(ChunkedUpload.objects.get().path, 'rb') as part:
+            self.assertEqual(part.read(), b'abc')
+
+        uploads.attach([(ChunkedUpload.objects.get(), None)], self.ticket, self.user)
+        self.assertEqual(FileUpload.objects.get().file.read(), b'abc')
+
+    def test_broken_stream(self):
+        """Received bytes of a broken chunk are kept and the upload resumes from there"""
+        upload = ChunkedUpload.objects.get(id=self.start(size=10)['id'])
+        self.assertEqual(uploads.append(upload, 0, io.BytesIO(b'0123'), 8), 4)
+        self.assertEqual(uploads.append(upload, 4, io.BytesIO(b'456789'), 6), 10)
+        with open(upload.path, 'rb') as part:
+            self.assertEqual(part.read(), b'0123456789')
+
+    def test_size_limit_and_clear(self):
+        with override_settings(TICKETING_UPLOAD_MAX_SIZE=5):
+            response = self.client.post(reverse('ticketing:upload-list'), data={'filename': 'a', 'size': 6})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        upload = self.start()
+        # Part files are removed when deletion of the uploads is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(upload['url'])
+        self.assertFalse(ChunkedUpload.objects.exists())
+        self.start()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('clear_chunked_uploads', age=0, stdout=io.StringIO())
+        self.assertFalse(ChunkedUpload.objects.exists())
+        self.assertFalse(os.listdir(os.path.join(self.directory, 'uploads')))
+
+    def test_gui_files_bulk_create(self):
+        """Files of 'file_N' fields are saved with one INSERT and the parent is not saved again"""
+        answer = Answer.objects.create(ticketing=self.ticket, user=self.user, message='answer')
+        history = answer.history.count()
+        files = [(SimpleUploadedFile('a.txt', b'a'), 'a'), (None, None), (SimpleUploadedFile('b.txt', b'b'), 'b')]
+        # Content type of answers, files and their history rows
+        with self.assertNumQueries(1 + self.file_queries()):
+            files_upload_create_gui(files, answer)
+        self.assertEqual(sorted(file.caption for file in answer.files.all()), ['a', 'b'])
+        self.assertEqual(answer.history.count(), history)
+
+    def test_files_with_same_name(self):
+        """Rows of files of the same name are told apart"""
+        # Ids of deleted rows are not used again
+        FileUpload.objects.create(caption='deleted').delete()
+        files = uploads.create_files([FileUpload(caption=f'same {number}', file='same.txt') for number in range(3)],
+                                     self.user)
+        self.assertEqual(len({file.pk for file in files}), 3)
+        self.assertEqual(dict(FileUpload.objects.values_list('id', 'caption')),
+                         {file.pk: file.caption for file in files})
+        self.assertEqual(set(FileUpload.history.filter(file='same.txt').values_list('id', 'caption', 'history_user')),
+                         {(file.pk, file.caption, self.user.pk) for file in files})
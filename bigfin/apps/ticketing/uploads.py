@@ -0,0 +1,171 @@
+"""
+Resumable chunked uploads of ticket and answer files. Multipart uploads (file_N fields of TicketingSerializer and
+AnswerSerializer) are limited to a few files, have to start over if the connection breaks and the whole body is
+parsed before the view runs. Here a file is uploaded in any number of chunks (much like the tus protocol
+https://tus.io/protocols/resumable-upload.html):
+    POST   /ticket/upload/            {"filename": "a.pdf", "size": 104857600}  ->  {"id": ..., "offset": 0}
+    PATCH  /ticket/upload/<id>/       raw bytes with 'Upload-Offset: <offset>' header  ->  {"offset": ...}
+    GET    /ticket/upload/<id>/       offset to resume a broken upload from
+    POST   /ticket/upload/attach/     {"ticketing": 1, "uploads": [{"id": ..., "caption": ...}, ...]}
+- The body of a chunk is copied from the request stream to the part file 'TICKETING_UPLOAD_BUFFER_SIZE' bytes
+  at a time, so memory does not grow with size of chunks or files.
+- If the connection breaks, bytes that are received are kept and the client continues from 'offset'.
+- Attached files are moved (not copied, if part files are on the same disk) to the storage of 'FileUpload' and
+  all 'FileUpload' rows (and their history rows) are made with one bulk INSERT each. If the rows are not saved,
+  files are moved back and the uploads can be attached again.
+https://docs.djangoproject.com/en/3.2/ref/files/storage/#django.core.files.storage.Storage.save
+
+Unfinished uploads older than 'TICKETING_UPLOAD_EXPIRE' seconds are deleted with:
+    python manage.py clear_chunked_uploads
+"""
+from django.conf import settings
+from django.core.files import File, locks
+from django.core.files.move import file_move_safe
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from apps.ticketing.models import ChunkedUpload, FileUpload
+
+import datetime
+import os
+
+
+class UploadConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Upload offset does not match'
+    default_code = 'upload_conflict'
+
+
+class PartFile(File):
+    """
+    A complete part file. Storages that save to disk (FileSystemStorage) move files that have a
+    'temporary_file_path' instead of copying them chunk by chunk.
+    """
+
+    def temporary_file_path(self):
+        return self.name
+
+
+def create(user, filename, size):
+    """Start an upload with an empty part file"""
+    if size > settings.TICKETING_UPLOAD_MAX_SIZE:
+        raise ValidationError({'size': f'Maximum size of a file is {settings.TICKETING_UPLOAD_MAX_SIZE} bytes'})
+    upload = ChunkedUpload.objects.create(user=user, filename=os.path.basename(filename), size=size)
+    os.makedirs(settings.TICKETING_UPLOAD_TEMP_DIR, exist_ok=True)
+    open(upload.path, 'wb').close()
+    return upload
+
+
+def append(upload, offset, stream, length):
+    """
+    Write 'length' bytes of 'stream' to the part file from 'offset' and return the new offset. Only one request
+    writes a part file at a time and bytes of a broken stream that are received are kept.
+    """
+    if length is None or length < 0:
+        raise ValidationError({'Content-Length': 'Length of the chunk is needed'})
+    with open(upload.path, 'r+b') as part:
+        if not locks.lock(part, locks.LOCK_EX | locks.LOCK_NB):
+            raise UploadConflict('Another chunk of this upload is being written')
+        try:
+            # The offset in the database may be changed by the request that had the lock before us
+            upload.refresh_from_db(fields=['offset'])
+            if offset != upload.offset:
+                raise UploadConflict(f'Upload offset is {upload.offset}')
+            if offset + length > upload.size:
+                raise ValidationError({'Content-Length': f'Only {upload.size - offset} bytes remain'})
+            part.seek(offset)
+            written = 0
+            try:
+                while written < length:
+                    data = stream.read(min(settings.TICKETING_UPLOAD_BUFFER_SIZE, length - written))
+                    if not data:
+                        break
+                    part.write(data)
+                    written += len(data)
+            finally:
+                part.truncate()
+                part.flush()
+                upload.offset = offset + written
+                ChunkedUpload.objects.filter(pk=upload.pk).update(offset=upload.offset)
+        finally:
+            locks.unlock(part)
+    return upload.offset
+
+
+def delete(uploads):
+    """Delete uploads and their part files (when the deletion of the rows is committed)"""
+    ChunkedUpload.objects.filter(pk__in=[upload.pk for upload in uploads]).delete()
+    transaction.on_commit(lambda: remove_parts(uploads))
+
+
+def remove_parts(uploads):
+    for upload in uploads:
+        if os.path.exists(upload.path):
+            os.remove(upload.path)
+
+
+def create_files(files, user=None):
+    """
+    Insert 'FileUpload' objects and their history rows with one INSERT each (files that are not saved to storage
+    yet are saved by the INSERT). Databases that do not return ids of bulk inserts (SQLite before Django 4.0) get
+    the ids with one more query: ids of SQLite 'AUTOINCREMENT' keys only grow and the transaction holds the write
+    lock of the database from the INSERT on, so the rows are the last 'len(files)' ids in the order of 'files'.
+    """
+    if not files:
+        return files
+    with transaction.atomic(savepoint=False):
+        files = FileUpload.objects.bulk_create(files)
+        if not connection.features.can_return_rows_from_bulk_insert:
+            last = FileUpload.objects.aggregate(last=Max('pk'))['last']
+            for pk, file in enumerate(files, start=last - len(files) + 1):
+                file.pk = pk
+        FileUpload.history.bulk_history_create(files, default_user=user)
+    return files
+
+
+def attach(uploads, content_object, user=None):
+    """
+    Attach complete uploads to 'content_object' (a ticket or an answer). 'uploads' is a list of
+    (ChunkedUpload, caption). Files are moved to storage and their rows are inserted by 'create_files'.
+    """
+    incomplete = [str(upload.id) for upload, caption in uploads if not upload.is_complete]
+    if incomplete:
+        raise ValidationError({'uploads': f'Uploads are not complete: {", ".join(incomplete)}'})
+    field = FileUpload._meta.get_field('file')
+    files, saved = list(), list()
+    try:
+        with transaction.atomic(savepoint=False):
+            for upload, caption in uploads:
+                file_upload = FileUpload(content_object=content_object, caption=caption)
+                name = field.generate_filename(file_upload, upload.filename)
+                with PartFile(open(upload.path, 'rb'), name=upload.path) as part:
+                    file_upload.file.name = field.storage.save(name, part, max_length=field.max_length)
+                saved.append((upload, file_upload.file.name))
+                files.append(file_upload)
+            files = create_files(files, user)
+            delete([upload for upload, caption in uploads])
+    except BaseException:
+        # Rows are rolled back: files of the uploads go back to their part files, so uploads can be attached again
+        unsave(field.storage, saved)
+        raise
+    return files
+
+
+def unsave(storage, saved):
+    """Undo 'storage.save' of part files: moved files are moved back and copied ones are deleted from storage"""
+    for upload, name in saved:
+        if os.path.exists(upload.path):
+            storage.delete(name)
+        else:
+            file_move_safe(storage.path(name), upload.path)
+
+
+def clear_expired(age=None):
+    """Delete unfinished uploads older than 'age' seconds and return their number"""
+    age = settings.TICKETING_UPLOAD_EXPIRE if age is None else age
+    expired = list(ChunkedUpload.objects.filter(created__lt=timezone.now() - datetime.timedelta(seconds=age)))
+    delete(expired)
+    return len(expired)
@@ -10,6 +10,8 @@ router = DefaultRouter()
 router.register('ticketing', views.TicketingViewset, 'ticketing')
 router.register('answer', views.AnswerViewset, 'answer')
 router.register('fileupload', views.FileUploadViewset, 'fileupload')
+router.register('search', views.SearchViewset, 'search')
+router.register('upload', views.ChunkedUploadViewset, 'upload')
 
 urlpatterns = [
     path('', include(router.urls)),
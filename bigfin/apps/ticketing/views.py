@@ -15,34 +15,91 @@ documents below:
 https://www.django-rest-framework.org/api-guide/views/#api-policy-attributes
 https://www.django-rest-framework.org/api-guide/generic-views/#genericapiview
 
+Every list is serialized in a constant number of queries: nested 'user' and 'ticketing' objects come with
+'select_related' and hyperlink lists ('ticketing_answers' and 'files' GenericRelation) come with one
+'prefetch_related' query each that only loads the columns needed to build the urls.
+https://docs.djangoproject.com/en/3.2/ref/models/querysets/#prefetch-related
+https://docs.djangoproject.com/en/3.2/ref/models/querysets/#prefetch-objects
+
+Tickets and answers are paginated with cursor pagination on ('created', 'id') and files with limit/offset
+pagination (bigfin/pagination.py). Lists of tickets and answers are filtered and paginated like default 'list'
+action but rows of the page are serialized from '.values()' by the read-only serializers of 'fast_serializers.py'
+with the same output of TicketingSerializer and AnswerSerializer.
+
+'SearchViewset' searches words in tickets and answers with the full-text search index (apps.ticketing.search):
+    /ticket/search/?q=withdraw+failed&limit=20&offset=20
+
+'ChunkedUploadViewset' uploads files of any size in resumable chunks and attaches any number of them to a ticket
+or an answer at once (apps.ticketing.uploads):
+    /ticket/upload/  /ticket/upload/<id>/  /ticket/upload/attach/
 """
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.viewsets import GenericViewSet, ModelViewSet, ViewSet
+from rest_framework import mixins
+from rest_framework import status
 from rest_framework import permissions
 from rest_framework import authentication
-from rest_framework import status
+from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 # from rest_framework.request import Request
+from django.db.models import Prefetch
 from django_filters import rest_framework as filters
 
-from .models import Ticketing, Answer, FileUpload
+from apps.accounts.authentication import CachedTokenAuthentication
+from bigfin.pagination import CreatedCursorPagination, RankedPagination
+from . import search, uploads
+from .models import ChunkedUpload, Ticketing, Answer, FileUpload
 from .serializers import TicketingSerializer, AnswerSerializer, FileUploadSerializer
+from .serializers import AttachUploadsSerializer, ChunkedUploadSerializer
+from .fast_serializers import FastTicketingSerializer, FastAnswerSerializer, FastSearchResultSerializer
+from .fast_serializers import ticketing_values, answer_values
 from .filters import TicketingFilterSet, AnswerFilterSet, FileUploadFilterSet
 
 
+def answer_links_prefetch(lookup='ticketing_answers'):
+    """Prefetch of answers of tickets that only loads what 'answer-detail' hyperlinks need"""
+    return Prefetch(lookup, queryset=Answer.objects.only('id', 'ticketing_id').order_by('id'))
+
+
+def file_links_prefetch(lookup='files'):
+    """Prefetch of 'files' GenericRelation that only loads what 'fileupload-detail' hyperlinks need"""
+    return Prefetch(lookup, queryset=FileUpload.objects.only('id', 'content_type_id', 'object_id').order_by('id'))
+
+
+def fast_list(view, values, fast_serializer_class):
+    """'list' action of a viewset that serializes '.values()' rows with 'fast_serializer_class'"""
+    queryset = values(view.filter_queryset(view.get_queryset()))
+    page = view.paginate_queryset(queryset)
+    data = fast_serializer_class(page if page is not None else queryset, context=view.get_serializer_context()).data
+    if page is not None:
+        return view.get_paginated_response(data)
+    return Response(data)
+
+
+def ticketing_queryset():
+    return Ticketing.objects.select_related('user').prefetch_related(answer_links_prefetch(), file_links_prefetch())
+
+
+def answer_queryset():
+    return Answer.objects.select_related('user', 'ticketing__user').prefetch_related(
+        file_links_prefetch(),
+        answer_links_prefetch('ticketing__ticketing_answers'),
+        file_links_prefetch('ticketing__files'),
+    )
+
+
 class TicketingViewset(ModelViewSet):
     """Viewset for Ticketing model"""
     serializer_class = TicketingSerializer
-    queryset = Ticketing.objects.all()
+    queryset = ticketing_queryset()
     permission_classes = [permissions.IsAdminUser, ]
-    authentication_classes = [authentication.TokenAuthentication, authentication.SessionAuthentication, ]
+    authentication_classes = [CachedTokenAuthentication, authentication.SessionAuthentication, ]
     filter_backends = (filters.DjangoFilterBackend, )
     filterset_class = TicketingFilterSet
+    pagination_class = CreatedCursorPagination
 
     def list(self, request, *args, **kwargs):
-        """Override 'list' method to send 'request' object to serializer - although it's not needed for ModelSerializer"""
-        queryset = Ticketing.objects.all()
-        serializer = TicketingSerializer(instance=queryset, many=True, context={'request': request, 'name': 'ehsan'})
-        return Response(data=serializer.data, status=status.HTTP_200_OK)
+        return fast_list(self, ticketing_values, FastTicketingSerializer)
 
 
 class AnswerViewset(ModelViewSet):
@@ -50,44 +107,91 @@ class AnswerViewset(ModelViewSet):
     serializer_class = AnswerSerializer
     # queryset = Answer.objects.all()
     # permission_classes = [permissions.IsAdminUser, ]
-    authentication_classes = [authentication.TokenAuthentication, authentication.SessionAuthentication, ]
+    authentication_classes = [CachedTokenAuthentication, authentication.SessionAuthentication, ]
     filter_backends = (filters.DjangoFilterBackend, )
     filterset_class = AnswerFilterSet
+    pagination_class = CreatedCursorPagination
 
     def get_queryset(self):
         """override get_queryset method."""
         if self.request.user.is_authenticated:
             if self.request.user.is_staff:
-                queryset = Answer.objects.all()
+                queryset = answer_queryset()
             else:
-                queryset = Answer.objects.filter(user=self.request.user)
+                queryset = answer_queryset().filter(user=self.request.user)
         else:
             queryset = Answer.objects.none()
         return queryset
 
     def list(self, request, *args, **kwargs):
-        """Override 'list' method to send 'request' object to serializer - although it's not needed for ModelSerializer"""
-        # Per DRF documents it's so much faster to use 'get_queryset' method rather than 'queryset' attribute
-        # queryset = Answer.objects.all()
-        queryset = self.get_queryset()
-        # print('query_params: ', self.request.query_params)
-        if queryset.exists():
-            serializer = AnswerSerializer(instance=queryset, many=True, context={'request': request})
-            return Response(data=serializer.data, status=status.HTTP_200_OK)
-        return Response(data='Error: This user is not authenticated!', status=status.HTTP_200_OK)
+        return fast_list(self, answer_values, FastAnswerSerializer)
 
 
 class FileUploadViewset(ModelViewSet):
     """Viewset for FileUpload model"""
     serializer_class = FileUploadSerializer
-    queryset = FileUpload.objects.all()
+    # Limit/offset pagination needs a stable order
+    queryset = FileUpload.objects.order_by('id')
     permission_classes = [permissions.IsAdminUser, ]
-    authentication_classes = [authentication.TokenAuthentication, authentication.SessionAuthentication, ]
+    authentication_classes = [CachedTokenAuthentication, authentication.SessionAuthentication, ]
     filter_backends = (filters.DjangoFilterBackend, )
     filterset_class = FileUploadFilterSet
 
+
+class SearchViewset(ViewSet):
+    """Ranked full-text search of tickets and answers for support staff"""
+    permission_classes = [permissions.IsAdminUser, ]
+    authentication_classes = [CachedTokenAuthentication, authentication.SessionAuthentication, ]
+    pagination_class = RankedPagination
+
     def list(self, request, *args, **kwargs):
-        """Override 'list' method to send 'request' object to serializer - although it's not needed for ModelSerializer"""
-        queryset = FileUpload.objects.all()
-        serializer = FileUploadSerializer(instance=queryset, many=True, context={'request': request})
-        return Response(data=serializer.data, status=status.HTTP_200_OK)
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(data={'q': 'Enter words to search'}, status=status.HTTP_400_BAD_REQUEST)
+        if search.get_backend() is None:
+            return Response(data='Error: Search is not supported on this database',
+                            status=status.HTTP_501_NOT_IMPLEMENTED)
+        paginator = self.pagination_class()
+        hits = paginator.paginate_rows(lambda limit, offset: search.search(query, limit, offset), request)
+        data = FastSearchResultSerializer(hits, context={'request': request, 'format': self.format_kwarg}).data
+        response = paginator.get_paginated_response(data)
+        # True only if older matches were not ranked (TICKETING_SEARCH_MAX_CANDIDATES)
+        response.data['truncated'] = search.is_truncated(query)
+        return response
+
+
+class ChunkedUploadViewset(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin,
+                           GenericViewSet):
+    """
+    Resumable chunked uploads of the user. 'partial_update' (PATCH) appends the raw request body at the
+    'Upload-Offset' header and reads it from the request stream, so the body is never parsed or buffered.
+    """
+    serializer_class = ChunkedUploadSerializer
+    permission_classes = [permissions.IsAuthenticated, ]
+    authentication_classes = [CachedTokenAuthentication, authentication.SessionAuthentication, ]
+
+    def get_queryset(self):
+        return ChunkedUpload.objects.filter(user=self.request.user)
+
+    def partial_update(self, request, *args, **kwargs):
+        upload = self.get_object()
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (KeyError, ValueError):
+            return Response(data={'Upload-Offset': 'Offset of the chunk is needed'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        offset = uploads.append(upload, offset, request.stream, length)
+        return Response(data={'offset': offset, 'size': upload.size}, headers={'Upload-Offset': str(offset)})
+
+    def perform_destroy(self, instance):
+        uploads.delete([instance])
+
+    @action(detail=False, methods=['post'])
+    def attach(self, request, *args, **kwargs):
+        serializer = AttachUploadsSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        files = uploads.attach(serializer.validated_data['uploads'], serializer.validated_data['content_object'],
+                               user=request.user)
+        urls = [reverse('ticketing:fileupload-detail', kwargs={'pk': file.pk}, request=request) for file in files]
+        return Response(data={'files': urls}, status=status.HTTP_201_CREATED)
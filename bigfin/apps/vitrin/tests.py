@@ -0,0 +1,87 @@
+"""
+'price_list' and 'price_list_async' views on a stubbed price store: ETag of the snapshot version, '304 Not Modified'
+and '503 Service Unavailable' when redis is down
+"""
+from django.test import AsyncClient, Client, TestCase
+from django.urls import reverse
+from unittest import mock
+
+from redis import exceptions
+
+from apps.vitrin import views
+
+
+class StubPriceStore:
+    """Snapshots of 'PriceStore' by symbols (None for all of them). 'error' is raised instead if it's set"""
+    snapshots = {None: ('v1', '{"Bitcoin": 100.0, "Ethereum": 10.0}'), ('BTC',): ('v1:BTC', '{"Bitcoin": 100.0}')}
+    error = None
+
+    def __init__(self, redis):
+        pass
+
+    def snapshot(self, symbols=None):
+        if self.error is not None:
+            raise self.error
+        return self.snapshots[tuple(symbol.upper() for symbol in symbols) if symbols else None]
+
+    async def asnapshot(self, symbols=None):
+        return self.snapshot(symbols)
+
+
+class TestPriceList(TestCase):
+    def setUp(self) -> None:
+        for patch in (mock.patch.object(views, 'PriceStore', StubPriceStore),
+                      mock.patch.object(views, 'get_async_redis', mock.AsyncMock())):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def assertSnapshot(self, response, version, body):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], f'"{version}"')
+        self.assertEqual(response.content.decode(), body)
+        self.assertIn('public', response['Cache-Control'])
+
+    def assertUnavailable(self, response):
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('error', response.json())
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Cache-Control'))
+
+    def test_price_list(self):
+        url = reverse('vitrin:price_list')
+        response = Client().get(url)
+        self.assertSnapshot(response, *StubPriceStore.snapshots[None])
+        self.assertEqual(Client().get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        # Filtered snapshots have their own version
+        response = Client().get(url, {'symbols': 'btc, '}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertSnapshot(response, *StubPriceStore.snapshots[('BTC',)])
+        self.assertEqual(Client().get(url, {'symbols': 'btc'}, HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+                         304)
+
+    async def test_price_list_async(self):
+        url = reverse('vitrin:price_list_async')
+        response = await AsyncClient().get(url)
+        self.assertSnapshot(response, *StubPriceStore.snapshots[None])
+        self.assertEqual((await AsyncClient().get(url, **{'if-none-match': response['ETag']})).status_code, 304)
+        # 'AsyncClient' of Django 3.2 does not send 'data' as the query string
+        response = await AsyncClient().get(url + '?symbols=btc', **{'if-none-match': response['ETag']})
+        self.assertSnapshot(response, *StubPriceStore.snapshots[('BTC',)])
+        response = await AsyncClient().get(url + '?symbols=btc', **{'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_no_snapshot(self):
+        """Nothing is published yet"""
+        with mock.patch.dict(StubPriceStore.snapshots, {None: None}):
+            response = Client().get(reverse('vitrin:price_list'))
+        self.assertEqual(response.json(), dict())
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_redis_down(self):
+        with mock.patch.object(StubPriceStore, 'error', exceptions.ConnectionError()):
+            with self.assertLogs(views.logger, 'ERROR'):
+                self.assertUnavailable(Client().get(reverse('vitrin:price_list')))
+
+    async def test_redis_down_async(self):
+        with mock.patch.object(StubPriceStore, 'error', OSError()):
+            with self.assertLogs(views.logger, 'ERROR'):
+                self.assertUnavailable(await AsyncClient().get(reverse('vitrin:price_list_async')))
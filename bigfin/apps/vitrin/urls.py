@@ -6,6 +6,7 @@ app_name = 'vitrin'
 urlpatterns = [
     path('', views.index, name='index'),
     path('price_list/', views.price_list, name='price_list'),
+    path('price_list/async/', views.price_list_async, name='price_list_async'),
     path('create-token/', views.create_token, name='create-token'),
     path('page2/', views.page2, name='page2'),
     path('todo-view', views.todo_view, name='todo_view'),
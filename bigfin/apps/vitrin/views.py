@@ -1,11 +1,21 @@
+from django.conf import settings
 from django.shortcuts import render
 from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from rest_framework.authtoken.models import Token
 # from silk.profiling.profiler import silk_profile
 
-import redis
 from redis import exceptions
 
+from apps.currency.prices import PriceStore
+from bigfin.redis_pool import ASYNC_REDIS_ERRORS, get_async_redis, get_redis
+
+import logging
+
+
+logger = logging.getLogger(__name__)
+
 
 # @silk_profile(name='View Blog Post')
 def index(request):
@@ -14,18 +24,63 @@ def index(request):
     # return render(request, 'vitrin/templates/index.html')
 
 
+def price_symbols(request):
+    """Symbols of '?symbols=BTC,ETH' or None for all of them"""
+    symbols = request.GET.get('symbols')
+    if symbols is not None:
+        symbols = [s.strip() for s in symbols.split(',') if s.strip()]
+    return symbols
+
+
+def price_list_unavailable():
+    """'503 Service Unavailable' when redis can not be reached (no ETag or cache headers, so nobody caches it)"""
+    logger.exception('Could not read the price snapshot from redis')
+    return JsonResponse({'error': 'Could not send the data. Check the server out...'}, status=503)
+
+
+def price_list_response(request, snapshot):
+    """Response of a price snapshot: '304 Not Modified' if the ETag of the client is the version of the snapshot"""
+    if snapshot is None:
+        # Nothing is ingested yet
+        response = JsonResponse({})
+        patch_cache_control(response, no_cache=True)
+        return response
+    version, body = snapshot
+    etag = quote_etag(version)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.PRICE_LIST_MAX_AGE)
+    return response
+
+
 def price_list(request):
-    """Send all price to client from redis"""
+    """
+    Send all price to client from redis. The body is the JSON snapshot that price ingestion publishes (see
+    'apps.currency.prices'), read with one HMGET and sent as it is. Only some currencies are sent with
+    '?symbols=BTC,ETH'. The snapshot version is the ETag, so clients revalidate with 'If-None-Match' and get
+    '304 Not Modified' until the next ingestion cycle changes prices.
+    https://docs.djangoproject.com/en/3.2/topics/conditional-view-processing/
+    """
     try:
-        red = redis.Redis(host='127.0.0.1', port=6379, db=0)
-        red.ping()
+        snapshot = PriceStore(get_redis()).snapshot(price_symbols(request))
     except (exceptions.ConnectionError, exceptions.TimeoutError):
-        print('No connection made...')
-        return JsonResponse({'error': 'Could not send the data. Check the server out...'})
-    bitcoin = red.lindex(b'bitcoin', 1).decode()
-    dogecoin = red.lindex(b'dogecoin', 1).decode()
-    ethereum = red.lindex(b'ethereum', 1).decode()
-    return JsonResponse({'bitcoin': float(bitcoin), 'dogecoin': float(dogecoin), 'ethereum': float(ethereum)})
+        return price_list_unavailable()
+    return price_list_response(request, snapshot)
+
+
+async def price_list_async(request):
+    """
+    'price_list' for ASGI servers: the snapshot is read with aioredis on the event loop, so the request never waits
+    for a thread.
+    https://docs.djangoproject.com/en/3.2/topics/async/#async-views
+    """
+    try:
+        snapshot = await PriceStore(await get_async_redis()).asnapshot(price_symbols(request))
+    except ASYNC_REDIS_ERRORS:
+        return price_list_unavailable()
+    return price_list_response(request, snapshot)
 
 
 def create_token(request):
@@ -1,6 +1,8 @@
 from django.contrib import admin
 
-from .models import Wallet
+from .models import Wallet, WalletBalance, WalletEntry
 
 
 admin.site.register(Wallet)
+admin.site.register(WalletBalance)
+admin.site.register(WalletEntry)
@@ -0,0 +1,91 @@
+"""
+Wallet ledger. Holdings of a wallet used to be an untyped 'Wallet.contents' JSON that every change had to read,
+modify and save as a whole (the whole row plus a history copy of it), so concurrent changes overwrote each other.
+Now every movement is:
+- one 'UPDATE ... SET amount = amount + n' of the 'WalletBalance' row of the currency (or of 'Wallet.credit'). A
+  debit only updates the row if the balance covers it ('WHERE amount >= n'), so balances never go negative and no
+  row is read or locked before it is changed.
+- one INSERT of its 'WalletEntry', the append-only ledger
+in one transaction, so a balance is always the sum of its entries. Balances are read with one SELECT ('snapshot'),
+which sees one consistent state of the database without any lock.
+    ledger.credit(wallet_id, 100, currency_id=btc.id, description='deposit')
+    ledger.debit(wallet_id, 30, currency_id=btc.id)        # raises InsufficientBalance if the balance is less
+    ledger.snapshot(user_id=user.id)
+https://docs.djangoproject.com/en/3.2/ref/models/expressions/#avoiding-race-conditions-using-f
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from apps.wallet.models import Wallet, WalletBalance, WalletEntry
+
+
+class InsufficientBalance(Exception):
+    """A debit is more than the balance of the wallet"""
+
+
+def move(wallet_id, amount, currency_id=None, description=''):
+    """
+    Add 'amount' (negative for debits) to the balance of the currency of the wallet ('Wallet.credit' if currency is
+    None) and append its ledger entry in one transaction. Returns the entry.
+    """
+    amount = Decimal(amount)
+    if not amount:
+        raise ValueError('Amount of a wallet movement can not be zero')
+    with transaction.atomic():
+        if currency_id is None:
+            rows, field = Wallet.objects.filter(pk=wallet_id), 'credit'
+            changes = {'credit': F('credit') + amount}
+        else:
+            rows, field = WalletBalance.objects.filter(wallet_id=wallet_id, currency_id=currency_id), 'amount'
+            changes = {'amount': F('amount') + amount, 'updated': timezone.now()}
+        if amount < 0:
+            rows = rows.filter(**{f'{field}__gte': -amount})
+        if not rows.update(**changes):
+            if amount < 0:
+                raise InsufficientBalance(f'Balance of wallet {wallet_id} is less than {-amount}')
+            if currency_id is None:
+                raise Wallet.DoesNotExist(f'Wallet {wallet_id} does not exist')
+            try:
+                with transaction.atomic():
+                    WalletBalance.objects.create(wallet_id=wallet_id, currency_id=currency_id, amount=amount)
+            except IntegrityError:
+                # A concurrent transaction made the row after our UPDATE
+                rows.update(**changes)
+        return WalletEntry.objects.create(wallet_id=wallet_id, currency_id=currency_id, amount=amount,
+                                          description=description)
+
+
+def credit(wallet_id, amount, currency_id=None, description=''):
+    return move(wallet_id, abs(Decimal(amount)), currency_id, description)
+
+
+def debit(wallet_id, amount, currency_id=None, description=''):
+    return move(wallet_id, -abs(Decimal(amount)), currency_id, description)
+
+
+def snapshot(**filters):
+    """
+    Balances of the wallet of 'filters' (eg: pk=1 or user_id=1) with one SELECT: 'credit', 'balances' of currency
+    symbols and 'last_entry', id of the last ledger entry that the balances include. None if there is no such wallet.
+    """
+    last_entry = WalletEntry.objects.filter(wallet=OuterRef('pk')).order_by('-id').values('id')[:1]
+    rows = list(Wallet.objects.filter(**filters)
+                .annotate(last_entry=Subquery(last_entry))
+                .values('wallet_id', 'credit', 'is_active', 'updated', 'last_entry',
+                        'balances__currency__symbol', 'balances__amount'))
+    if not rows:
+        return None
+    wallet = {name: rows[0][name] for name in ('wallet_id', 'credit', 'is_active', 'updated', 'last_entry')}
+    wallet['balances'] = {row['balances__currency__symbol']: row['balances__amount']
+                          for row in rows if row['balances__currency__symbol'] is not None}
+    return wallet
+
+
+def ledger_totals(wallet_id):
+    """Sum of ledger entries of every currency of the wallet ('None' for credit), the balances must be the same"""
+    totals = (WalletEntry.objects.filter(wallet_id=wallet_id).values('currency_id')
+              .annotate(total=Sum('amount')).order_by())
+    return {row['currency_id']: row['total'] for row in totals}
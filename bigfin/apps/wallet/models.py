@@ -7,7 +7,10 @@ import uuid
 
 
 class Wallet(models.Model):
-    """Model for User wallet"""
+    """
+    Model for User wallet. Balances of currencies are 'WalletBalance' rows and every change of them (and of 'credit')
+    is an entry of the ledger, see 'apps.wallet.ledger'.
+    """
     wallet_id = models.UUIDField(verbose_name=_('wallet id'), default=uuid.uuid4, editable=False)
     user = models.OneToOneField(to=get_user_model(),
                                 related_name='wallet_user',
@@ -28,5 +31,65 @@ class Wallet(models.Model):
     updated = models.DateTimeField(verbose_name=_('updated'), auto_now=True)
     history = HistoricalRecords()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['wallet_id'], name='wallet_wallet_id'),
+        ]
+
     def __str__(self):
         return f'{self.user.username}_wallet'
+
+
+class WalletBalance(models.Model):
+    """
+    Balance of one currency of a wallet. Rows are only changed by 'apps.wallet.ledger' with 'UPDATE ... SET amount =
+    amount + n' in the transaction of the ledger entry of the change, so concurrent credits and debits are not lost.
+    """
+    wallet = models.ForeignKey(Wallet,
+                               related_name='balances',
+                               on_delete=models.CASCADE,
+                               verbose_name=_('wallet'))
+    currency = models.ForeignKey('currency.Currency',
+                                 related_name='wallet_balances',
+                                 on_delete=models.PROTECT,
+                                 verbose_name=_('currency'))
+    amount = models.DecimalField(verbose_name=_('amount'), max_digits=30, decimal_places=10, default=0)
+    updated = models.DateTimeField(verbose_name=_('updated'), auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'currency'], name='wallet_balance_wallet_currency'),
+            models.CheckConstraint(check=models.Q(amount__gte=0), name='wallet_balance_not_negative'),
+        ]
+
+    def __str__(self):
+        return f'{self.wallet_id}_{self.currency_id}_balance'
+
+
+class WalletEntry(models.Model):
+    """
+    Append-only ledger of wallet movements: a positive 'amount' is a credit and a negative one is a debit. Entries of
+    'Wallet.credit' have no currency. Entries are never changed, so they have no history.
+    """
+    wallet = models.ForeignKey(Wallet,
+                               related_name='entries',
+                               on_delete=models.CASCADE,
+                               verbose_name=_('wallet'))
+    currency = models.ForeignKey('currency.Currency',
+                                 related_name='wallet_entries',
+                                 on_delete=models.PROTECT,
+                                 blank=True,
+                                 null=True,
+                                 verbose_name=_('currency'))
+    amount = models.DecimalField(verbose_name=_('amount'), max_digits=30, decimal_places=10)
+    description = models.CharField(verbose_name=_('description'), max_length=255, blank=True)
+    created = models.DateTimeField(verbose_name=_('created'), auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Movements of a currency of a wallet, newest first
+            models.Index(fields=['wallet', 'currency', 'id'], name='wallet_entry_wallet_currency'),
+        ]
+
+    def __str__(self):
+        return f'{self.wallet_id}_{self.currency_id}_{self.amount}'
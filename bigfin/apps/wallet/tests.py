@@ -1,3 +1,68 @@
+"""
+Wallet ledger (apps.wallet.ledger): balances and their ledger entries
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from apps.currency.models import Currency
+from apps.wallet import ledger
+from apps.wallet.models import Wallet, WalletBalance, WalletEntry
+
+
+class TestLedger(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(username='reza', password='123456')
+        self.wallet = Wallet.objects.get(user=self.user)
+        self.btc = Currency.objects.create(name='bitcoin', symbol='BTC')
+        self.eth = Currency.objects.create(name='ethereum', symbol='ETH')
+
+    def assertBalancesReconciled(self):
+        """Balances are the same as the sums of their ledger entries"""
+        balances = dict(WalletBalance.objects.filter(wallet=self.wallet).values_list('currency_id', 'amount'))
+        balances[None] = Wallet.objects.values_list('credit', flat=True).get(pk=self.wallet.pk)
+        totals = ledger.ledger_totals(self.wallet.pk)
+        self.assertEqual(balances, {currency: totals.get(currency, 0) for currency in balances})
+
+    def test_credit_and_debit(self):
+        ledger.credit(self.wallet.pk, '1.5', currency_id=self.btc.pk, description='deposit')
+        ledger.credit(self.wallet.pk, 1, currency_id=self.btc.pk)
+        entry = ledger.debit(self.wallet.pk, '0.25', currency_id=self.btc.pk)
+        self.assertEqual(entry.amount, Decimal('-0.25'))
+        ledger.credit(self.wallet.pk, 2, currency_id=self.eth.pk)
+        ledger.credit(self.wallet.pk, 1000)
+        ledger.debit(self.wallet.pk, 400)
+        self.assertEqual(WalletBalance.objects.get(wallet=self.wallet, currency=self.btc).amount, Decimal('2.25'))
+        self.assertEqual(Wallet.objects.get(pk=self.wallet.pk).credit, 600)
+        self.assertEqual(WalletEntry.objects.filter(wallet=self.wallet).count(), 6)
+        self.assertBalancesReconciled()
+
+    def test_insufficient_balance(self):
+        """A debit more than the balance changes nothing"""
+        ledger.credit(self.wallet.pk, 1, currency_id=self.btc.pk)
+        for currency_id in (self.btc.pk, self.eth.pk, None):
+            with self.assertRaises(ledger.InsufficientBalance):
+                ledger.debit(self.wallet.pk, 2, currency_id=currency_id)
+        self.assertEqual(WalletBalance.objects.get(wallet=self.wallet, currency=self.btc).amount, 1)
+        self.assertFalse(WalletBalance.objects.filter(currency=self.eth).exists())
+        self.assertEqual(WalletEntry.objects.count(), 1)
+        with self.assertRaises(ValueError):
+            ledger.credit(self.wallet.pk, 0)
+        with self.assertRaises(Wallet.DoesNotExist):
+            ledger.credit(self.wallet.pk + 100, 1)
+        self.assertBalancesReconciled()
+
+    def test_snapshot(self):
+        """Credit, balances and the last entry are read with one query"""
+        with self.assertNumQueries(1):
+            self.assertEqual(ledger.snapshot(user_id=self.user.pk)['balances'], dict())
+        ledger.credit(self.wallet.pk, 3, currency_id=self.btc.pk)
+        ledger.credit(self.wallet.pk, 5, currency_id=self.eth.pk)
+        entry = ledger.credit(self.wallet.pk, 10)
+        with self.assertNumQueries(1):
+            snapshot = ledger.snapshot(user_id=self.user.pk)
+        self.assertEqual(snapshot['balances'], {'BTC': 3, 'ETH': 5})
+        self.assertEqual(snapshot['credit'], 10)
+        self.assertEqual(snapshot['last_entry'], entry.pk)
+        self.assertIsNone(ledger.snapshot(user_id=self.user.pk + 100))
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from apps.wallet import views
+
+
+app_name = 'wallet'
+
+urlpatterns = [
+    path('balance/', views.wallet_balance, name='balance'),
+    path('balance/async/', views.wallet_balance_async, name='balance_async'),
+]
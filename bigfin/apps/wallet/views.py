@@ -1,3 +1,38 @@
-from django.shortcuts import render
+"""
+Wallet balance (credit and balances of currencies, see 'apps.wallet.ledger') of the user of a token
+('Authorization: Token <key>'). 'wallet_balance' is for WSGI servers and
+'wallet_balance_async' for ASGI servers: its token lookup runs on the event loop (see 'atoken_login') and only its
+query runs in a thread. Django 3.2 has no async queries yet, so 'sync_to_async' runs the ORM.
+https://docs.djangoproject.com/en/3.2/topics/async/#async-views
+"""
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
 
-# Create your views here.
+from apps.accounts.logins import atoken_login, token_login
+from apps.wallet import ledger
+
+
+def balance(user_id):
+    """Balance of the wallet of the user in one query or None if the user has no wallet"""
+    return ledger.snapshot(user_id=user_id)
+
+
+def balance_response(logged_in, message, wallet):
+    if not logged_in:
+        return JsonResponse(data={'detail': message}, status=401)
+    if wallet is None:
+        return JsonResponse(data={'detail': 'User has no wallet'}, status=404)
+    return JsonResponse(data=wallet)
+
+
+def wallet_balance(request):
+    """Credit of the wallet of the user"""
+    logged_in, message = token_login(request)
+    return balance_response(logged_in, message, balance(request.user.pk) if logged_in else None)
+
+
+async def wallet_balance_async(request):
+    """'wallet_balance' for ASGI servers"""
+    logged_in, message = await atoken_login(request)
+    wallet = await sync_to_async(balance)(request.user.pk) if logged_in else None
+    return balance_response(logged_in, message, wallet)
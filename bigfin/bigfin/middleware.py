@@ -0,0 +1,279 @@
+"""
+Host routing and hot path guards of 'MIDDLEWARE'.
+
+Hosts of all requests are found by 'HostRouter' instead of 'django_hosts' middlewares, which match the Host header
+with every regex of 'bigfin.hosts' twice per request (on the way in and out). 'HostsRequestMiddleware' (first in
+'MIDDLEWARE') matches a Host header with the regexes once and then finds it in a dict ('HOST_ROUTER_CACHE_SIZE' hosts
+at most). A route keeps the host, its callback and the resolver of its urlconf (the urlconf is imported when the
+router is made, not on the first request). 'HostsResponseMiddleware' (last in 'MIDDLEWARE') sets the urlconf of the
+host again for responses (debug-toolbar needs it) without matching the host again.
+https://django-hosts.readthedocs.io/en/latest/reference.html#module-django_hosts.middleware
+
+Requests of 'HOT_PATHS' (path prefixes of every host) skip history, axes and development middlewares. Every one of
+them is wrapped by a 'HotPathGuard' at its own place in 'MIDDLEWARE', so on other paths it runs exactly where it did
+(after authentication, with all of its hooks). Guards support sync and async requests, so under ASGI a sync only
+middleware (axes) moves no hot request to a thread. debug-toolbar skips hot paths with its own callback
+('show_toolbar').
+https://docs.djangoproject.com/en/3.2/topics/http/middleware/
+https://docs.djangoproject.com/en/3.2/topics/http/middleware/#asynchronous-support
+"""
+from collections import namedtuple
+import asyncio
+import re
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.urls import get_resolver, get_urlconf, set_urlconf
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.module_loading import import_string
+from django_hosts.defaults import host as Host
+from django_hosts.resolvers import get_host, get_host_patterns
+
+
+def adapt(handler, handler_is_async, is_async):
+    """'handler' for sync or async callers (same as 'BaseHandler.adapt_method_mode')"""
+    if is_async and not handler_is_async:
+        return sync_to_async(handler, thread_sensitive=True)
+    if not is_async and handler_is_async:
+        return async_to_sync(handler)
+    return handler
+
+
+def make_middleware(path, get_response, handler_is_async):
+    """
+    Instance of the middleware of dotted 'path' on 'get_response' and if it is async, the same way that
+    'BaseHandler.load_middleware' makes it. Raises 'MiddlewareNotUsed' if the middleware is not used.
+    """
+    middleware = import_string(path)
+    can_sync = getattr(middleware, 'sync_capable', True)
+    can_async = getattr(middleware, 'async_capable', False)
+    if not can_sync and not can_async:
+        raise ImproperlyConfigured(f'Middleware {path} must have at least one of sync_capable/async_capable set '
+                                   f'to True.')
+    middleware_is_async = can_async if handler_is_async or not can_sync else False
+    return middleware(adapt(get_response, handler_is_async, middleware_is_async)), middleware_is_async
+
+
+def load_pipeline(paths, get_response, is_async=False):
+    """
+    Wrap 'get_response' with middlewares of dotted 'paths' (first one is the outermost) the same way that
+    'BaseHandler.load_middleware' does. The result is async if 'is_async'.
+    """
+    handler, handler_is_async = get_response, is_async
+    for path in reversed(paths):
+        try:
+            instance, middleware_is_async = make_middleware(path, handler, handler_is_async)
+        except MiddlewareNotUsed:
+            continue
+        handler, handler_is_async = convert_exception_to_response(instance), middleware_is_async
+    return adapt(handler, handler_is_async, is_async)
+
+
+def run_callback(route, request):
+    """Callback of the host of the request (same as 'django_hosts.middleware.HostsRequestMiddleware')"""
+    current_urlconf = get_urlconf()
+    try:
+        set_urlconf(route.urlconf)
+        return route.callback(request, **route.kwargs)
+    finally:
+        set_urlconf(current_urlconf)
+
+
+Route = namedtuple('Route', 'host kwargs urlconf resolver callback')
+
+
+class HostRouter:
+    """
+    Route of Host headers: the host of 'ROOT_HOSTCONF' patterns (the first one that matches, else 'DEFAULT_HOST'),
+    its keyword arguments and its callback and resolver. Hosts of literal patterns are known before any request:
+    'dashboard' (or 'dashboard.<PARENT_HOST>').
+    """
+
+    def __init__(self, host_patterns=None, default_host=None, size=None):
+        self.host_patterns = get_host_patterns() if host_patterns is None else host_patterns
+        # 'host.callback' of a host without a callback is a new no-op function on every access: it is told apart
+        # by its code, taken from a host that has no callback
+        self.no_callback = getattr(Host(r'', settings.ROOT_URLCONF, name='').callback, '__code__', None)
+        self.default_route = self.make_route(get_host() if default_host is None else default_host, dict())
+        self.size = settings.HOST_ROUTER_CACHE_SIZE if size is None else size
+        self.routes = dict()
+        parent_host = getattr(settings, 'PARENT_HOST', '').lstrip('.')
+        for host in reversed(self.host_patterns):
+            if re.escape(host.regex) == host.regex:
+                name = f'{host.regex}.{parent_host}' if parent_host else host.regex
+                self.routes[name] = self.make_route(host, dict())
+
+    def make_route(self, host, kwargs):
+        resolver = get_resolver(host.urlconf)
+        # Import the urlconf now
+        resolver.url_patterns
+        callback = host.callback
+        if self.no_callback is not None and getattr(callback, '__code__', None) is self.no_callback:
+            callback = None
+        return Route(host, kwargs, host.urlconf, resolver, callback)
+
+    def match(self, request_host):
+        """Route of a Host header with the regexes of hosts"""
+        for host in self.host_patterns:
+            match = host.compiled_regex.match(request_host)
+            if match:
+                return self.make_route(host, match.groupdict())
+        return self.default_route
+
+    def route(self, request_host):
+        route = self.routes.get(request_host)
+        if route is None:
+            route = self.match(request_host)
+            # Host headers come from clients, so only the first 'size' hosts are kept
+            if len(self.routes) < self.size:
+                self.routes[request_host] = route
+        return route
+
+
+class HostsRequestMiddleware(MiddlewareMixin):
+    """
+    Routes requests to the urlconf of their host and runs the callback of the host, like 'django_hosts' one.
+    'MiddlewareMixin' marks the middleware as a coroutine for async requests, so django awaits it.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        self.router = HostRouter()
+
+    def route(self, request):
+        route = self.router.route(request.get_host())
+        request.urlconf = route.urlconf
+        request.host = route.host
+        return route
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        route = self.route(request)
+        if route.callback is not None:
+            response = run_callback(route, request)
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        route = self.route(request)
+        if route.callback is not None:
+            response = await sync_to_async(run_callback, thread_sensitive=True)(route, request)
+            if response is not None:
+                return response
+        return await self.get_response(request)
+
+
+def get_hot_paths():
+    """'HOT_PATHS' as host name to tuple of path prefixes"""
+    return {name: tuple(paths) for name, paths in settings.HOT_PATHS.items() if paths}
+
+
+def is_hot_path(request, hot_paths=None):
+    """If the path of the request is in 'HOT_PATHS' of its host (set by 'HostsRequestMiddleware')"""
+    host = getattr(request, 'host', None)
+    if host is None:
+        return False
+    paths = (get_hot_paths() if hot_paths is None else hot_paths).get(host.name)
+    return paths is not None and request.path_info.startswith(paths)
+
+
+def show_toolbar(request):
+    """'SHOW_TOOLBAR_CALLBACK' of debug-toolbar: no toolbar for hot paths"""
+    from debug_toolbar.middleware import show_toolbar
+
+    return not is_hot_path(request) and show_toolbar(request)
+
+
+class HotPathGuard(MiddlewareMixin):
+    """
+    Runs the middleware of the dotted path 'middleware' for all requests except requests of 'HOT_PATHS'. Its
+    'process_view', 'process_exception' and 'process_template_response' hooks are guarded the same way. The
+    middleware is made the same way that django makes it ('make_middleware'), so a sync only middleware still gets
+    sync requests.
+    """
+    middleware = None
+    hooks = ('process_view', 'process_exception', 'process_template_response')
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        # 'MiddlewareNotUsed' of the middleware drops its guard too
+        self.instance, middleware_is_async = make_middleware(self.middleware, get_response, self.is_async)
+        self.run = adapt(self.instance, middleware_is_async, self.is_async)
+        self.hot_paths = get_hot_paths()
+        for name in self.hooks:
+            hook = getattr(self.instance, name, None)
+            if hook is not None:
+                setattr(self, name, self.guard(name, hook))
+
+    def guard(self, name, hook):
+        """'hook' of the middleware that does nothing for hot paths"""
+        # A skipped 'process_template_response' returns the response as it is
+        skip = (lambda args: args[0]) if name == 'process_template_response' else (lambda args: None)
+        if asyncio.iscoroutinefunction(hook):
+            async def guarded(request, *args):
+                if is_hot_path(request, self.hot_paths):
+                    return skip(args)
+                return await hook(request, *args)
+        else:
+            def guarded(request, *args):
+                if is_hot_path(request, self.hot_paths):
+                    return skip(args)
+                return hook(request, *args)
+        return guarded
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if is_hot_path(request, self.hot_paths):
+            return self.get_response(request)
+        return self.run(request)
+
+    async def __acall__(self, request):
+        if is_hot_path(request, self.hot_paths):
+            return await self.get_response(request)
+        return await self.run(request)
+
+
+class BrowserReloadMiddleware(HotPathGuard):
+    middleware = 'django_browser_reload.middleware.BrowserReloadMiddleware'
+
+
+class HistoryRequestMiddleware(HotPathGuard):
+    middleware = 'simple_history.middleware.HistoryRequestMiddleware'
+
+
+class AxesMiddleware(HotPathGuard):
+    middleware = 'axes.middleware.AxesMiddleware'
+
+
+class HostsResponseMiddleware(MiddlewareMixin):
+    """Sets the urlconf of the host of the request for responses, like 'django_hosts' one"""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+
+    @staticmethod
+    def set_urlconf(request):
+        host = getattr(request, 'host', None)
+        if host is not None:
+            request.urlconf = host.urlconf
+            set_urlconf(host.urlconf)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self.set_urlconf(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        self.set_urlconf(request)
+        return response
@@ -0,0 +1,55 @@
+"""
+Pagination classes of all APIs. Every list endpoint is paginated ('DEFAULT_PAGINATION_CLASS' setting):
+- Big tables that grow all the time (tickets and answers) use keyset (cursor) pagination on ('created', 'id').
+  Every page is one indexed range query: there is no 'COUNT(*)' and no 'OFFSET', so a page costs the same
+  no matter how big the table is or how deep the client pages.
+- Small admin tables use limit/offset pagination: ?limit=50&offset=100
+- Ranked search results use limit/offset pagination without 'COUNT(*)' of all matches.
+https://www.django-rest-framework.org/api-guide/pagination/
+"""
+from collections import OrderedDict
+
+from rest_framework import pagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class LimitOffsetPagination(pagination.LimitOffsetPagination):
+    max_limit = 1000
+
+
+class CreatedCursorPagination(pagination.CursorPagination):
+    """Newest first. 'id' breaks ties of rows with the same 'created'"""
+    ordering = ('-created', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class RankedPagination(pagination.LimitOffsetPagination):
+    """
+    Pages of results that are not a queryset (eg: ranked search hits). 'fetch(limit, offset)' returns the rows and
+    one more row than 'limit' is fetched to know if there is a next page.
+    """
+    default_limit = 20
+    max_limit = 100
+
+    def paginate_rows(self, fetch, request):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        rows = fetch(self.limit + 1, self.offset)
+        self.has_next = len(rows) > self.limit
+        return rows[:self.limit]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = replace_query_param(self.request.build_absolute_uri(), self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
@@ -0,0 +1,124 @@
+"""
+Shared redis connections of the whole project. Every app must get its redis client from here instead of
+making a new 'redis.Redis(...)' (and a new TCP connection plus a PING) for every request:
+    from bigfin.redis_pool import get_redis, get_async_redis
+    red = get_redis()                   # sync views, commands and celery tasks
+    red = await get_async_redis()       # consumers and async views (aioredis)
+
+Both pools are made lazily on first use from 'REDIS_*' settings and connections are opened only when they are
+needed. Instead of pinging on every request, the sync pool checks health of a connection only if it was idle for
+more than 'REDIS_HEALTH_CHECK_INTERVAL' seconds. 'pool_stats()' returns metrics of both pools. aioredis raises
+'OSError' and 'asyncio.TimeoutError' for broken connections, so callers catch all of 'ASYNC_REDIS_ERRORS'.
+
+https://github.com/redis/redis-py#connection-pools
+https://aioredis.readthedocs.io/en/v1.3.0/api_reference.html#aioredis.create_redis_pool
+"""
+import asyncio
+import threading
+import time
+import weakref
+
+from django.conf import settings
+
+import aioredis
+import redis
+
+
+class MeteredConnectionPool(redis.BlockingConnectionPool):
+    """
+    Bounded connection pool that waits (at most 'timeout' seconds) for a free connection instead of opening
+    unlimited connections, and counts how long callers waited to acquire connections.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.acquired = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def get_connection(self, command_name, *keys, **options):
+        start = time.perf_counter()
+        connection = super().get_connection(command_name, *keys, **options)
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            self.acquired += 1
+            self.wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+        return connection
+
+    def stats(self):
+        # Free slots of the queue are 'None' until a connection is made for them
+        idle = sum(1 for connection in list(self.pool.queue) if connection is not None)
+        created = len(self._connections)
+        return {
+            'max_connections': self.max_connections,
+            'created': created,
+            'in_use': created - idle,
+            'idle': idle,
+            'acquired': self.acquired,
+            'wait_time_total': self.wait_time,
+            'wait_time_avg': self.wait_time / self.acquired if self.acquired else 0.0,
+            'wait_time_max': self.max_wait_time,
+        }
+
+
+ASYNC_REDIS_ERRORS = (aioredis.RedisError, OSError, asyncio.TimeoutError)
+
+_pool = None
+_pool_lock = threading.Lock()
+# aioredis pools are bound to the event loop that made them
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_pool():
+    """The sync connection pool of the process"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = MeteredConnectionPool.from_url(
+                    settings.REDIS_URL,
+                    max_connections=settings.REDIS_MAX_CONNECTIONS,
+                    timeout=settings.REDIS_POOL_TIMEOUT,
+                    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                    socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                    health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+                )
+    return _pool
+
+
+def get_redis():
+    """Sync redis client on the shared pool. Clients are cheap: no connection is made until a command is sent"""
+    return redis.Redis(connection_pool=get_pool())
+
+
+async def get_async_redis():
+    """aioredis client on the shared pool of the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.closed:
+        client = await aioredis.create_redis_pool(settings.REDIS_URL,
+                                                  minsize=1,
+                                                  maxsize=settings.REDIS_MAX_CONNECTIONS,
+                                                  timeout=settings.REDIS_SOCKET_TIMEOUT)
+        # Another task may have made the pool while we were connecting
+        if _async_clients.get(loop) is not None and not _async_clients[loop].closed:
+            client.close()
+            return _async_clients[loop]
+        _async_clients[loop] = client
+    return client
+
+
+def pool_stats():
+    """Metrics of the sync pool and of the async pool of every event loop"""
+    stats = {'sync': get_pool().stats() if _pool is not None else None, 'async': list()}
+    for client in list(_async_clients.values()):
+        pool = client.connection
+        stats['async'].append({
+            'max_connections': pool.maxsize,
+            'created': pool.size,
+            'in_use': pool.size - pool.freesize,
+            'idle': pool.freesize,
+        })
+    return stats
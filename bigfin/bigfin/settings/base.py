@@ -67,8 +67,9 @@ INSTALLED_APPS = [
 SITE_ID = 1
 
 MIDDLEWARE = [
-    'django_hosts.middleware.HostsRequestMiddleware',
-    
+    # Hosts of requests are found by 'HostRouter' (instead of 'django_hosts.middleware.HostsRequestMiddleware')
+    'bigfin.middleware.HostsRequestMiddleware',
+
     # "debug_toolbar.middleware.DebugToolbarMiddleware",    This is wrong:
     # based on this doc, https://django-hosts.readthedocs.io/en/latest/faq.html
     # debug-toolbar must come after django-hosts request middleware and based on my experience it must just come before
@@ -82,19 +83,47 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 
-    "django_browser_reload.middleware.BrowserReloadMiddleware",     # 'django-browser-reload' module
+    # Middlewares of 'bigfin.middleware' below run the middleware of their name except for 'HOT_PATHS'
+
+    "bigfin.middleware.BrowserReloadMiddleware",     # 'django-browser-reload' module
 
-    'simple_history.middleware.HistoryRequestMiddleware',
+    'bigfin.middleware.HistoryRequestMiddleware',
 
     # 'silk.middleware.SilkyMiddleware',
 
-    'axes.middleware.AxesMiddleware',
+    'bigfin.middleware.AxesMiddleware',
 
+    # Skips 'HOT_PATHS' with 'SHOW_TOOLBAR_CALLBACK'
     "debug_toolbar.middleware.DebugToolbarMiddleware",
 
-    'django_hosts.middleware.HostsResponseMiddleware',
+    'bigfin.middleware.HostsResponseMiddleware',
+]
+
+# Development only apps and middlewares. Production settings remove them from 'INSTALLED_APPS' and 'MIDDLEWARE'
+
+DEV_APPS = [
+    "debug_toolbar",
+    "django_browser_reload",
+]
+
+DEV_MIDDLEWARE = [
+    "bigfin.middleware.BrowserReloadMiddleware",
+    "debug_toolbar.middleware.DebugToolbarMiddleware",
 ]
 
+# Path prefixes of read-only hot endpoints of every host (names of 'bigfin.hosts'). They skip history, axes and
+# development middlewares (see 'bigfin.middleware'), so under ASGI no sync only middleware moves their async views to
+# a thread. WebSocket upgrades never run 'MIDDLEWARE', they are routed in 'asgi.py'.
+
+HOT_PATHS = {
+    'www': ['/price_list/', '/wallet/balance/', '/accounts/profile/'],
+}
+
+# 'axes.W002' only finds 'axes.middleware.AxesMiddleware' itself in 'MIDDLEWARE'. 'accounts.W001' checks for it or its
+# guard 'bigfin.middleware.AxesMiddleware' instead (apps.accounts.checks)
+
+SILENCED_SYSTEM_CHECKS = ['axes.W002']
+
 ROOT_URLCONF = 'bigfin.urls'
 
 # Django-hosts settings. Root hosts.py for subdomains
@@ -104,6 +133,10 @@ ROOT_HOSTCONF = 'bigfin.hosts'
 
 DEFAULT_HOST = 'www'
 
+# Number of Host headers that 'bigfin.middleware.HostRouter' keeps the route of (others are matched every time)
+
+HOST_ROUTER_CACHE_SIZE = 1000
+
 # Template settings
 
 TEMPLATES = [
@@ -126,12 +159,30 @@ TEMPLATES = [
 # We are using django-channels and we are using 'ASGI' so it must be above 'WSGI_APPLICATION' attribute.
 ASGI_APPLICATION = 'bigfin.asgi.application'
 
+# Redis settings. Every app gets its redis client from shared pools in 'bigfin.redis_pool'
+
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0')
+
+# Redis database of tests (see 'bigfin.testing'). It's flushed before every test, so it must not be 'REDIS_URL'
+
+REDIS_TEST_URL = os.environ.get('REDIS_TEST_URL', 'redis://127.0.0.1:6379/15')
+
+# Maximum connections of every pool and seconds to wait for a free connection when all are in use
+REDIS_MAX_CONNECTIONS = 50
+
+REDIS_POOL_TIMEOUT = 5
+
+REDIS_SOCKET_TIMEOUT = 5
+
+# An idle connection is checked (PING) before use only if it was idle more than this seconds
+REDIS_HEALTH_CHECK_INTERVAL = 30
+
 # Channel layer configs:
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels_redis.core.RedisChannelLayer',
         'CONFIG': {
-            "hosts": [('127.0.0.1', 6379)],
+            "hosts": [REDIS_URL],
         },
     },
 }
@@ -210,12 +261,25 @@ LOGOUT_REDIRECT_URL = reverse_lazy('vitrin:index')
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'apps.accounts.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
-    ]
+    ],
+    # Every list is paginated (bigfin/pagination.py). Tickets and answers use cursor pagination
+    'DEFAULT_PAGINATION_CLASS': 'bigfin.pagination.LimitOffsetPagination',
+    'PAGE_SIZE': 100,
 }
 
+# Token authentication (apps.accounts.authentication) caches users of tokens in an in-process LRU of this many
+# tokens for 'TOKEN_AUTH_LOCAL_TTL' seconds and in redis for 'TOKEN_AUTH_CACHE_TTL' seconds (0 disables a cache).
+# Other processes see a deactivated user or a deleted token after 'TOKEN_AUTH_LOCAL_TTL' seconds at most.
+
+TOKEN_AUTH_CACHE_SIZE = 10000
+
+TOKEN_AUTH_LOCAL_TTL = 10
+
+TOKEN_AUTH_CACHE_TTL = 300
+
 # Django-debug-toolbar
 # https://jazzband.co/projects/django-debug-toolbar
 
@@ -224,6 +288,11 @@ INTERNAL_IPS = [
     'localhost'
 ]
 
+DEBUG_TOOLBAR_CONFIG = {
+    # No toolbar for 'HOT_PATHS'
+    'SHOW_TOOLBAR_CALLBACK': 'bigfin.middleware.show_toolbar',
+}
+
 # django Silk optional settings:
 # https://pypi.org/project/django-silk/
 
@@ -252,3 +321,87 @@ AUTHENTICATION_BACKENDS = [
     # Django ModelBackend is the default authentication backend.
     'django.contrib.auth.backends.ModelBackend',
 ]
+
+# Price ingestion settings used by 'ingest_prices' command (apps.currency.ingestion)
+# https://docs.coinapi.io/#md-docs
+
+COINAPI_BASE_URL = os.environ.get('COINAPI_BASE_URL', 'https://rest-sandbox.coinapi.io')
+
+COINAPI_KEY = os.environ.get('COINAPI_KEY', '8AC81A58-86B8-46E6-A1C3-D1A8D6E36A35')
+
+# Asset ids of every currency we track. Could be overridden with comma separated 'PRICE_INGESTION_ASSETS' env.
+PRICE_INGESTION_ASSETS = os.environ.get('PRICE_INGESTION_ASSETS', 'BTC,ETH,DOGE').split(',')
+
+# Seconds between two ingestion cycles
+PRICE_INGESTION_INTERVAL = 15 * 60
+
+# Number of symbols requested in one upstream call and number of concurrent upstream calls
+PRICE_INGESTION_CHUNK_SIZE = 50
+
+PRICE_INGESTION_CONCURRENCY = 8
+
+PRICE_INGESTION_TIMEOUT = 10
+
+# Retention of price ticks of every currency in redis (apps.currency.prices): number of ticks and seconds
+
+PRICE_TICKS_MAX_LEN = 10000
+
+PRICE_TICKS_RETENTION = 7 * 24 * 3600
+
+# Seconds that clients and shared caches may reuse 'price_list' response before revalidating it with its ETag
+PRICE_LIST_MAX_AGE = 5
+
+# Live price streaming (apps.chat.consumers.PriceConsumer): minimum seconds between two messages to one
+# connection (updates in between are coalesced to the latest price) and maximum symbols of one connection
+
+PRICE_STREAM_THROTTLE = 1.0
+
+PRICE_STREAM_MAX_SYMBOLS = 200
+
+# Chat (apps.chat): maximum length of one message. History of every room is bounded by number of messages and
+# by their age in seconds. Clients get 'CHAT_HISTORY_ON_CONNECT' messages on connect and pages of
+# 'CHAT_HISTORY_PAGE_SIZE' older messages on request.
+
+CHAT_MESSAGE_MAX_LENGTH = 4000
+
+CHAT_HISTORY_MAX_LEN = 1000
+
+CHAT_HISTORY_MAX_AGE = 7 * 24 * 3600
+
+CHAT_HISTORY_ON_CONNECT = 50
+
+CHAT_HISTORY_PAGE_SIZE = 50
+
+# Micro-batching of chat messages (apps.chat.batching): seconds to collect messages of a room before sending
+# them as one event (0 disables batching) and maximum messages of one batch
+
+CHAT_BATCH_WINDOW = 0
+
+CHAT_BATCH_MAX_SIZE = 100
+
+# Full-text search of tickets (apps.ticketing.search): text search configuration of PostgreSQL. 'simple' does not
+# stem words, so it works for every language of tickets.
+
+TICKETING_SEARCH_CONFIG = 'simple'
+
+# Every match of a search is ranked by default. If set, only this many newest matches are ranked, which bounds latency
+# of searching common words, and search responses have '"truncated": true' when older matches were left out
+
+TICKETING_SEARCH_MAX_CANDIDATES = None
+
+# Chunked uploads of ticket and answer files (apps.ticketing.uploads): directory of part files (not served and better
+# on the same disk as 'MEDIA_ROOT', so complete files are moved, not copied), maximum size of one file in bytes,
+# bytes read from a request at a time and seconds an unfinished upload is kept.
+
+TICKETING_UPLOAD_TEMP_DIR = os.path.join(BASE_DIR, 'uploads')
+
+TICKETING_UPLOAD_MAX_SIZE = 500 * 1024 * 1024
+
+TICKETING_UPLOAD_BUFFER_SIZE = 256 * 1024
+
+TICKETING_UPLOAD_EXPIRE = 24 * 3600
+
+# If True, every flush of prices (apps.currency.flush) also writes simple_history rows of 'Currency' in bulk.
+# Price history is always written to compact 'PriceHistory' table.
+
+CURRENCY_GENERIC_HISTORY_ON_FLUSH = False
@@ -5,3 +5,9 @@ DEBUG = False
 ALLOWED_HOSTS = []
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+# No development apps and middlewares in production (see 'DEV_APPS' and 'DEV_MIDDLEWARE')
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in DEV_APPS]
+
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in DEV_MIDDLEWARE]
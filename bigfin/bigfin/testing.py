@@ -0,0 +1,68 @@
+"""
+Test helpers. Tests that use redis (directly or through 'bigfin.redis_pool') mix in 'RedisTestMixin', so they never
+read or overwrite keys of 'REDIS_URL': during every test both pools of 'bigfin.redis_pool' connect to
+'REDIS_TEST_URL', which is flushed before the test. Tests of classes with 'redis_required' are skipped if that redis
+is not reachable, other tests run against a redis that is down (eg: to test fallbacks).
+    class TestPrices(RedisTestMixin, TestCase):
+        def setUp(self):
+            super().setUp()
+            self.store = PriceStore(get_redis())
+"""
+from unittest import SkipTest, mock
+import weakref
+
+from django.conf import settings
+from django.test import override_settings
+
+import redis
+
+from bigfin import redis_pool
+
+
+def redis_available(url=None):
+    """If redis of 'url' ('REDIS_TEST_URL') answers"""
+    client = redis.Redis.from_url(url or settings.REDIS_TEST_URL, socket_connect_timeout=1, socket_timeout=1)
+    try:
+        return client.ping()
+    except redis.RedisError:
+        return False
+    finally:
+        client.connection_pool.disconnect()
+
+
+class RedisTestMixin:
+    redis_required = True
+
+    @classmethod
+    def setUpClass(cls):
+        cls.redis_available = redis_available()
+        if cls.redis_required and not cls.redis_available:
+            raise SkipTest(f'No redis on REDIS_TEST_URL ({settings.REDIS_TEST_URL})')
+        super().setUpClass()
+
+    def setUp(self):
+        super().setUp()
+        test_settings = override_settings(REDIS_URL=settings.REDIS_TEST_URL)
+        test_settings.enable()
+        self.addCleanup(test_settings.disable)
+        # New pools are made (on first use) for the test
+        for name, value in (('_pool', None), ('_async_clients', weakref.WeakKeyDictionary())):
+            patcher = mock.patch.object(redis_pool, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # Cleanups run in reverse order: pools of the test are closed before the old ones come back
+        self.addCleanup(self.close_pools)
+        if self.redis_available:
+            redis_pool.get_redis().flushdb()
+
+    @staticmethod
+    def close_pools():
+        if redis_pool._pool is not None:
+            redis_pool._pool.disconnect()
+        for client in list(redis_pool._async_clients.values()):
+            client.close()
+
+    def require_redis(self):
+        """Skip the test if redis is not reachable"""
+        if not self.redis_available:
+            self.skipTest(f'No redis on REDIS_TEST_URL ({settings.REDIS_TEST_URL})')
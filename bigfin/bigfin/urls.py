@@ -3,6 +3,7 @@ We are using subdomains to better manage our project. With subdomains, no longer
 'hosts.py' module used first.
 """
 
+from django.apps import apps
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
@@ -12,8 +13,6 @@ from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('__debug__/', include('debug_toolbar.urls')),
-    path("__reload__/", include("django_browser_reload.urls")),     # 'django-browser-reload' module
     # path('silk/', include('silk.urls', namespace='silk')),
     # path('grappelli/', include('grappelli.urls')),
     path('watchman/', include('watchman.urls')),    # Enable 'django-watchman'
@@ -23,9 +22,16 @@ urlpatterns = [
     path('api/', include('apps.api.urls')),
     path('ticket/', include('apps.ticketing.urls')),
     path('chat/', include('apps.chat.urls')),
+    path('wallet/', include('apps.wallet.urls')),
     path('', include('apps.vitrin.urls')),
 ]
 
+# Development tools are not installed in production (see 'DEV_APPS')
+if apps.is_installed('debug_toolbar'):
+    urlpatterns.append(path('__debug__/', include('debug_toolbar.urls')))
+if apps.is_installed('django_browser_reload'):
+    urlpatterns.append(path("__reload__/", include("django_browser_reload.urls")))     # 'django-browser-reload' module
+
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,161 @@
+"""
+Load test of read views ('price_list', wallet balance and profile) under a WSGI server (django's threaded server of
+'runserver') with the sync views and under Daphne (ASGI) with both the sync views and their async versions
+('*_async'). Every server runs in its own process on a throw-away test database (a temporary SQLite file) with
+DEBUG off, and 'concurrency' clients send requests (a new connection each) for 'duration' seconds. It prints
+requests per second and p50/p99 latency of every server, view and endpoint. Redis must be running on 'REDIS_URL'.
+Run it from the project directory (where 'manage.py' is):
+    python scripts/bench_async_views.py --concurrency 50 --duration 10
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bigfin.settings.dev')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from rest_framework.authtoken.models import Token
+
+from apps.currency.prices import PriceStore
+from bigfin.redis_pool import get_redis
+
+ENDPOINTS = {
+    'price_list': ('/price_list/', '/price_list/async/'),
+    'wallet balance': ('/wallet/balance/', '/wallet/balance/async/'),
+    'profile': ('/accounts/profile/', '/accounts/profile/async/'),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def serve_wsgi(port):
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+
+    class RequestHandler(WSGIRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadedWSGIServer(('127.0.0.1', port), RequestHandler)
+    server.set_app(WSGIHandler())
+    server.serve_forever()
+
+
+def serve_asgi(port):
+    # Daphne installs the asyncio reactor of twisted when it is imported, so it is only imported here
+    from daphne.server import Server
+    from bigfin.asgi import application
+
+    Server(application, endpoints=[f'tcp:port={port}:interface=127.0.0.1'], verbosity=0).run()
+
+
+async def request(port, path, headers):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n{headers}\r\n'.encode())
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    status = response[9:12]
+    if status != b'200':
+        raise RuntimeError(f'{path}: {response[:200]}')
+
+
+async def load(port, path, headers, concurrency, duration):
+    """Requests per second and latencies (seconds) of 'concurrency' clients for 'duration' seconds"""
+    latencies = list()
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await request(port, path, headers)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return len(latencies) / (time.perf_counter() - start), latencies
+
+
+def wait(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'Server did not start on port {port}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sync and async views load test')
+    parser.add_argument('--concurrency', type=int, default=50, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds of every run')
+    args = parser.parse_args()
+
+    settings.DEBUG = False
+    directory = tempfile.mkdtemp()
+    settings.DATABASES['default'].setdefault('TEST', dict())['NAME'] = os.path.join(directory, 'bench.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0)
+    red = get_redis()
+    saved = red.hgetall('prices:snapshot')
+    try:
+        user = get_user_model().objects.create_user(username='ehsan', password='123456', name='essi')
+        token, created = Token.objects.get_or_create(user=user)
+        PriceStore(red).publish_snapshot({f'C{number}': (f'coin {number}', number) for number in range(100)})
+        headers = f'Authorization: Token {token.key}\r\n'
+        # Servers are forked, they must not share the connection of this process
+        connection.close()
+
+        runs = [('WSGI', serve_wsgi, 'sync'), ('ASGI', serve_asgi, 'sync'), ('ASGI', serve_asgi, 'async')]
+        print(f'{args.concurrency} clients for {args.duration}s  database: {connection.vendor}  '
+              f'cpus: {os.cpu_count()}')
+        print(f'{"server":8}{"views":7}{"endpoint":16}{"req/s":>10}{"p50 ms":>10}{"p99 ms":>10}')
+        context = multiprocessing.get_context('fork')
+        for server_name, serve, views in runs:
+            port = free_port()
+            process = context.Process(target=serve, args=(port, ), daemon=True)
+            process.start()
+            try:
+                wait(port)
+                for name, paths in ENDPOINTS.items():
+                    path = paths[views == 'async']
+                    # Warm up caches and connections
+                    asyncio.run(load(port, path, headers, args.concurrency, 1))
+                    rps, latencies = asyncio.run(load(port, path, headers, args.concurrency, args.duration))
+                    latencies.sort()
+                    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+                    print(f'{server_name:8}{views:7}{name:16}{rps:10.1f}{statistics.median(latencies) * 1000:10.1f}'
+                          f'{p99 * 1000:10.1f}')
+            finally:
+                process.terminate()
+                process.join()
+    finally:
+        red.delete('prices:snapshot')
+        if saved:
+            red.hset('prices:snapshot', mapping=saved)
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
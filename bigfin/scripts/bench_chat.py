@@ -0,0 +1,121 @@
+"""
+Concurrency benchmark of chat (apps.chat.consumers.ChatConsumer) over the real redis channel layer. It opens many
+in-process websocket clients in some rooms, lets some of them send messages at the same time and prints latency
+of every delivered message (send to receive by each member of the room). '--blocking' runs the old consumer
+that saved every message with a sync redis call on the event loop, to compare. '--batch-window' enables
+micro-batching of messages (apps.chat.batching) to compare throughput with batching on and off.
+Run it from the project directory (where 'manage.py' is) with a local redis:
+    python scripts/bench_chat.py --clients 2000 --rooms 20 --senders 200 --messages 5
+    python scripts/bench_chat.py --clients 2000 --rooms 20 --senders 200 --messages 5 --blocking
+    python scripts/bench_chat.py --clients 2000 --rooms 20 --senders 200 --messages 5 --batch-window 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bigfin.settings.dev')
+
+import django
+django.setup()
+
+from django.conf import settings
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.urls import re_path
+
+from apps.chat.consumers import ChatConsumer
+from bigfin.redis_pool import get_redis
+
+
+class BlockingChatConsumer(ChatConsumer):
+    """The old behaviour: a sync redis call inside the async handler"""
+
+    async def receive(self, text_data):
+        get_redis().set('a', json.loads(text_data)['message'])
+        await super().receive(text_data)
+
+
+async def member(communicator, latencies, stop):
+    while not stop.is_set():
+        # 'receive_from' cancels the consumer on timeout, so wait on the output queue of the communicator
+        try:
+            output = await asyncio.wait_for(communicator.output_queue.get(), 0.2)
+        except asyncio.TimeoutError:
+            continue
+        now = time.time()
+        for message in _messages(json.loads(output['text'])):
+            latencies.append(now - float(message))
+
+
+def _messages(data):
+    # A batched event (see 'CHAT_BATCH_WINDOW' setting) has a list of messages
+    return data['messages'] if 'messages' in data else [data['message']]
+
+
+async def run(args):
+    settings.CHAT_BATCH_WINDOW = args.batch_window / 1000
+    settings.CHAT_BATCH_MAX_SIZE = args.batch_size
+    consumer = BlockingChatConsumer if args.blocking else ChatConsumer
+    application = URLRouter([re_path(r'ws/chat/(?P<room_name>\w+)/$', consumer.as_asgi())])
+    communicators = [WebsocketCommunicator(application, f'/ws/chat/bench{i % args.rooms}/')
+                     for i in range(args.clients)]
+    for i in range(0, len(communicators), 100):
+        results = await asyncio.gather(*(c.connect(timeout=60) for c in communicators[i:i + 100]))
+        assert all(connected for connected, _ in results)
+    # Drain messages that are sent on connect (eg: room history)
+    await asyncio.sleep(1)
+    for c in communicators:
+        while not c.output_queue.empty():
+            c.output_queue.get_nowait()
+
+    latencies, stop = list(), asyncio.Event()
+    members = [asyncio.ensure_future(member(c, latencies, stop)) for c in communicators]
+
+    async def sender(communicator):
+        for _ in range(args.messages):
+            await communicator.send_to(text_data=json.dumps({'message': repr(time.time())}))
+            await asyncio.sleep(args.interval / 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(sender(c) for c in communicators[:args.senders]))
+    expected = args.senders * args.messages * args.clients // args.rooms
+    while len(latencies) < expected and time.perf_counter() - start < args.timeout:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(*members)
+    await asyncio.gather(*(c.disconnect() for c in communicators))
+
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    print(f'clients: {args.clients}  rooms: {args.rooms}  senders: {args.senders}  messages/sender: {args.messages}  '
+          f'consumer: {"blocking" if args.blocking else "async"}  batch window: {args.batch_window}ms')
+    print(f'delivered: {len(latencies_ms)}/{expected} in {elapsed:.2f}s  ({len(latencies_ms) / elapsed:.0f} msg/s)')
+    if latencies_ms:
+        def p(q):
+            return latencies_ms[min(len(latencies_ms) - 1, int(len(latencies_ms) * q))]
+        print(f'latency ms: mean {statistics.mean(latencies_ms):.1f}  p50 {p(0.5):.1f}  p95 {p(0.95):.1f}  '
+              f'p99 {p(0.99):.1f}  max {latencies_ms[-1]:.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chat concurrency benchmark')
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--rooms', type=int, default=10)
+    parser.add_argument('--senders', type=int, default=100, help='Number of clients that send messages')
+    parser.add_argument('--messages', type=int, default=5, help='Messages of every sender')
+    parser.add_argument('--interval', type=float, default=10, help='Milliseconds between messages of a sender')
+    parser.add_argument('--timeout', type=float, default=120, help='Seconds to wait for deliveries')
+    parser.add_argument('--blocking', action='store_true', help='Use the old consumer with a sync redis call')
+    parser.add_argument('--batch-window', type=float, default=0, help='Milliseconds of batching (0 disables it)')
+    parser.add_argument('--batch-size', type=int, default=100, help='Maximum messages of one batch')
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Benchmark of concurrent big attachments: resumable chunked uploads (apps.ticketing.uploads, PATCH of raw chunks
+then one 'attach' of all files) against the multipart 'file_1' field of the ticket create API. Both run against a
+threaded live server on a throw-away test database (a temporary SQLite file, so every request thread has its own
+connection) and clients stream their bodies, so client memory does not grow with the file size. It prints
+throughput of every method and peak memory that Python allocated (tracemalloc) while it ran. Run it from the
+project directory (where 'manage.py' is):
+    python scripts/bench_chunked_upload.py --size-mb 100 --clients 8
+    python scripts/bench_chunked_upload.py --size-mb 100 --clients 8 --chunk-mb 5
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bigfin.settings.dev')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.testcases import LiveServerThread
+from rest_framework.authtoken.models import Token
+
+from apps.ticketing.models import FileUpload
+
+MB = 1024 * 1024
+BLOCK = os.urandom(MB)
+
+
+def body(size):
+    """'size' bytes of a file, one block at a time"""
+    for start in range(0, size, MB):
+        yield BLOCK[:min(MB, size - start)]
+
+
+class Client:
+    def __init__(self, port, token):
+        self.port = port
+        self.headers = {'Authorization': f'Token {token}', 'Host': 'localhost'}
+
+    def request(self, method, path, data=None, headers=None, expect=(200, 201)):
+        connection = http.client.HTTPConnection('localhost', self.port, timeout=600)
+        try:
+            connection.request(method, path, body=data, headers={**self.headers, **(headers or dict())})
+            response = connection.getresponse()
+            content = response.read()
+        finally:
+            connection.close()
+        if response.status not in expect:
+            raise RuntimeError(f'{method} {path}: {response.status} {content[:200]}')
+        return json.loads(content) if content else None
+
+    def json(self, method, path, data):
+        return self.request(method, path, json.dumps(data), {'Content-Type': 'application/json'})
+
+    def chunked(self, size, chunk_size, ticket_id):
+        upload = self.json('POST', '/ticket/upload/', {'filename': 'attachment.bin', 'size': size})
+        path = f'/ticket/upload/{upload["id"]}/'
+        offset = 0
+        while offset < size:
+            length = min(chunk_size, size - offset)
+            offset = self.request('PATCH', path, body(length), {'Content-Type': 'application/offset+octet-stream',
+                                                                'Content-Length': str(length),
+                                                                'Upload-Offset': str(offset)})['offset']
+        return self.json('POST', '/ticket/upload/attach/',
+                         {'ticketing': ticket_id, 'uploads': [{'id': upload['id']}]})
+
+    def multipart(self, size, user_id):
+        boundary = uuid.uuid4().hex
+        fields = {'title': 'title', 'message': 'message', 'user_obj': str(user_id), 'emergency': '3'}
+        head = ''.join(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+                       for name, value in fields.items())
+        head += (f'--{boundary}\r\nContent-Disposition: form-data; name="file_1"; filename="attachment.bin"\r\n'
+                 f'Content-Type: application/octet-stream\r\n\r\n')
+        tail = f'\r\n--{boundary}--\r\n'.encode()
+        head = head.encode()
+
+        def parts():
+            yield head
+            yield from body(size)
+            yield tail
+
+        return self.request('POST', '/ticket/ticketing/', parts(),
+                            {'Content-Type': f'multipart/form-data; boundary={boundary}',
+                             'Content-Length': str(len(head) + size + len(tail))})
+
+
+def run(clients, work):
+    """Run 'work(number)' in 'clients' threads at once. Returns seconds and peak of traced memory in MB"""
+    errors = list()
+
+    def target(number):
+        try:
+            work(number)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=target, args=(number, )) for number in range(clients)]
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+    return elapsed, tracemalloc.get_traced_memory()[1] / MB
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chunked upload benchmark')
+    parser.add_argument('--size-mb', type=int, default=100, help='Size of every attachment')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent uploads')
+    parser.add_argument('--chunk-mb', type=int, default=10, help='Size of chunks of chunked uploads')
+    args = parser.parse_args()
+    size, chunk_size = args.size_mb * MB, args.chunk_mb * MB
+
+    # No debug toolbar and no query log
+    settings.DEBUG = False
+    directory = tempfile.mkdtemp()
+    settings.MEDIA_ROOT = os.path.join(directory, 'media')
+    settings.TICKETING_UPLOAD_TEMP_DIR = os.path.join(directory, 'uploads')
+    settings.TICKETING_UPLOAD_MAX_SIZE = max(settings.TICKETING_UPLOAD_MAX_SIZE, size)
+    settings.DATABASES['default'].setdefault('TEST', dict())['NAME'] = os.path.join(directory, 'bench.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0)
+    server = LiveServerThread('localhost', lambda handler: handler)
+    server.daemon = True
+    try:
+        admin = get_user_model().objects.create_superuser(username='ehsan', password='123456', name='essi')
+        token, created = Token.objects.get_or_create(user=admin)
+        server.start()
+        server.is_ready.wait()
+        if server.error:
+            raise server.error
+        client = Client(server.port, token.key)
+        tickets = [client.json('POST', '/ticket/ticketing/', {'title': 'title', 'message': 'message',
+                                                               'user_obj': admin.id})['url'].rstrip('/')
+                   .rsplit('/', 1)[1] for _ in range(args.clients)]
+        connection.close()
+
+        tracemalloc.start()
+        total = args.clients * args.size_mb
+        print(f'{args.clients} concurrent uploads of {args.size_mb} MB  database: {connection.vendor}')
+        results = {
+            'multipart file_1': run(args.clients, lambda number: client.multipart(size, admin.id)),
+            f'chunked ({args.chunk_mb} MB)': run(args.clients,
+                                                 lambda number: client.chunked(size, chunk_size, tickets[number])),
+        }
+        tracemalloc.stop()
+        for name, (elapsed, peak) in results.items():
+            print(f'{name:20} {elapsed:7.2f}s  {total / elapsed:8.1f} MB/s  peak traced memory {peak:7.1f} MB')
+        print(f'{FileUpload.objects.count()} files saved')
+    finally:
+        server.terminate()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
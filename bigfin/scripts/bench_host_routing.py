@@ -0,0 +1,69 @@
+"""
+Microbenchmark of host routing: 'django_hosts' request and response middlewares (regexes of 'bigfin.hosts' on the
+way in and out of every request) against 'HostsRequestMiddleware' with 'HostRouter' and 'HostsResponseMiddleware'
+(bigfin.middleware). Both wrap a view that returns the same response and every request of a host is the same
+'RequestFactory' request, so the numbers are only routing (and django's exception wrapper of every middleware).
+Run it from the project directory (where 'manage.py' is):
+    python scripts/bench_host_routing.py --requests 200000
+    python scripts/bench_host_routing.py localhost dashboard.localhost other.example.com:8000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bigfin.settings.dev')
+
+import django
+django.setup()
+
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from bigfin.middleware import load_pipeline
+
+RESPONSE = HttpResponse()
+
+
+def view(request):
+    return RESPONSE
+
+
+def run(handler, request, number):
+    """Microseconds per request"""
+    start = time.perf_counter()
+    for _ in range(number):
+        handler(request)
+    return (time.perf_counter() - start) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Host routing benchmark')
+    parser.add_argument('--requests', type=int, default=200000, help='Requests of every host')
+    parser.add_argument('hosts', nargs='*', default=['localhost', 'dashboard.localhost'], help='Host headers')
+    args = parser.parse_args()
+
+    with override_settings(ALLOWED_HOSTS=['*']):
+        handlers = {
+            'django-hosts': load_pipeline(['django_hosts.middleware.HostsRequestMiddleware',
+                                           'django_hosts.middleware.HostsResponseMiddleware'], view),
+            'HostRouter': load_pipeline(['bigfin.middleware.HostsRequestMiddleware',
+                                         'bigfin.middleware.HostsResponseMiddleware'], view),
+        }
+        print(f'{args.requests} requests of every host (us/request)')
+        print(f'{"host":30}' + ''.join(f'{name:>14}' for name in handlers))
+        for host in args.hosts:
+            request = RequestFactory().get('/', HTTP_HOST=host)
+            results, names = list(), set()
+            for handler in handlers.values():
+                handler(request)
+                names.add(request.host.name)
+                results.append(run(handler, request, args.requests))
+            # Both find the same host
+            assert len(names) == 1, names
+            print(f'{host:30}' + ''.join(f'{result:14.2f}' for result in results) + f'    host: {names.pop()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Per-middleware timing report. Every layer of 'MIDDLEWARE' gets a probe middleware right outside of it and the time
+between two probes (on the way in and on the way out) is the overhead of the layer between them. 'view' is the
+rest: URL resolving, 'process_view' hooks and the view. On hot paths guards of 'bigfin.middleware' skip their
+middleware, so their time is only the guard. Layers that a request never reaches are shown with '-'. Requests are
+made with 'RequestFactory' and handled by django's handler, so there is no network in the numbers. 'price_list'
+reads Redis ('REDIS_URL'). Run it from the project directory (where 'manage.py' is):
+    python scripts/bench_middleware.py --requests 2000
+    python scripts/bench_middleware.py --requests 2000 --production
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bigfin.settings.dev')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import RequestFactory, override_settings
+
+PROBE = f'{__name__}.Probe'
+
+
+class Probe:
+    """Adds up time of every request inside of it. Instances are made from the innermost one"""
+    instances = list()
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.elapsed = 0.0
+        self.calls = 0
+        Probe.instances.append(self)
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.elapsed += time.perf_counter() - start
+        self.calls += 1
+        return response
+
+
+def probed(paths):
+    """A probe before every middleware of 'paths'"""
+    return [path for middleware in paths for path in (PROBE, middleware)]
+
+
+def report(handler, probes, names, host, path, number):
+    """Microseconds of every layer for 'number' requests of 'path'"""
+    factory = RequestFactory()
+    requests = [factory.get(path, HTTP_HOST=host) for _ in range(number)]
+    for probe in probes:
+        probe.elapsed, probe.calls = 0.0, 0
+    start = time.perf_counter()
+    for request in requests:
+        handler.get_response(request)
+    total = (time.perf_counter() - start) / number * 1e6
+    print(f'\n{host}{path}  {total:.1f} us/request')
+    visited = [(name, probe) for name, probe in zip(names, probes) if probe.calls]
+    inner = dict(zip((name for name, probe in visited), [probe for name, probe in visited[1:]] + [None]))
+    for name, probe in zip(names, probes):
+        if not probe.calls:
+            print(f'    {"-":>8}       {name}')
+            continue
+        own = probe.elapsed - (inner[name].elapsed if inner[name] is not None else 0.0)
+        print(f'    {own / number * 1e6:8.1f} us    {name}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Middleware timing report')
+    parser.add_argument('--requests', type=int, default=2000, help='Requests of every path')
+    parser.add_argument('--production', action='store_true', help='DEBUG off and no development middlewares')
+    parser.add_argument('paths', nargs='*', default=['localhost/price_list/', 'localhost/'],
+                        help='host/path of requests')
+    args = parser.parse_args()
+
+    middleware = list(settings.MIDDLEWARE)
+    if args.production:
+        settings.DEBUG = False
+        middleware = [path for path in middleware if path not in settings.DEV_MIDDLEWARE]
+    names = middleware + ['view']
+    with override_settings(MIDDLEWARE=probed(middleware) + [PROBE], DEBUG=settings.DEBUG):
+        handler = WSGIHandler()
+        # Django makes 'MIDDLEWARE' from the innermost one, so reversed instances are in the order of 'names'
+        probes = Probe.instances[::-1]
+        assert len(probes) == len(names)
+        print(f'DEBUG={settings.DEBUG}  {args.requests} requests of every path')
+        for url in args.paths:
+            host, path = url.split('/', 1)
+            report(handler, probes, names, host, '/' + path, args.requests)
+
+
+if __name__ == '__main__':
+    main()
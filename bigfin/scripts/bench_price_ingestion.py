@@ -0,0 +1,66 @@
+"""
+Benchmark of price ingestion against the local fake CoinAPI server (scripts/fake_coinapi.py). It prints
+throughput (symbols/sec) and per-cycle latency. Run it from the project directory (where 'manage.py' is):
+    python scripts/bench_price_ingestion.py --symbols 500 --cycles 20 --latency 50
+    python scripts/bench_price_ingestion.py --symbols 500 --no-redis
+"""
+import argparse
+import math
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bigfin.settings.dev')
+
+import django
+django.setup()
+
+from apps.currency.ingestion import PriceIngestor
+from bigfin.redis_pool import get_redis
+from fake_coinapi import FakeCoinAPIServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Price ingestion benchmark')
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--cycles', type=int, default=20)
+    parser.add_argument('--chunk-size', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=50, help='Fake upstream latency in milliseconds')
+    parser.add_argument('--no-redis', action='store_true', help='Only benchmark upstream fetches')
+    args = parser.parse_args()
+
+    server = FakeCoinAPIServer(latency=args.latency / 1000).start()
+    red = None if args.no_redis else get_redis()
+    assets = [f'X{i:04d}' for i in range(args.symbols)]
+    ingestor = PriceIngestor(red, assets, server.url, api_key='bench',
+                             chunk_size=args.chunk_size, concurrency=args.concurrency)
+    totals = list()
+    count = 0
+    try:
+        for _ in range(args.cycles):
+            if args.no_redis:
+                start = time.perf_counter()
+                stats = {'symbols': len(ingestor.fetch()), 'total': time.perf_counter() - start}
+            else:
+                stats = ingestor.run_cycle()
+            totals.append(stats['total'])
+            count += stats['symbols']
+    finally:
+        ingestor.close()
+        server.stop()
+
+    totals_ms = sorted(t * 1000 for t in totals)
+    # Nearest-rank percentile
+    p95 = totals_ms[min(len(totals_ms) - 1, math.ceil(0.95 * len(totals_ms)) - 1)]
+    print(f'symbols/cycle: {args.symbols}  chunk: {args.chunk_size}  concurrency: {args.concurrency}  '
+          f'upstream latency: {args.latency}ms  redis: {not args.no_redis}')
+    print(f'cycle latency ms: min {totals_ms[0]:.1f}  mean {statistics.mean(totals_ms):.1f}  '
+          f'p50 {statistics.median(totals_ms):.1f}  p95 {p95:.1f}  max {totals_ms[-1]:.1f}')
+    print(f'throughput: {count / sum(totals):.0f} symbols/sec')
+
+
+if __name__ == '__main__':
+    main()
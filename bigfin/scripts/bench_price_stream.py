@@ -0,0 +1,104 @@
+"""
+Load test of live price streaming (apps.chat.consumers.PriceConsumer) over the real redis channel layer
+(CHANNEL_LAYERS setting). It connects many in-process websocket clients, publishes rounds of price updates
+like the ingestion process does and prints delivery latency (publish to client receive) and how many updates
+were coalesced. Run it from the project directory (where 'manage.py' is) with a local redis:
+    python scripts/bench_price_stream.py --clients 200 --symbols 50 --per-client 10 --rounds 20
+    python scripts/bench_price_stream.py --clients 200 --throttle 0 --interval 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bigfin.settings.dev')
+
+import django
+django.setup()
+
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.urls import re_path
+
+from apps.chat.consumers import PriceConsumer
+from apps.currency.streaming import apublish_prices
+
+
+async def client(application, symbols, latencies, counters, stop):
+    communicator = WebsocketCommunicator(application, f'/ws/prices/?symbols={",".join(symbols)}')
+    connected, _ = await communicator.connect(timeout=30)
+    assert connected
+    await communicator.receive_json_from(timeout=30)
+    counters['connected'] += 1
+    while not stop.is_set():
+        # 'receive_json_from' cancels the consumer on timeout, so wait on the output queue of the communicator
+        try:
+            message = await asyncio.wait_for(communicator.output_queue.get(), 0.2)
+        except asyncio.TimeoutError:
+            continue
+        now = time.time()
+        counters['messages'] += 1
+        for update in json.loads(message['text']).get('prices', {}).values():
+            latencies.append(now - update['time'])
+    await communicator.disconnect()
+
+
+async def run(args):
+    consumer = type('BenchPriceConsumer', (PriceConsumer,), {'throttle': args.throttle})
+    application = URLRouter([re_path(r'ws/prices/$', consumer.as_asgi())])
+    universe = [f'X{i:04d}' for i in range(args.symbols)]
+    latencies, counters, stop = list(), {'connected': 0, 'messages': 0}, asyncio.Event()
+    tasks = [asyncio.ensure_future(client(application, random.sample(universe, args.per_client),
+                                          latencies, counters, stop))
+             for _ in range(args.clients)]
+    while counters['connected'] < args.clients:
+        failed = [task for task in tasks if task.done()]
+        if failed:
+            failed[0].result()
+        await asyncio.sleep(0.05)
+
+    layer = get_channel_layer()
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        now = time.time()
+        await apublish_prices([(s, s.lower(), random.uniform(1, 1000), now) for s in universe], channel_layer=layer)
+        await asyncio.sleep(args.interval / 1000)
+    # Let throttled updates arrive
+    await asyncio.sleep(args.throttle + 1)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await asyncio.gather(*tasks)
+
+    published = args.rounds * args.clients * args.per_client
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    print(f'clients: {args.clients}  symbols: {args.symbols}  per client: {args.per_client}  '
+          f'rounds: {args.rounds} every {args.interval}ms  throttle: {args.throttle}s')
+    print(f'subscribed updates: {published}  delivered updates: {len(latencies_ms)}  '
+          f'websocket messages: {counters["messages"]}  ({counters["messages"] / elapsed:.0f} msg/s)')
+    if latencies_ms:
+        def p(q):
+            return latencies_ms[min(len(latencies_ms) - 1, int(len(latencies_ms) * q))]
+        print(f'delivery latency ms: mean {statistics.mean(latencies_ms):.1f}  p50 {p(0.5):.1f}  '
+              f'p95 {p(0.95):.1f}  p99 {p(0.99):.1f}  max {latencies_ms[-1]:.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Live price streaming load test')
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--symbols', type=int, default=50, help='Number of published symbols')
+    parser.add_argument('--per-client', type=int, default=10, help='Subscribed symbols of every client')
+    parser.add_argument('--rounds', type=int, default=20, help='Number of publish rounds')
+    parser.add_argument('--interval', type=float, default=100, help='Milliseconds between two rounds')
+    parser.add_argument('--throttle', type=float, default=0.5, help='PriceConsumer throttle in seconds')
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
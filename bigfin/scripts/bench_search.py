@@ -0,0 +1,81 @@
+"""
+Latency benchmark of ticket full-text search (apps.ticketing.search). It fills the search index of a throw-away
+test database with synthetic documents (straight into the index, no ticket rows) and prints latency of first
+pages of some queries: a rare word, a word of almost every document and two of them. Run it from the project directory (where
+'manage.py' is):
+    python scripts/bench_search.py --rows 1000000
+    python scripts/bench_search.py --rows 1000000 --candidates 2000
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bigfin.settings.dev')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from apps.ticketing import search
+
+
+def words(count, rng):
+    # Zipf-like vocabulary: a few words are in most documents and most words are rare
+    return [f'w{int(rng.paretovariate(1.0)) % 50000}' for _ in range(count)]
+
+
+def fill(rows, batch_size, seed):
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    with transaction.atomic():
+        for first in range(0, rows, batch_size):
+            batch = list()
+            for object_id in range(first, min(first + batch_size, rows)):
+                kind = search.TICKET if object_id % 4 == 0 else search.ANSWER
+                title = ' '.join(words(5, rng)) if kind == search.TICKET else ''
+                batch.append((search.document_id(kind, object_id), object_id // 4, title, ' '.join(words(30, rng))))
+            search.index_documents(batch)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ticket search latency benchmark')
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of indexed documents')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20, help='Runs of every query')
+    parser.add_argument('--limit', type=int, default=20, help='Page size')
+    parser.add_argument('--candidates', type=int, default=settings.TICKETING_SEARCH_MAX_CANDIDATES,
+                        help='TICKETING_SEARCH_MAX_CANDIDATES setting (every match is ranked by default)')
+    args = parser.parse_args()
+    settings.TICKETING_SEARCH_MAX_CANDIDATES = args.candidates
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        elapsed = fill(args.rows, args.batch_size, seed=1)
+        print(f'indexed {args.rows} documents in {elapsed:.1f}s ({args.rows / elapsed:.0f} docs/sec)  '
+              f'database: {connection.vendor}  ranked candidates: {args.candidates or "all"}')
+        queries = {'rare word': 'w500', 'common word': 'w1', 'two words': 'w1 w2', 'no match': 'nothing'}
+        for name, query in queries.items():
+            latencies = list()
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                hits = search.search(query, args.limit)
+                latencies.append((time.perf_counter() - start) * 1000)
+            latencies.sort()
+            # Nearest-rank percentile: the smallest latency that at least 95% of runs are not slower than
+            p95 = latencies[min(len(latencies) - 1, math.ceil(0.95 * len(latencies)) - 1)]
+            print(f'{name:12} {query!r:9} hits: {len(hits):3}  latency ms: p50 {statistics.median(latencies):.1f}  '
+                  f'p95 {p95:.1f}  max {latencies[-1]:.1f}')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
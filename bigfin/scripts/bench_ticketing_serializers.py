@@ -0,0 +1,79 @@
+"""
+Benchmark of ticket list serialization: TicketingSerializer (the 'ticketing_queryset' with its prefetches) against
+FastTicketingSerializer ('.values()' rows, apps.ticketing.fast_serializers). It creates the tickets (with answers
+and files) in a throw-away test database, checks both outputs are the same and prints rows/sec of each one
+(queries included). Run it from the project directory (where 'manage.py' is):
+    python scripts/bench_ticketing_serializers.py --tickets 10000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bigfin.settings.dev')
+
+import django
+django.setup()
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.ticketing.fast_serializers import FastTicketingSerializer, ticketing_values
+from apps.ticketing.models import Answer, FileUpload, Ticketing
+from apps.ticketing.serializers import TicketingSerializer
+from apps.ticketing.views import ticketing_queryset
+
+
+def create_rows(tickets, users):
+    users = [get_user_model().objects.create_user(username=f'user{i}', password=None) for i in range(users)]
+    Ticketing.objects.bulk_create([Ticketing(user=users[i % len(users)], title=f'title {i}', message='message ' * 20)
+                                   for i in range(tickets)], batch_size=1000)
+    tickets = list(Ticketing.objects.all())
+    # Every second ticket has an answer and every ticket has a file
+    Answer.objects.bulk_create([Answer(ticketing=t, user_id=t.user_id, message='answer') for t in tickets[::2]],
+                               batch_size=1000)
+    FileUpload.objects.bulk_create([FileUpload(content_object=t, caption='file') for t in tickets], batch_size=1000)
+
+
+def measure(serialize, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = serialize()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return data, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ticket list serializers benchmark')
+    parser.add_argument('--tickets', type=int, default=10000)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3, help='Best of this many runs is printed')
+    args = parser.parse_args()
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        create_rows(args.tickets, args.users)
+        context = {'request': Request(APIRequestFactory().get('/ticket/ticketing/'))}
+        queryset = Ticketing.objects.order_by('-created', '-id')
+        slow, slow_time = measure(
+            lambda: TicketingSerializer(ticketing_queryset().order_by('-created', '-id'), many=True,
+                                        context=context).data, args.repeat)
+        fast, fast_time = measure(
+            lambda: FastTicketingSerializer(ticketing_values(queryset), context=context).data, args.repeat)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    assert fast == slow, 'Outputs of the serializers are not the same'
+    print(f'tickets: {args.tickets}  users: {args.users}  database: {connection.vendor}')
+    print(f'TicketingSerializer:     {slow_time:.3f}s  {args.tickets / slow_time:.0f} rows/sec')
+    print(f'FastTicketingSerializer: {fast_time:.3f}s  {args.tickets / fast_time:.0f} rows/sec  '
+          f'({slow_time / fast_time:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of the authentication overhead of token requests: DRF 'TokenAuthentication' (a 'Token' join 'User'
+query on every request) against 'CachedTokenAuthentication' (apps.accounts.authentication) with hits of the
+in-process LRU and hits of Redis (the LRU is cleared before every request). Every method authenticates the same
+requests of 'RequestFactory' on a throw-away test database and it prints the time and queries per request. Redis
+must be running on 'REDIS_URL'. Run it from the project directory (where 'manage.py' is):
+    python scripts/bench_token_auth.py --requests 20000 --users 100
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bigfin.settings.dev')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, reset_queries
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from apps.accounts import authentication
+
+
+def run(backend, requests, before=None):
+    """Authenticate all 'requests'. Returns microseconds and queries per request"""
+    reset_queries()
+    start = time.perf_counter()
+    for request in requests:
+        if before is not None:
+            before()
+        backend.authenticate(request)
+    elapsed = time.perf_counter() - start
+    return elapsed / len(requests) * 1e6, len(connection.queries) / len(requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Token authentication benchmark')
+    parser.add_argument('--requests', type=int, default=20000, help='Authenticated requests of every method')
+    parser.add_argument('--users', type=int, default=100, help='Users (tokens) of the requests')
+    args = parser.parse_args()
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        users = [get_user_model().objects.create_user(username=f'user{number}', password='123456')
+                 for number in range(args.users)]
+        keys = [Token.objects.get_or_create(user=user)[0].key for user in users]
+        factory = APIRequestFactory()
+        requests = [factory.get('/', HTTP_AUTHORIZATION=f'Token {keys[number % len(keys)]}')
+                    for number in range(args.requests)]
+        # Count queries without the debug toolbar
+        settings.DEBUG = False
+        connection.force_debug_cursor = True
+        cached = authentication.CachedTokenAuthentication()
+        authentication.invalidate(keys)
+        # Fill both caches
+        run(cached, requests[:args.users])
+
+        print(f'{args.requests} requests of {args.users} tokens  database: {connection.vendor}')
+        results = {
+            'TokenAuthentication': run(TokenAuthentication(), requests),
+            'cached (local LRU)': run(cached, requests),
+            'cached (redis)': run(cached, requests, authentication.local_cache.clear),
+        }
+        for name, (micro, queries) in results.items():
+            print(f'{name:20} {micro:8.1f} us/request  {queries:4.2f} queries/request')
+        authentication.invalidate(keys)
+    finally:
+        connection.force_debug_cursor = False
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Throughput of concurrent credits and debits of one wallet: 'threads' threads move random amounts of one currency of
+the same wallet 'operations' times each with
+- 'contents': the old way, read the wallet, change 'Wallet.contents' JSON and save it
+- 'ledger': 'apps.wallet.ledger' ('UPDATE ... SET amount = amount + n' and an append-only ledger entry)
+It prints operations per second and the difference between the final balance and the sum of all movements (lost
+updates). Every run uses a throw-away test database (a temporary SQLite file, so threads share it) with DEBUG off.
+Run it from the project directory (where 'manage.py' is):
+    python scripts/bench_wallet_ledger.py --threads 8 --operations 200
+"""
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bigfin.settings.dev')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection, connections
+
+from apps.currency.models import Currency
+from apps.wallet import ledger
+from apps.wallet.models import Wallet, WalletBalance
+
+
+def contents_move(wallet_id, amount, symbol):
+    """Read, modify and save 'Wallet.contents' (how wallets were changed before the ledger)"""
+    wallet = Wallet.objects.get(pk=wallet_id)
+    contents = wallet.contents or dict()
+    balance = Decimal(contents.get(symbol, '0')) + amount
+    if balance < 0:
+        raise ledger.InsufficientBalance(symbol)
+    contents[symbol] = str(balance)
+    wallet.contents = contents
+    wallet.save()
+
+
+def ledger_move(wallet_id, amount, currency_id):
+    ledger.move(wallet_id, amount, currency_id=currency_id)
+
+
+def worker(move, wallet_id, target, operations, seed):
+    """Moves of one thread: sum of the moves that were done and count of failed ones"""
+    rng = random.Random(seed)
+    total, failed = Decimal(0), 0
+    try:
+        for _ in range(operations):
+            amount = Decimal(rng.randint(-5, 10))
+            if not amount:
+                amount = Decimal(1)
+            try:
+                move(wallet_id, amount, target)
+                total += amount
+            except (ledger.InsufficientBalance, OperationalError):
+                failed += 1
+    finally:
+        connections.close_all()
+    return total, failed
+
+
+def run(name, move, balance, wallet_id, target, threads, operations):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        results = list(executor.map(lambda seed: worker(move, wallet_id, target, operations, seed), range(threads)))
+    elapsed = time.perf_counter() - start
+    total = sum(result[0] for result in results)
+    failed = sum(result[1] for result in results)
+    done = threads * operations - failed
+    lost = (total - balance()).normalize()
+    print(f'{name:10}{done / elapsed:12.1f}{done:10}{failed:10}{total:>14}{lost:>12}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent wallet credits and debits')
+    parser.add_argument('--threads', type=int, default=8, help='Concurrent threads')
+    parser.add_argument('--operations', type=int, default=200, help='Moves of every thread')
+    args = parser.parse_args()
+
+    settings.DEBUG = False
+    directory = tempfile.mkdtemp()
+    settings.DATABASES['default'].setdefault('TEST', dict())['NAME'] = os.path.join(directory, 'bench.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user = get_user_model().objects.create_user(username='ehsan', password='123456', name='essi')
+        wallet = Wallet.objects.get(user=user)
+        btc = Currency.objects.create(name='bitcoin', symbol='BTC')
+        # Both ways start with the same balance so few debits fail
+        start_balance = Decimal(1000)
+        Wallet.objects.filter(pk=wallet.pk).update(contents={'BTC': str(start_balance)})
+        ledger.credit(wallet.pk, start_balance, currency_id=btc.pk)
+
+        def contents_balance():
+            return Decimal(Wallet.objects.values_list('contents', flat=True).get(pk=wallet.pk)['BTC']) - start_balance
+
+        def ledger_balance():
+            amount = WalletBalance.objects.values_list('amount', flat=True).get(wallet=wallet, currency=btc)
+            return amount - start_balance
+
+        print(f'{args.threads} threads x {args.operations} moves  database: {connection.vendor}  '
+              f'cpus: {os.cpu_count()}')
+        print(f'{"way":10}{"ops/s":>12}{"done":>10}{"failed":>10}{"moved":>14}{"lost":>12}')
+        run('contents', contents_move, contents_balance, wallet.pk, 'BTC', args.threads, args.operations)
+        run('ledger', ledger_move, ledger_balance, wallet.pk, btc.pk, args.threads, args.operations)
+        totals = ledger.ledger_totals(wallet.pk)
+        print(f'ledger entries sum: {totals[btc.pk]}  balance: {ledger_balance() + start_balance}')
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
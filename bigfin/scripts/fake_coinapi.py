@@ -0,0 +1,90 @@
+"""
+A local fake 'CoinAPI' server to test and benchmark price ingestion offline. It answers just like
+'GET /v1/assets?filter_asset_id=BTC,ETH' of the real api (https://docs.coinapi.io/#list-all-assets-get) with
+random prices for any asset id asked.
+    python scripts/fake_coinapi.py --port 8765 --latency 50
+    python manage.py ingest_prices --base-url http://127.0.0.1:8765 --interval 1
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from datetime import date
+import argparse
+import json
+import random
+import threading
+import time
+
+
+KNOWN_NAMES = {'BTC': 'Bitcoin', 'ETH': 'Ethereum', 'DOGE': 'Dogecoin'}
+
+
+def fake_asset(asset_id):
+    """Make a CoinAPI-like asset dictionary for the asset id"""
+    return {
+        'asset_id': asset_id,
+        'name': KNOWN_NAMES.get(asset_id, f'{asset_id} coin'),
+        'type_is_crypto': 1,
+        'data_end': str(date.today()),
+        'price_usd': round(random.uniform(0.01, 50000), 8),
+    }
+
+
+class FakeCoinAPIHandler(BaseHTTPRequestHandler):
+    # 'HTTP/1.1' lets clients keep the connection alive just like the real server
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/v1/assets':
+            self.send_error(404)
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        asset_ids = parse_qs(url.query).get('filter_asset_id', [''])[0].replace(';', ',').split(',')
+        body = json.dumps([fake_asset(a) for a in asset_ids if a]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeCoinAPIServer:
+    """Run the fake server in a background thread: 'server.start()' then 'server.url'"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        self.httpd = ThreadingHTTPServer((host, port), FakeCoinAPIHandler)
+        self.httpd.daemon_threads = True
+        # Latency of every upstream call in seconds
+        self.httpd.latency = latency
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fake CoinAPI server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0, help='Latency of every response in milliseconds')
+    args = parser.parse_args()
+    server = FakeCoinAPIServer(args.host, args.port, args.latency / 1000)
+    print(f'Fake CoinAPI listening on {server.url}')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()